@@ -3,7 +3,9 @@ from PyQt5 import QtWidgets
 
 from ui.login_window import LoginWindow
 from ui.main_window import MainWindow
-from utils.db_manager import DatabaseManager
+from utils.db_manager import DatabaseManager, connection_registry
+from utils.export_jobs import export_jobs
+from utils.backup_manager import backup_jobs
 
 
 class InventoryApp(QtWidgets.QApplication):
@@ -13,6 +15,16 @@ class InventoryApp(QtWidgets.QApplication):
         self.db = DatabaseManager()
         self.main_window = None
 
+        # ترقية قاعدة البيانات مرة واحدة عند التشغيل
+        self.db.migrate()
+
+        # نقطة حفظ دورية لأرصدة المخزون (حتى يظل استعلام الرصيد بتاريخ سريعاً)
+        self.db.ensure_stock_snapshots()
+
+        # إيقاف التصديرات والنسخ الجارية (الملفات الناقصة تُحذف) ثم إغلاق كل الاتصالات عند الخروج
+        self.aboutToQuit.connect(self.stop_jobs)
+        self.aboutToQuit.connect(connection_registry.close_all)
+
         # فتح شاشة تسجيل الدخول
         self.login_window = LoginWindow()
         self.login_window.login_success.connect(self.start_main_app)
@@ -28,6 +40,12 @@ class InventoryApp(QtWidgets.QApplication):
         self.main_window.logout_requested.connect(self.show_login_again)
         self.main_window.showMaximized()
 
+    # -------------------------------------------------------------
+    def stop_jobs(self):
+        for jobs in (export_jobs, backup_jobs):
+            jobs.cancel_all()
+            jobs.wait()
+
     # -------------------------------------------------------------
     def show_login_again(self):
         # الرجوع لصفحة تسجيل الدخول بعد تسجيل خروج
@@ -1,7 +1,10 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
-from utils.export_utils import Exporter
-from ui.global_signals import global_signals
+from utils.query_executor import query_executor
+from utils.report_utils import ReportUtils
+from utils.global_signals import global_signals, ChangeEvent
+from ui.table_models import RowBufferModel
+from ui.search_controller import SearchController, text_matcher
 
 
 class ActivityLogPage(QtWidgets.QWidget):
@@ -9,13 +12,19 @@ class ActivityLogPage(QtWidgets.QWidget):
         super().__init__()
 
         self.db = DatabaseManager()
+        self.reporter = ReportUtils()
         self.permissions = permissions
         self.data = []
+        self.filters = None
+        self.last_id = None
+        self.new_logs_loading = False
+        self.new_logs_dirty = False
 
         self.build_ui()
         self.load_logs()
 
-        global_signals.data_changed.connect(self.load_logs)
+        # أي عملية تكتب سجلاً — نجلب السجلات الجديدة فقط ونضيفها أعلى الجدول
+        global_signals.subscribe(None, self.load_new_logs)
 
     # ======================================================================
     def build_ui(self):
@@ -75,7 +84,11 @@ class ActivityLogPage(QtWidgets.QWidget):
         # -------- Search Text --------
         self.txt_search = QtWidgets.QLineEdit()
         self.txt_search.setPlaceholderText("بحث...")
-        self.txt_search.textChanged.connect(self.filter_search)
+        self.search_ctl = SearchController(
+            self.txt_search, self.fill_table,
+            source=lambda: self.data,
+            match=text_matcher("user", "action", "details"),
+        )
 
         f.addWidget(QtWidgets.QLabel("بحث:"), 5, 0)
         f.addWidget(self.txt_search, 5, 1)
@@ -90,9 +103,14 @@ class ActivityLogPage(QtWidgets.QWidget):
         # ======================================================================
         # TABLE
         # ======================================================================
-        self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["المستخدم", "الإجراء", "القسم", "تفاصيل", "الوقت"])
+        self.model = RowBufferModel([
+            ("user", "المستخدم"), ("action", "الإجراء"), ("section", "القسم"),
+            ("details", "تفاصيل"), ("timestamp", "الوقت"),
+        ])
+        self.model.row_background = self.row_color
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setStretchLastSection(True)
 
         layout.addWidget(self.table)
@@ -118,31 +136,87 @@ class ActivityLogPage(QtWidgets.QWidget):
 
     # ======================================================================
     def load_logs(self):
-        self.data = self.db.get_logs()
-        self.fill_table(self.data)
+        self.filters = None
+        query_executor.submit(self.db.get_logs, group="activity_log").then(self.on_logs_loaded)
 
-    # ======================================================================
-    def fill_table(self, logs):
-        self.table.setRowCount(len(logs))
+    def on_logs_loaded(self, logs):
+        self.last_id = logs[0]["id"] if logs else 0
+
+        if self.filters:
+            logs = self.filter_logs(logs, *self.filters)
+        self.show_logs(logs)
+
+    def load_new_logs(self, events=None):
+        if self.last_id is None:
+            return
+
+        # السجل نفسه استُبدل (استعادة نسخة): الأرقام قد تكون أقل من last_id
+        if any(e.table == "activity_log" and e.op != ChangeEvent.INSERT for e in events or ()):
+            self.load_logs()
+            return
+
+        # طلب جاري: السجلات التي أضيفت بعد بداية الـ SELECT الخاص به لن تكون فيه
+        # ← نعيد الطلب من last_id الجديد بعد وصول النتيجة
+        if self.new_logs_loading:
+            self.new_logs_dirty = True
+            return
+
+        self.new_logs_loading = True
+        self.new_logs_dirty = False
+        query_executor.submit(self.db.get_logs, self.last_id).then(
+            self.add_new_logs, lambda error: self.new_logs_done()
+        )
+
+    def new_logs_done(self):
+        self.new_logs_loading = False
+        if self.new_logs_dirty:
+            self.load_new_logs()
+
+    def add_new_logs(self, logs):
+        try:
+            self.prepend_logs(logs)
+        finally:
+            self.new_logs_done()
+
+    def prepend_logs(self, logs):
+        logs = [l for l in logs if l["id"] > self.last_id]
+        if not logs:
+            return
+
+        self.last_id = logs[0]["id"]
 
-        for i, log in enumerate(logs):
-            row_color = QtGui.QColor("#F8F9FC")
+        if self.filters:
+            logs = self.filter_logs(logs, *self.filters)
 
-            if "حذف" in log["action"]:
-                row_color = QtGui.QColor("#FFE5E5")
-            elif "تعديل" in log["action"]:
-                row_color = QtGui.QColor("#FFF6D8")
-            elif "إضافة" in log["action"]:
-                row_color = QtGui.QColor("#E9FFE8")
+        self.data = logs + self.data
+        self.search_ctl.invalidate()
+        self.model.prepend_rows(self.search_ctl.filter(logs))
 
-            for col, key in enumerate(["user", "action", "section", "details", "timestamp"]):
-                item = QtWidgets.QTableWidgetItem(str(log[key]))
-                item.setBackground(row_color)
-                self.table.setItem(i, col, item)
+    def show_logs(self, logs):
+        self.data = logs
+        self.search_ctl.refresh()
+
+    # ======================================================================
+    def fill_table(self, logs):
+        self.model.set_rows(logs)
 
         self.table.resizeColumnsToContents()
         self.table.horizontalHeader().setStretchLastSection(True)
 
+    # ======================================================================
+    @staticmethod
+    def row_color(log):
+        action = log["action"] or ""
+
+        if "حذف" in action:
+            return "#FFE5E5"
+        elif "تعديل" in action:
+            return "#FFF6D8"
+        elif "إضافة" in action:
+            return "#E9FFE8"
+
+        return "#F8F9FC"
+
     # ======================================================================
     def apply_filters(self):
         user = self.cbo_user.currentText()
@@ -152,8 +226,13 @@ class ActivityLogPage(QtWidgets.QWidget):
         start = self.date_from.date().toString("yyyy-MM-dd")
         end = self.date_to.date().toString("yyyy-MM-dd")
 
+        self.filters = (user, section, action, start, end)
+        query_executor.submit(self.db.get_logs, group="activity_log").then(self.on_logs_loaded)
+
+    @staticmethod
+    def filter_logs(logs, user, section, action, start, end):
         filtered = []
-        for log in self.db.get_logs():
+        for log in logs:
 
             if user != "الكل" and log["user"] != user:
                 continue
@@ -169,37 +248,58 @@ class ActivityLogPage(QtWidgets.QWidget):
 
             filtered.append(log)
 
-        self.data = filtered
-        self.fill_table(filtered)
+        return filtered
 
     # ======================================================================
-    def filter_search(self):
-        text = self.txt_search.text().strip()
-
-        filtered = [
-            x for x in self.data
-            if text in x["user"] or text in x["action"] or text in x["details"]
-        ]
-
-        self.fill_table(filtered)
+    EXPORT_COLUMNS = [
+        ("user", "User"), ("action", "Action"), ("section", "Section"),
+        ("details", "Details"), ("timestamp", "Time"),
+    ]
+
+    def export_query(self):
+        """نفس فلاتر وبحث الجدول المعروض — يُعاد تنفيذها في SQL أثناء التصدير"""
+        filters = {"text": self.search_ctl.text()}
+        if self.filters:
+            user, section, action, start, end = self.filters
+            filters.update(user=user, section=section, action=action,
+                           date_from=start, date_to=end)
+        return ("activity_log", filters)
 
     # ======================================================================
     def export_excel(self):
-        if not self.data:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "❌", "لا يوجد بيانات للتصدير")
             return
 
-        Exporter().export_excel(self.data, "Activity_Log")
-        QtWidgets.QMessageBox.information(self, "✔", "تم التصدير إلى Excel.")
+        self.reporter.export_excel(
+            data_list=None,
+            query=self.export_query(),
+            columns=self.EXPORT_COLUMNS,
+            filename="activity_log",
+            report_title="Activity Log",
+            date_from=self.filters[3] if self.filters else None,
+            date_to=self.filters[4] if self.filters else None
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم التصدير إلى Excel:\n{path}")
+        )
 
     # ======================================================================
     def export_pdf(self):
-        if not self.data:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "❌", "لا يوجد بيانات للتصدير")
             return
 
-        Exporter().export_pdf(self.data, "Activity_Log")
-        QtWidgets.QMessageBox.information(self, "✔", "تم إنشاء ملف PDF.")
+        self.reporter.export_pdf(
+            data_list=None,
+            query=self.export_query(),
+            columns=self.EXPORT_COLUMNS,
+            filename="activity_log",
+            report_title="Activity Log",
+            date_from=self.filters[3] if self.filters else None,
+            date_to=self.filters[4] if self.filters else None
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء ملف PDF:\n{path}")
+        )
 
     # ======================================================================
     def print_report(self):
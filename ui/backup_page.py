@@ -1,9 +1,14 @@
-import os
-import zipfile
-from datetime import datetime, timedelta
 from PyQt5 import QtWidgets, QtCore
 from utils.settings_manager import SettingsManager
-from ui.global_signals import global_signals
+from utils.query_executor import query_executor
+from utils.backup_engine import describe
+from utils.backup_archiver import CODECS, CODEC_LEVELS, DEFAULT_CODEC, DEFAULT_LEVEL
+from utils.backup_manager import backup_jobs, chunk_store, complete_restore, submit_backup, submit_restore
+from utils.restore_engine import PARTIAL_TABLES, describe_restore
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):,.1f} MB"
 
 
 class BackupPage(QtWidgets.QWidget):
@@ -13,11 +18,13 @@ class BackupPage(QtWidgets.QWidget):
         self.permissions = permissions
         self.settings = SettingsManager()
         self.current_settings = self.settings.load()
+        self.snapshots = []
 
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.auto_backup_check)
 
         self.build_ui()
+        self.load_store()
 
         # تشغيل الـ Scheduler تلقائياً
         self.start_auto_scheduler()
@@ -59,6 +66,67 @@ class BackupPage(QtWidgets.QWidget):
         self.spin_interval.setValue(self.current_settings.get("auto_backup_interval", 24))
         form.addRow("⏳ كل (ساعات):", self.spin_interval)
 
+        # ------------------- نوع النسخ -------------------
+        self.cbo_mode = QtWidgets.QComboBox()
+        self.cbo_mode.addItem("كامل (zip)", "full")
+        self.cbo_mode.addItem("تزايدي (الأجزاء المتغيرة فقط)", "incremental")
+        self.cbo_mode.setCurrentIndex(
+            max(0, self.cbo_mode.findData(self.current_settings.get("backup_mode", "full")))
+        )
+        self.cbo_mode.currentIndexChanged.connect(
+            lambda: self.settings.update("backup_mode", self.cbo_mode.currentData())
+        )
+        form.addRow("🧩 نوع النسخ:", self.cbo_mode)
+
+        # ------------------- الضغط (النسخ الكامل) -------------------
+        self.cbo_codec = QtWidgets.QComboBox()
+        for codec in CODECS:
+            self.cbo_codec.addItem(codec, codec)
+        self.cbo_codec.setCurrentIndex(
+            max(0, self.cbo_codec.findData(self.current_settings.get("backup_codec", DEFAULT_CODEC)))
+        )
+        self.cbo_codec.currentIndexChanged.connect(self.on_codec_changed)
+
+        self.spin_level = QtWidgets.QSpinBox()
+        self.spin_level.setValue(self.current_settings.get("backup_level", DEFAULT_LEVEL))
+        self.spin_level.valueChanged.connect(lambda v: self.settings.update("backup_level", v))
+        self.on_codec_changed()
+
+        h_codec = QtWidgets.QHBoxLayout()
+        h_codec.addWidget(self.cbo_codec)
+        h_codec.addWidget(QtWidgets.QLabel("المستوى:"))
+        h_codec.addWidget(self.spin_level)
+        h_codec.addStretch()
+        form.addRow("🗜 الضغط:", h_codec)
+
+        lbl_space = QtWidgets.QLabel(
+            "النسخ الكامل يحتاج مساحة مؤقتة بحجم قاعدة البيانات في مجلد البرنامج "
+            "(snapshot قبل الضغط) + حجم الأرشيف في مجلد النسخ."
+        )
+        lbl_space.setStyleSheet("color: gray;")
+        lbl_space.setWordWrap(True)
+        form.addRow("", lbl_space)
+
+        # ------------------- سياسة الاحتفاظ (التزايدي) -------------------
+        self.spin_keep_last = QtWidgets.QSpinBox()
+        self.spin_keep_last.setRange(1, 1000)
+        self.spin_keep_last.setValue(self.current_settings.get("backup_keep_last", 24))
+        self.spin_keep_last.valueChanged.connect(lambda v: self.settings.update("backup_keep_last", v))
+
+        self.spin_keep_days = QtWidgets.QSpinBox()
+        self.spin_keep_days.setRange(0, 3650)
+        self.spin_keep_days.setValue(self.current_settings.get("backup_keep_days", 30))
+        self.spin_keep_days.valueChanged.connect(lambda v: self.settings.update("backup_keep_days", v))
+
+        h_keep = QtWidgets.QHBoxLayout()
+        h_keep.addWidget(QtWidgets.QLabel("آخر"))
+        h_keep.addWidget(self.spin_keep_last)
+        h_keep.addWidget(QtWidgets.QLabel("نسخة + نسخة يومية لآخر"))
+        h_keep.addWidget(self.spin_keep_days)
+        h_keep.addWidget(QtWidgets.QLabel("يوم"))
+        h_keep.addStretch()
+        form.addRow("🗂 الاحتفاظ:", h_keep)
+
         layout.addLayout(form)
 
         # ------------------- زر النسخ اليدوي -------------------
@@ -67,8 +135,74 @@ class BackupPage(QtWidgets.QWidget):
         btn_manual.clicked.connect(self.manual_backup)
         layout.addWidget(btn_manual)
 
+        # ------------------- النسخ التزايدية -------------------
+        store_box = QtWidgets.QGroupBox("📦 النسخ التزايدية")
+        store_layout = QtWidgets.QVBoxLayout(store_box)
+
+        self.lbl_usage = QtWidgets.QLabel()
+        store_layout.addWidget(self.lbl_usage)
+
+        self.tbl_snapshots = QtWidgets.QTableWidget()
+        self.tbl_snapshots.setColumnCount(4)
+        self.tbl_snapshots.setHorizontalHeaderLabels(["التاريخ", "الحجم", "بيانات جديدة", "الزمن"])
+        self.tbl_snapshots.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.tbl_snapshots.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tbl_snapshots.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        store_layout.addWidget(self.tbl_snapshots)
+
+        h_store = QtWidgets.QHBoxLayout()
+        btn_refresh = QtWidgets.QPushButton("🔄 تحديث")
+        btn_refresh.clicked.connect(self.load_store)
+        btn_extract = QtWidgets.QPushButton("📤 استخراج النسخة المحددة")
+        btn_extract.clicked.connect(self.extract_snapshot)
+        btn_prune = QtWidgets.QPushButton("🧹 تطبيق سياسة الاحتفاظ")
+        btn_prune.clicked.connect(self.prune_store)
+        btn_restore_snapshot = QtWidgets.QPushButton("♻️ استعادة النسخة المحددة")
+        btn_restore_snapshot.clicked.connect(self.restore_snapshot)
+        h_store.addWidget(btn_refresh)
+        h_store.addWidget(btn_extract)
+        h_store.addWidget(btn_prune)
+        h_store.addWidget(btn_restore_snapshot)
+        h_store.addStretch()
+        store_layout.addLayout(h_store)
+
+        layout.addWidget(store_box)
+
+        # ------------------- الاستعادة -------------------
+        restore_box = QtWidgets.QGroupBox("♻️ الاستعادة")
+        restore_layout = QtWidgets.QVBoxLayout(restore_box)
+
+        restore_layout.addWidget(QtWidgets.QLabel(
+            "لاستعادة جداول محددة فقط اخترها من القائمة — بدون تحديد = استعادة كاملة لقاعدة البيانات"
+        ))
+
+        self.lst_tables = QtWidgets.QListWidget()
+        self.lst_tables.setFlow(QtWidgets.QListView.LeftToRight)
+        self.lst_tables.setFixedHeight(40)
+        for table, label in PARTIAL_TABLES.items():
+            item = QtWidgets.QListWidgetItem(label)
+            item.setData(QtCore.Qt.UserRole, table)
+            item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+            item.setCheckState(QtCore.Qt.Unchecked)
+            self.lst_tables.addItem(item)
+        restore_layout.addWidget(self.lst_tables)
+
+        btn_restore_file = QtWidgets.QPushButton("📂 استعادة من ملف...")
+        btn_restore_file.clicked.connect(self.restore_file)
+        restore_layout.addWidget(btn_restore_file)
+
+        layout.addWidget(restore_box)
+
         layout.addStretch()
 
+    # ============================================================
+    def on_codec_changed(self):
+        codec = self.cbo_codec.currentData()
+        low, high = CODEC_LEVELS[codec]
+        self.spin_level.setRange(low, high)
+        self.spin_level.setEnabled(low != high)
+        self.settings.update("backup_codec", codec)
+
     # ============================================================
     def change_backup_path(self):
         path = QtWidgets.QFileDialog.getExistingDirectory(self, "اختر مجلد النسخ الاحتياطي")
@@ -76,40 +210,181 @@ class BackupPage(QtWidgets.QWidget):
             self.current_settings["backup_path"] = path
             self.lbl_path.setText(path)
             self.settings.update("backup_path", path)
+            self.load_store()
 
     # ============================================================
     def manual_backup(self):
-        """إنشاء نسخة احتياطية الآن — يدوي"""
+        """إنشاء نسخة احتياطية الآن — يدوي (في الخلفية)"""
+        path = self.current_settings.get("backup_path", "")
+        if not path:
+            QtWidgets.QMessageBox.warning(self, "خطأ", "لم يتم تحديد مسار النسخ الاحتياطي.")
+            return
+
+        incremental = self.cbo_mode.currentData() == "incremental"
+
         try:
-            path = self.current_settings.get("backup_path", "")
-            if not path:
-                QtWidgets.QMessageBox.warning(self, "خطأ", "لم يتم تحديد مسار النسخ الاحتياطي.")
-                return
+            # snapshot متسق عبر Backup API ثم zip مع الإعدادات والفواتير
+            # أو (تزايدي) الأجزاء المتغيرة فقط داخل ChunkStore
+            job = submit_backup(
+                path, archive=not incremental, incremental=incremental,
+                user="النظام", action="نسخ يدوي",
+            )
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر إنشاء النسخة:\n{e}")
+            return
+
+        job.then(
+            lambda result: QtWidgets.QMessageBox.information(
+                self, "✔ نجاح", f"تم إنشاء النسخة الاحتياطية بنجاح.\n{describe(result)}"
+            ),
+            lambda error: QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر إنشاء النسخة:\n{error}"),
+        )
+        job.finished.connect(lambda *_: self.load_store())
 
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"backup_{timestamp}.zip"
-            backup_file = os.path.join(path, filename)
+    # ============================================================
+    # INCREMENTAL STORE (المساحة + النسخ + الاستخراج + الاحتفاظ)
+    # ============================================================
+    def store(self):
+        path = self.current_settings.get("backup_path", "")
+        return chunk_store(path) if path else None
+
+    @staticmethod
+    def read_store(store):
+        # على thread القراءة — قوائم الأجزاء لا نحتاجها في الجدول
+        snapshots = [
+            {k: m[k] for k in ("name", "path", "created", "size", "page_size", "new_bytes", "seconds")}
+            for m in store.manifests()
+        ]
+        return snapshots, store.usage()
+
+    def load_store(self):
+        store = self.store()
+        if store is None:
+            self.lbl_usage.setText("لم يتم تحديد مسار النسخ الاحتياطي.")
+            self.tbl_snapshots.setRowCount(0)
+            return
+
+        query_executor.submit(self.read_store, store, group="backup_store").then(self.show_store)
 
-            with zipfile.ZipFile(backup_file, "w", zipfile.ZIP_DEFLATED) as zipf:
-                if os.path.exists("database.db"):
-                    zipf.write("database.db")
+    def show_store(self, data):
+        snapshots, usage = data
 
-                if os.path.exists("settings.json"):
-                    zipf.write("settings.json")
+        self.lbl_usage.setText(
+            f"عدد النسخ: {usage['backups']}   —   الحجم الكلي لو كانت كاملة: {_mb(usage['logical_bytes'])}"
+            f"   —   المساحة الفعلية: {_mb(usage['stored_bytes'])}"
+            f"   —   تم توفير: {_mb(usage['saved_bytes'])}"
+        )
 
-                # تضمين جميع الفواتير
-                if os.path.exists("invoices"):
-                    for root, _, files in os.walk("invoices"):
-                        for f in files:
-                            full = os.path.join(root, f)
-                            arc = os.path.relpath(full, "invoices")
-                            zipf.write(full, f"invoices/{arc}")
+        self.snapshots = list(reversed(snapshots))      # الأحدث أولاً
+        self.tbl_snapshots.setRowCount(len(self.snapshots))
+        for i, m in enumerate(self.snapshots):
+            values = [m["created"].replace("T", " "), _mb(m["size"]), _mb(m["new_bytes"]), f"{m['seconds']:.1f}s"]
+            for j, value in enumerate(values):
+                self.tbl_snapshots.setItem(i, j, QtWidgets.QTableWidgetItem(value))
 
-            QtWidgets.QMessageBox.information(self, "✔ نجاح", "تم إنشاء النسخة الاحتياطية بنجاح.")
-            global_signals.data_changed.emit()
+    def extract_snapshot(self):
+        """إعادة بناء النسخة المحددة كملف .db كامل"""
+        row = self.tbl_snapshots.currentRow()
+        store = self.store()
+        if row < 0 or store is None:
+            QtWidgets.QMessageBox.warning(self, "خطأ", "اختر نسخة من الجدول أولاً.")
+            return
 
+        snapshot = self.snapshots[row]
+        dst, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "حفظ النسخة", f"{snapshot['name']}.db", "DB Files (*.db)"
+        )
+        if not dst:
+            return
+
+        backup_jobs.submit(
+            f"استخراج — {snapshot['name']}", store.restore, snapshot["name"], dst,
+            total=snapshot["size"] // snapshot["page_size"],
+        ).then(
+            lambda result: QtWidgets.QMessageBox.information(self, "✔", f"تم استخراج النسخة:\n{describe(result)}"),
+            lambda error: QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر استخراج النسخة:\n{error}"),
+        )
+
+    def prune_store(self):
+        store = self.store()
+        if store is None:
+            return
+
+        # في طابور النسخ حتى لا يعمل بالتوازي مع نسخة جارية
+        backup_jobs.submit(
+            "تطبيق سياسة الاحتفاظ", store.prune,
+            self.spin_keep_last.value(), self.spin_keep_days.value(),
+        ).then(
+            lambda result: (
+                QtWidgets.QMessageBox.information(
+                    self, "✔", f"تم حذف {result['removed']} نسخة — تم تحرير {_mb(result['freed_bytes'])}"
+                ),
+                self.load_store(),
+            ),
+            lambda error: QtWidgets.QMessageBox.warning(self, "خطأ", error),
+        )
+
+    # ============================================================
+    # RESTORE (كاملة أو جداول محددة)
+    # ============================================================
+    def selected_tables(self):
+        return [
+            self.lst_tables.item(i).data(QtCore.Qt.UserRole)
+            for i in range(self.lst_tables.count())
+            if self.lst_tables.item(i).checkState() == QtCore.Qt.Checked
+        ]
+
+    def restore_file(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "اختر النسخة الاحتياطية", self.current_settings.get("backup_path", ""),
+            "Backups (*.zip *.db)"
+        )
+        if path:
+            self.restore(path)
+
+    def restore_snapshot(self):
+        row = self.tbl_snapshots.currentRow()
+        if row < 0:
+            QtWidgets.QMessageBox.warning(self, "خطأ", "اختر نسخة من الجدول أولاً.")
+            return
+        self.restore(self.snapshots[row]["path"])
+
+    def restore(self, path):
+        tables = self.selected_tables()
+        if tables:
+            question = "سيتم استبدال محتوى الجداول:\n" + "، ".join(PARTIAL_TABLES[t] for t in tables)
+        else:
+            question = (
+                "سيتم استبدال قاعدة البيانات الحالية بالكامل بهذه النسخة.\n"
+                "(قاعدة البيانات الحالية تُحفظ باسم database.db.pre_restore)"
+            )
+
+        reply = QtWidgets.QMessageBox.question(self, "تأكيد الاستعادة", f"{question}\n\nمتابعة؟")
+        if reply != QtWidgets.QMessageBox.Yes:
+            return
+
+        # الفحص (quick_check) والتجهيز في الخلفية — البرنامج يعمل عادي حتى التبديل
+        job = submit_restore(path, tables)
+        job.then(
+            self.restore_partial_done if tables else self.restore_ready,
+            lambda error: QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر استعادة النسخة:\n{error}"),
+        )
+
+    def restore_partial_done(self, result):
+        QtWidgets.QMessageBox.information(self, "✔", f"تمت الاستعادة:\n{describe_restore(result)}")
+
+    def restore_ready(self, result):
+        try:
+            complete_restore(result)
         except Exception as e:
-            QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر إنشاء النسخة:\n{e}")
+            QtWidgets.QMessageBox.warning(self, "خطأ", f"تعذر تبديل قاعدة البيانات:\n{e}")
+            return
+
+        QtWidgets.QMessageBox.information(
+            self, "✔",
+            f"تمت استعادة النسخة.\n{describe_restore(result)}\n\n"
+            "أعد تشغيل البرنامج لتحديث كل الشاشات المفتوحة."
+        )
 
     # ============================================================
     # AUTO BACKUP SCHEDULER
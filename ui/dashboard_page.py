@@ -2,10 +2,16 @@
 
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
-from ui.global_signals import global_signals
+from utils.query_executor import query_executor
+from utils.global_signals import global_signals
 
 
 class DashboardPage(QtWidgets.QWidget):
+    WATCHED_TABLES = (
+        "items", "warehouses", "suppliers", "customers",
+        "sales_invoices", "purchase_invoices",
+    )
+
     def __init__(self, permissions):
         super().__init__()
 
@@ -17,8 +23,8 @@ class DashboardPage(QtWidgets.QWidget):
         self.build_ui()
         self.load_data()
 
-        # تحديث تلقائي
-        global_signals.data_changed.connect(self.load_data)
+        # تحديث تلقائي — فقط عند تغيير الجداول المعروضة في الكروت
+        global_signals.subscribe(self.WATCHED_TABLES, lambda events: self.load_data())
 
     # =============================================================
     def build_ui(self):
@@ -100,27 +106,22 @@ class DashboardPage(QtWidgets.QWidget):
 
     # =============================================================
     def load_data(self):
-        items = self.db.get_items()
-        low = [i for i in items if i["quantity"] <= i["min_quantity"]]
-
-        warehouses = self.db.get_warehouses()
-        suppliers = self.db.get_suppliers()
-        customers = self.db.get_customers()
+        # الاستعلامات في الخلفية — طلب جديد يلغي الجاري (نتيجته قد تكون قبل آخر تغيير)
+        query_executor.submit(self.db.dashboard_snapshot, group="dashboard").then(self.show_data)
 
-        sales = self.db.get_sales_invoices()
-        purchases = self.db.get_purchase_invoices()
+    def show_data(self, snapshot):
+        counts = snapshot["counts"]
 
-        self.lbl_items.setText(str(len(items)))
-        self.lbl_low.setText(str(len(low)))
-        self.lbl_wh.setText(str(len(warehouses)))
-        self.lbl_sup.setText(str(len(suppliers)))
-        self.lbl_cus.setText(str(len(customers)))
-        self.lbl_sales.setText(str(len(sales)))
-        self.lbl_purch.setText(str(len(purchases)))
+        self.lbl_items.setText(str(counts["items"]))
+        self.lbl_low.setText(str(counts["low_stock"]))
+        self.lbl_wh.setText(str(counts["warehouses"]))
+        self.lbl_sup.setText(str(counts["suppliers"]))
+        self.lbl_cus.setText(str(counts["customers"]))
+        self.lbl_sales.setText(str(counts["sales"]))
+        self.lbl_purch.setText(str(counts["purchases"]))
 
         # Recent
-        all_ops = sales + purchases
-        all_ops_sorted = sorted(all_ops, key=lambda x: x["id"], reverse=True)[:10]
+        all_ops_sorted = snapshot["recent"]
 
         self.table_recent.setRowCount(len(all_ops_sorted))
 
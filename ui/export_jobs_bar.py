@@ -0,0 +1,93 @@
+# ui/export_jobs_bar.py
+
+from PyQt5 import QtWidgets
+
+from utils.export_jobs import export_jobs
+
+
+class ExportJobsBar(QtWidgets.QWidget):
+    """
+    شريط التصدير في أسفل النافذة الرئيسية:
+    التصدير الجاري + عدد الصفوف المكتوبة + إلغاء + عدد التصديرات المنتظرة.
+    يختفي تلقائياً لما يخلص الطابور.
+    """
+
+    def __init__(self, status_bar, manager=export_jobs):
+        super().__init__()
+
+        self.status_bar = status_bar
+        self.manager = manager
+        self.current = None
+
+        layout = QtWidgets.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.label = QtWidgets.QLabel()
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setFixedWidth(220)
+        self.queued = QtWidgets.QLabel()
+        self.queued.setStyleSheet("color: gray;")
+
+        self.btn_cancel = QtWidgets.QPushButton("✖ إلغاء")
+        self.btn_cancel.clicked.connect(self.cancel)
+
+        layout.addWidget(self.label)
+        layout.addWidget(self.progress)
+        layout.addWidget(self.queued)
+        layout.addWidget(self.btn_cancel)
+
+        self.manager.job_added.connect(self.on_job_added)
+        self.hide()
+
+    # ============================================================
+    def on_job_added(self, job):
+        job.started.connect(self.refresh)
+        job.progress.connect(lambda rows, j=job: self.on_progress(j, rows))
+        job.finished.connect(lambda result, j=job: self.on_done(j, f"✔ تم حفظ: {result}"))
+        job.failed.connect(lambda error, j=job: self.on_failed(j, error))
+        job.cancelled.connect(lambda j=job: self.on_done(j, f"تم إلغاء: {j.name}"))
+        self.refresh()
+
+    def on_progress(self, job, rows):
+        if job is not self.current:
+            return
+
+        if job.total:
+            self.progress.setValue(min(rows, job.total))
+            self.progress.setFormat(f"{rows:,} / {job.total:,}")
+        else:
+            self.progress.setFormat(f"{rows:,}")
+
+    def on_done(self, job, message):
+        self.status_bar.showMessage(message, 8000)
+        self.refresh()
+
+    def on_failed(self, job, error):
+        self.refresh()
+        QtWidgets.QMessageBox.warning(self, "خطأ", f"فشل التصدير ({job.name}):\n{error}")
+
+    # ============================================================
+    def refresh(self):
+        jobs = self.manager.jobs()
+        if not jobs:
+            self.current = None
+            self.hide()
+            return
+
+        current = next((j for j in jobs if j.running), jobs[0])
+        if current is not self.current:
+            self.current = current
+            self.label.setText(current.name)
+            # بدون total: مؤشر انتظار متحرك بدل النسبة
+            self.progress.setRange(0, current.total or 0)
+            self.progress.setTextVisible(True)
+            self.on_progress(current, current.rows)
+
+        waiting = len(jobs) - 1
+        self.queued.setText(f"+{waiting} في الانتظار" if waiting else "")
+        self.show()
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.cancel()
+            self.label.setText(f"{self.current.name} — جاري الإلغاء…")
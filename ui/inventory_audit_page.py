@@ -1,7 +1,8 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.export_utils import Exporter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
+from ui.search_controller import SearchController, text_matcher
 
 
 class InventoryAuditPage(QtWidgets.QWidget):
@@ -35,7 +36,11 @@ class InventoryAuditPage(QtWidgets.QWidget):
 
         self.search = QtWidgets.QLineEdit()
         self.search.setPlaceholderText("🔍 بحث عن صنف...")
-        self.search.textChanged.connect(self.filter_table)
+        self.search_ctl = SearchController(
+            self.search, self.show_filtered,
+            source=lambda: self.raw_items,
+            match=text_matcher("name"),
+        )
         filter_layout.addWidget(self.search)
 
         self.filter_box = QtWidgets.QComboBox()
@@ -97,16 +102,14 @@ class InventoryAuditPage(QtWidgets.QWidget):
 
     # ===============================================================
     def filter_table(self):
-        txt = self.search.text().strip().lower()
+        # البحث بالاسم من SearchController ثم فلتر الحالة على النتيجة
+        self.search_ctl.refresh()
+
+    def show_filtered(self, items):
         status_filter = self.filter_box.currentText()
 
         filtered = []
-        for item in self.raw_items:
-            name = item["name"].lower()
-
-            if txt and txt not in name:
-                continue
-
+        for item in items:
             diff = item["actual_qty"] - item["system_qty"]
 
             if status_filter == "مطابق" and diff != 0:
@@ -187,16 +190,21 @@ class InventoryAuditPage(QtWidgets.QWidget):
         if confirm != QtWidgets.QMessageBox.Yes:
             return
 
+        adjusted = []
         for item in self.raw_items:
             item_id = item["id"]
             actual = item["actual_qty"]
             system = item["system_qty"]
 
             if actual != system:
-                self.db.update_item_quantity(item_id, actual)
+                self.db.update_item_quantity(item_id, actual, self.username)
                 self.db.log_audit_adjustment(self.username, item_id, system, actual)
+                adjusted.append(item_id)
 
-        global_signals.data_changed.emit()
+        if adjusted:
+            global_signals.notify("items", ChangeEvent.UPDATE, adjusted)
+            global_signals.notify("stock_ledger", ChangeEvent.INSERT)
+            global_signals.notify("activity_log", ChangeEvent.INSERT)
 
         QtWidgets.QMessageBox.information(self, "✔", "تم تطبيق الجرد بنجاح.")
 
@@ -1,6 +1,6 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
 
 
 class InvoicePage(QtWidgets.QWidget):
@@ -195,7 +195,8 @@ class InvoicePage(QtWidgets.QWidget):
 
         self.db.add_invoice(customer, self.username, invoice_items, self.current_total)
 
-        global_signals.data_changed.emit()
+        global_signals.notify("sales_invoices", ChangeEvent.INSERT)
+        global_signals.notify("sales_items", ChangeEvent.INSERT)
 
         QtWidgets.QMessageBox.information(self, "✔", "تم حفظ الفاتورة بنجاح.")
 
@@ -1,7 +1,10 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 from utils.db_manager import DatabaseManager
+from utils.query_executor import query_executor
 from utils.report_utils import ReportUtils
+from ui.table_models import RowBufferModel
+from ui.search_controller import SearchController, text_matcher
 
 
 class ItemsPage(QtWidgets.QWidget):
@@ -39,7 +42,13 @@ class ItemsPage(QtWidgets.QWidget):
         # البحث
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("بحث... (الاسم، كود الصنف، المخزن)")
-        self.search_box.textChanged.connect(self.apply_filters)
+        self.search_ctl = SearchController(
+            self.search_box, self.show_filtered,
+            source=lambda: self.items,
+            match=text_matcher("name", "sku", "warehouse"),
+            fetch=self.search_items,
+            executor=query_executor, group="items_search",
+        )
 
         # فلترة بالمخزن
         self.wh_filter = QtWidgets.QComboBox()
@@ -75,12 +84,19 @@ class ItemsPage(QtWidgets.QWidget):
         layout.addLayout(filter_layout)
 
         # ---------------- TABLE ----------------
-        self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(
-            ["ID", "الاسم", "الكود", "الكمية", "الحد الأدنى", "المخزن"]
+        self.model = RowBufferModel([
+            ("id", "ID"), ("name", "الاسم"), ("sku", "الكود"),
+            ("quantity", "الكمية"), ("min_quantity", "الحد الأدنى"), ("warehouse", "المخزن"),
+        ])
+
+        # لون للحد الأدنى
+        self.model.row_background = (
+            lambda row: "#FFCCCC" if row["quantity"] <= row["min_quantity"] else None
         )
 
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
 
@@ -97,43 +113,35 @@ class ItemsPage(QtWidgets.QWidget):
     # ===============================================================
     def load_items(self):
         self.items = self.db.get_items()
-        self.refresh_table(self.items)
+        self.apply_filters()
 
     # ===============================================================
     def refresh_table(self, data):
-        self.table.setRowCount(len(data))
-
-        for i, row in enumerate(data):
-            self.table.setItem(i, 0, QtWidgets.QTableWidgetItem(str(row["id"])))
-            self.table.setItem(i, 1, QtWidgets.QTableWidgetItem(row["name"]))
-            self.table.setItem(i, 2, QtWidgets.QTableWidgetItem(row["sku"]))
-            self.table.setItem(i, 3, QtWidgets.QTableWidgetItem(str(row["quantity"])))
-            self.table.setItem(i, 4, QtWidgets.QTableWidgetItem(str(row["min_quantity"])))
-            self.table.setItem(i, 5, QtWidgets.QTableWidgetItem(row["warehouse"]))
-
-            # لون للحد الأدنى
-            if row["quantity"] <= row["min_quantity"]:
-                for col in range(6):
-                    self.table.item(i, col).setBackground(QtGui.QColor("#FFCCCC"))
+        # الموديل يعرض الصفوف تدريجياً مع التمرير
+        self.model.set_rows(data)
 
     # ===============================================================
     # FILTERS
     # ===============================================================
     def apply_filters(self):
-        search = self.search_box.text().strip()
+        # البحث النصي من SearchController ثم فلاتر المخزن/المخزون على النتيجة
+        self.search_ctl.refresh()
+
+    def search_items(self, search):
+        # الاسم / الكود من فهرس البحث (يتجاهل اختلاف الهمزات والتشكيل)
+        matched = set(self.db.search_ids("items", search))
+        return [
+            item for item in self.items
+            if item["id"] in matched or search in (item["warehouse"] or "")
+        ]
+
+    def show_filtered(self, items):
         wh = self.wh_filter.currentText()
         low_only = self.low_stock_check.isChecked()
 
         filtered = []
 
-        for item in self.items:
-
-            # البحث
-            if search:
-                if (search not in item["name"] and
-                        search not in item["sku"] and
-                        search not in item["warehouse"]):
-                    continue
+        for item in items:
 
             # المخزن
             if wh != "كل المخازن" and item["warehouse"] != wh:
@@ -151,42 +159,42 @@ class ItemsPage(QtWidgets.QWidget):
     # EXPORT PDF
     # ===============================================================
     def export_pdf(self):
-        items = self.collect_current_table()
-        if not items:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا توجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_pdf(
-            data_list=items,
+        self.reporter.export_pdf(
+            data_list=None,
+            query=self.export_query(),
             columns=["id", "name", "sku", "quantity", "min_quantity", "warehouse"],
             filename="items_report",
             report_title="Items Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء PDF:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء PDF:\n{file_path}")
-
     # ===============================================================
     # EXPORT EXCEL
     # ===============================================================
     def export_excel(self):
-        items = self.collect_current_table()
-        if not items:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا توجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_excel(
-            data_list=items,
+        self.reporter.export_excel(
+            data_list=None,
+            query=self.export_query(),
             columns=["id", "name", "sku", "quantity", "min_quantity", "warehouse"],
             filename="items_report",
             report_title="Items Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ Excel:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ Excel:\n{file_path}")
-
     # ===============================================================
     # PRINT
     # ===============================================================
@@ -194,24 +202,16 @@ class ItemsPage(QtWidgets.QWidget):
         self.reporter.print_report(self.table)
 
     # ===============================================================
-    # Collect Data from Table
+    # Export Query (نفس فلاتر الجدول المعروض)
     # ===============================================================
-    def collect_current_table(self):
-        rows = self.table.rowCount()
-        cols = self.table.columnCount()
-
-        headers = ["id", "name", "sku", "quantity", "min_quantity", "warehouse"]
-
-        data = []
-
-        for r in range(rows):
-            entry = {}
-            for c in range(cols):
-                item = self.table.item(r, c)
-                entry[headers[c]] = item.text() if item else ""
-            data.append(entry)
-
-        return data
+    def export_query(self):
+        wh = self.wh_filter.currentText()
+        return ("items", {
+            "text": self.search_ctl.text(),
+            "search_warehouse": True,
+            "warehouse": wh if wh != "كل المخازن" else None,
+            "low_stock": self.low_stock_check.isChecked(),
+        })
 
     # ===============================================================
     # ADD ITEM (Dialog)
@@ -256,6 +256,10 @@ class ItemsPage(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "⚠", "اسم الصنف مطلوب")
             return
 
+        if sku.text().strip() and self.db.get_item_by_sku(sku.text()):
+            QtWidgets.QMessageBox.warning(self, "⚠", "كود الصنف مستخدم لصنف آخر")
+            return
+
         wh_id = wh_box.currentData()
 
         self.db.add_item(
@@ -17,6 +17,8 @@ from ui.purchases_page import PurchasesPage
 from ui.sales_viewer import SalesViewer
 from ui.purchases_viewer import PurchasesViewer
 from ui.profit_analytics_page import ProfitAnalyticsPage
+from ui.export_jobs_bar import ExportJobsBar
+from utils.backup_manager import backup_jobs
 
 from utils.global_signals import global_signals
 
@@ -54,6 +56,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setCentralWidget(main)
         self.load_pages()
 
+        # ----------- التصدير في الخلفية (تقدم + إلغاء) -----------
+        self.export_bar = ExportJobsBar(self.statusBar())
+        self.statusBar().addPermanentWidget(self.export_bar)
+
+        # النسخ الاحتياطي له طابور مستقل بنفس الشريط
+        self.backup_bar = ExportJobsBar(self.statusBar(), backup_jobs)
+        self.statusBar().addPermanentWidget(self.backup_bar)
+
     # ============================================================
     def build_menu(self):
         menu = QtWidgets.QFrame()
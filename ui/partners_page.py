@@ -2,6 +2,8 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 
 from utils.db_manager import DatabaseManager
 from utils.report_utils import ReportUtils
+from utils.query_executor import query_executor
+from ui.search_controller import SearchController, text_matcher
 
 
 class PartnersPage(QtWidgets.QWidget):
@@ -60,7 +62,13 @@ class PartnersPage(QtWidgets.QWidget):
         # Search bar
         self.sup_search = QtWidgets.QLineEdit()
         self.sup_search.setPlaceholderText("بحث...")
-        self.sup_search.textChanged.connect(self.filter_suppliers)
+        self.sup_search_ctl = SearchController(
+            self.sup_search, self.refresh_suppliers,
+            source=lambda: self.suppliers,
+            match=text_matcher("name", "phone", "address"),
+            fetch=lambda text: self.db.search("suppliers", text, limit=None),
+            executor=query_executor, group="suppliers_search",
+        )
         bar.addWidget(self.sup_search)
 
         bar.addStretch()
@@ -105,7 +113,13 @@ class PartnersPage(QtWidgets.QWidget):
         # Search bar
         self.cus_search = QtWidgets.QLineEdit()
         self.cus_search.setPlaceholderText("بحث...")
-        self.cus_search.textChanged.connect(self.filter_customers)
+        self.cus_search_ctl = SearchController(
+            self.cus_search, self.refresh_customers,
+            source=lambda: self.customers,
+            match=text_matcher("name", "phone", "address"),
+            fetch=lambda text: self.db.search("customers", text, limit=None),
+            executor=query_executor, group="customers_search",
+        )
         bar.addWidget(self.cus_search)
 
         bar.addStretch()
@@ -144,11 +158,11 @@ class PartnersPage(QtWidgets.QWidget):
     # ===============================================================
     def load_suppliers(self):
         self.suppliers = self.db.get_suppliers()
-        self.refresh_suppliers(self.suppliers)
+        self.filter_suppliers()
 
     def load_customers(self):
         self.customers = self.db.get_customers()
-        self.refresh_customers(self.customers)
+        self.filter_customers()
 
     # ===============================================================
     def refresh_suppliers(self, data):
@@ -173,59 +187,49 @@ class PartnersPage(QtWidgets.QWidget):
     # FILTER
     # ===============================================================
     def filter_suppliers(self):
-        text = self.sup_search.text().strip()
-        filtered = []
-
-        for row in self.suppliers:
-            if text in row["name"] or text in row["phone"] or text in row["address"]:
-                filtered.append(row)
-
-        self.refresh_suppliers(filtered)
+        self.sup_search_ctl.refresh()
 
     def filter_customers(self):
-        text = self.cus_search.text().strip()
-        filtered = []
-
-        for row in self.customers:
-            if text in row["name"] or text in row["phone"] or text in row["address"]:
-                filtered.append(row)
-
-        self.refresh_customers(filtered)
+        self.cus_search_ctl.refresh()
 
     # ===============================================================
     # EXPORT SUPPLIERS
     # ===============================================================
     def export_suppliers_pdf(self):
-        data = self.table_to_list(self.sup_table, ["id", "name", "phone", "address"])
-        if not data:
+        if not self.sup_table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا يوجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_pdf(
-            data_list=data,
+        self.reporter.export_pdf(
+            data_list=None,
+            query=("suppliers", {"text": self.sup_search_ctl.text()}),
+            total=self.sup_table.rowCount(),
             columns=["id", "name", "phone", "address"],
             filename="suppliers_report",
             report_title="Suppliers Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{path}")
         )
-        QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{file_path}")
 
     def export_suppliers_excel(self):
-        data = self.table_to_list(self.sup_table, ["id", "name", "phone", "address"])
-        if not data:
+        if not self.sup_table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا يوجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_excel(
-            data_list=data,
+        self.reporter.export_excel(
+            data_list=None,
+            query=("suppliers", {"text": self.sup_search_ctl.text()}),
+            total=self.sup_table.rowCount(),
             columns=["id", "name", "phone", "address"],
             filename="suppliers_report",
             report_title="Suppliers Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{path}")
         )
-        QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{file_path}")
 
     def print_suppliers(self):
         self.reporter.print_report(self.sup_table)
@@ -234,58 +238,44 @@ class PartnersPage(QtWidgets.QWidget):
     # EXPORT CUSTOMERS
     # ===============================================================
     def export_customers_pdf(self):
-        data = self.table_to_list(self.cus_table, ["id", "name", "phone", "address"])
-        if not data:
+        if not self.cus_table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا يوجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_pdf(
-            data_list=data,
+        self.reporter.export_pdf(
+            data_list=None,
+            query=("customers", {"text": self.cus_search_ctl.text()}),
+            total=self.cus_table.rowCount(),
             columns=["id", "name", "phone", "address"],
             filename="customers_report",
             report_title="Customers Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{path}")
         )
-        QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{file_path}")
 
     def export_customers_excel(self):
-        data = self.table_to_list(self.cus_table, ["id", "name", "phone", "address"])
-        if not data:
+        if not self.cus_table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا يوجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_excel(
-            data_list=data,
+        self.reporter.export_excel(
+            data_list=None,
+            query=("customers", {"text": self.cus_search_ctl.text()}),
+            total=self.cus_table.rowCount(),
             columns=["id", "name", "phone", "address"],
             filename="customers_report",
             report_title="Customers Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{path}")
         )
-        QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{file_path}")
 
     def print_customers(self):
         self.reporter.print_report(self.cus_table)
 
-    # ===============================================================
-    # Utility: Convert table to list of dicts
-    # ===============================================================
-    def table_to_list(self, table, headers):
-        data = []
-
-        rows = table.rowCount()
-        cols = table.columnCount()
-
-        for r in range(rows):
-            entry = {}
-            for c in range(cols):
-                item = table.item(r, c)
-                entry[headers[c]] = item.text() if item else ""
-            data.append(entry)
-
-        return data
-
     # ===============================================================
     # ADD SUPPLIER
     # ===============================================================
@@ -1,7 +1,9 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
-from utils.export_utils import Exporter
-from ui.global_signals import global_signals
+from utils.report_utils import ReportUtils
+from utils.global_signals import global_signals, ChangeEvent
+from utils.query_executor import query_executor
+from ui.search_controller import SearchController, text_matcher
 
 
 class PriceListPage(QtWidgets.QWidget):
@@ -9,13 +11,14 @@ class PriceListPage(QtWidgets.QWidget):
         super().__init__()
 
         self.db = DatabaseManager()
+        self.reporter = ReportUtils()
         self.permissions = permissions
         self.data = []
 
         self.build_ui()
         self.load_prices()
 
-        global_signals.data_changed.connect(self.load_prices)
+        global_signals.subscribe(("items",), self.on_items_changed)
 
     # ======================================================================
     def build_ui(self):
@@ -39,7 +42,13 @@ class PriceListPage(QtWidgets.QWidget):
         search_box = QtWidgets.QHBoxLayout()
         self.txt_search = QtWidgets.QLineEdit()
         self.txt_search.setPlaceholderText("بحث عن صنف...")
-        self.txt_search.textChanged.connect(self.filter_search)
+        self.search_ctl = SearchController(
+            self.txt_search, self.fill_table,
+            source=lambda: self.data,
+            match=text_matcher("name"),
+            fetch=self.search_prices,
+            executor=query_executor, group="price_list_search",
+        )
 
         search_box.addWidget(QtWidgets.QLabel("بحث:"))
         search_box.addWidget(self.txt_search)
@@ -91,7 +100,30 @@ class PriceListPage(QtWidgets.QWidget):
                 i["sell_price"] = 0
 
         self.data = items
-        self.fill_table(items)
+        self.search_ctl.refresh()
+
+    def on_items_changed(self, events):
+        # تعديل أسعار/بيانات أصناف معروفة → تحديث صفوفها فقط
+        if all(e.op == ChangeEvent.UPDATE and e.ids is not None for e in events):
+            ids = set().union(*(e.ids for e in events))
+            self.update_rows(self.db.get_items(ids))
+        else:
+            self.load_prices()
+
+    def update_rows(self, items):
+        by_id = {i["id"]: i for i in items}
+        self.data = [by_id.get(i["id"], i) for i in self.data]
+        self.search_ctl.invalidate()
+
+        self.table.blockSignals(True)
+        for r in range(self.table.rowCount()):
+            item = by_id.get(int(self.table.item(r, 0).text()))
+            if item is None:
+                continue
+            self.table.item(r, 1).setText(item["name"])
+            self.table.item(r, 3).setText(str(item["buy_price"]))
+            self.table.item(r, 4).setText(str(item["sell_price"]))
+        self.table.blockSignals(False)
 
     # ======================================================================
     def fill_table(self, data):
@@ -118,10 +150,9 @@ class PriceListPage(QtWidgets.QWidget):
         self.table.resizeColumnsToContents()
 
     # ======================================================================
-    def filter_search(self):
-        text = self.txt_search.text().strip()
-        filtered = [i for i in self.data if text in i["name"]]
-        self.fill_table(filtered)
+    def search_prices(self, text):
+        matched = set(self.db.search_ids("items", text))
+        return [i for i in self.data if i["id"] in matched]
 
     # ======================================================================
     def edit_price(self, item):
@@ -154,25 +185,44 @@ class PriceListPage(QtWidgets.QWidget):
             self.db.add_log("admin", "تعديل سعر بيع", "price_list",
                             f"item {item_id}: sell -> {new_price}")
 
-        global_signals.data_changed.emit()
+        global_signals.notify("items", ChangeEvent.UPDATE, [item_id])
+        global_signals.notify("activity_log", ChangeEvent.INSERT)
 
     # ======================================================================
     def export_excel(self):
-        if not self.data:
+        if not self.table.rowCount():
             QtWidgets.QMessageBox.warning(self, "❌", "لا يوجد بيانات")
             return
 
-        Exporter().export_excel(self.data, "Price_List")
-        QtWidgets.QMessageBox.information(self, "✔", "تم التصدير إلى Excel.")
+        self.reporter.export_excel(
+            data_list=None,
+            query=("items", {"text": self.search_ctl.text()}),
+            total=self.table.rowCount(),
+            columns=[("id", "ID"), ("name", "Item"), ("warehouse", "Warehouse"),
+                     ("buy_price", "Buy Price"), ("sell_price", "Sell Price")],
+            filename="price_list",
+            report_title="Price List"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم التصدير إلى Excel:\n{path}")
+        )
 
     # ======================================================================
     def export_pdf(self):
-        if not self.data:
+        if not self.table.rowCount():
             QtWidgets.QMessageBox.warning(self, "❌", "لا يوجد بيانات")
             return
 
-        Exporter().export_pdf(self.data, "Price_List")
-        QtWidgets.QMessageBox.information(self, "✔", "تم إنشاء PDF.")
+        self.reporter.export_pdf(
+            data_list=None,
+            query=("items", {"text": self.search_ctl.text()}),
+            total=self.table.rowCount(),
+            columns=[("id", "ID"), ("name", "Item"), ("warehouse", "Warehouse"),
+                     ("buy_price", "Buy Price"), ("sell_price", "Sell Price")],
+            filename="price_list",
+            report_title="Price List"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء PDF:\n{path}")
+        )
 
     # ======================================================================
     def print_report(self):
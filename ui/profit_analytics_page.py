@@ -1,6 +1,8 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtChart import QChart, QChartView, QBarSeries, QBarSet, QPieSeries, QLineSeries, QBarCategoryAxis, QValueAxis
 from utils.db_manager import DatabaseManager
+from utils.query_executor import query_executor
+from utils.cogs_engine import CostEngine
 from utils.export_utils import Exporter
 from utils.global_signals import global_signals
 
@@ -11,15 +13,20 @@ class ProfitAnalyticsPage(QtWidgets.QWidget):
 
         self.permissions = permissions
         self.db = DatabaseManager()
+        self.costs = CostEngine(self.db)
 
-        self.sales = []
-        self.purchases = []
+        # ملخص الفترة + الأرباح اليومية (مجمعة من SQL)
+        self.summary = {}
+        self.by_day = []
 
         self.build_ui()
         self.load_data()
 
-        # تحديث تلقائي عند تغيير أي بيانات
-        global_signals.data_changed.connect(self.load_data)
+        # تحديث تلقائي عند تغيير الفواتير فقط
+        global_signals.subscribe(
+            ("sales_invoices", "sales_items", "purchase_invoices", "purchase_items"),
+            lambda events: self.load_data()
+        )
 
     # ============================================================
     def build_ui(self):
@@ -115,27 +122,32 @@ class ProfitAnalyticsPage(QtWidgets.QWidget):
 
     # ============================================================
     def load_data(self):
-        self.sales = self.db.get_sales_profit_data()
-        self.purchases = self.db.get_purchase_cost_data()
-
-        self.update_ui()
+        query_executor.submit(self.fetch_data, group="profit").then(self.show_data)
 
     # ============================================================
     def apply_filter(self):
         date_from = self.from_date.date().toString("yyyy-MM-dd")
         date_to = self.to_date.date().toString("yyyy-MM-dd")
 
-        self.sales = self.db.get_sales_profit_data(date_from, date_to)
-        self.purchases = self.db.get_purchase_cost_data(date_from, date_to)
+        query_executor.submit(
+            self.fetch_data, date_from, date_to, group="profit"
+        ).then(self.show_data)
+
+    def fetch_data(self, *dates):
+        # تكلفة سطور البيع الجديدة أولاً (تدريجي — السطور الجديدة فقط)
+        self.costs.process()
+        return self.db.profit_summary(*dates), self.db.profit_by("day", *dates)
 
+    def show_data(self, data):
+        self.summary, self.by_day = data
         self.update_ui()
 
     # ============================================================
     def update_ui(self):
         # ---------- تجميع الأرقام ----------
-        total_sales = sum(s["net_total"] for s in self.sales)
-        total_purchases = sum(p["net_total"] for p in self.purchases)
-        profit = total_sales - total_purchases
+        total_sales = self.summary["revenue"]
+        total_purchases = self.summary["purchases"]
+        profit = self.summary["profit"]
 
         # تحديث الكروت
         self.lbl_total_sales.findChildren(QtWidgets.QLabel)[1].setText(str(total_sales))
@@ -167,10 +179,10 @@ class ProfitAnalyticsPage(QtWidgets.QWidget):
 
     # ============================================================
     def export_pdf(self):
-        Exporter.export_profit_pdf(self.sales, self.purchases)
+        Exporter.export_profit_pdf(self.by_day, self.summary)
         QtWidgets.QMessageBox.information(self, "✔", "تم تصدير PDF بنجاح.")
 
     # ============================================================
     def export_excel(self):
-        Exporter.export_profit_excel(self.sales, self.purchases)
+        Exporter.export_profit_excel(self.by_day, self.summary)
         QtWidgets.QMessageBox.information(self, "✔", "تم تصدير Excel بنجاح.")
@@ -1,10 +1,15 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.invoice_print import InvoicePrinter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
+from utils.query_executor import query_executor
+from ui.search_controller import SearchController, text_matcher
 
 
 class PurchasesEntryPage(QtWidgets.QWidget):
+    # أقصى عدد نتائج للبحث أثناء الكتابة
+    SEARCH_LIMIT = 200
+
     def __init__(self, permissions):
         super().__init__()
 
@@ -46,7 +51,14 @@ class PurchasesEntryPage(QtWidgets.QWidget):
         search_layout = QtWidgets.QHBoxLayout()
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("اكتب اسم الصنف للبحث…")
-        self.search_box.textChanged.connect(self.search_items)
+        self.search_ctl = SearchController(
+            self.search_box, self.refresh_items_table,
+            source=lambda: self.items_list,
+            match=text_matcher("name", "sku"),
+            fetch=lambda text: self.db.search("items", text, limit=self.SEARCH_LIMIT),
+            limit=self.SEARCH_LIMIT,
+            executor=query_executor, group="purchases_entry_search",
+        )
 
         search_layout.addWidget(QtWidgets.QLabel("🔍 بحث:"))
         search_layout.addWidget(self.search_box)
@@ -97,16 +109,6 @@ class PurchasesEntryPage(QtWidgets.QWidget):
         btns.addWidget(self.btn_print)
         layout.addLayout(btns)
 
-    # ===================================================================
-    def search_items(self):
-        text = self.search_box.text().strip()
-        if text == "":
-            self.refresh_items_table(self.items_list)
-            return
-
-        result = [i for i in self.items_list if text in i["name"]]
-        self.refresh_items_table(result)
-
     # ===================================================================
     def refresh_items_table(self, data):
         self.table_items.setRowCount(len(data))
@@ -182,12 +184,15 @@ class PurchasesEntryPage(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "⚠", "اختر المورد.")
             return
 
-        invoice_id = self.db.create_purchase_invoice(supplier_id, self.cart)
+        invoice_id = self.db.commit_purchase_invoice({"supplier_id": supplier_id}, self.cart)
 
         QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ الفاتورة.\nرقم الفاتورة: {invoice_id}")
 
         self.btn_print.setEnabled(True)
-        global_signals.data_changed.emit()
+        global_signals.notify("purchase_invoices", ChangeEvent.INSERT, [invoice_id])
+        global_signals.notify("purchase_items", ChangeEvent.INSERT)
+        global_signals.notify("items", ChangeEvent.UPDATE, [i["id"] for i in self.cart])
+        global_signals.notify("activity_log", ChangeEvent.INSERT)
 
     # ===================================================================
     def print_invoice(self):
@@ -1,6 +1,6 @@
 from PyQt5 import QtWidgets, QtCore
 from utils.db_manager import DatabaseManager
-from utils.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
 
 
 class PurchasesPage(QtWidgets.QWidget):
@@ -138,26 +138,26 @@ class PurchasesPage(QtWidgets.QWidget):
             return
 
         supplier_id = self.supplier_combo.currentData()
-        total = float(self.total_lbl.text())
-        discount = self.discount_input.value()
         net_total = float(self.net_total_lbl.text())
 
-        paid = net_total  # فاتورة كاش
-        remain = 0
-
-        invoice_id = self.db.add_purchase_invoice(
-            supplier_id, total, discount, net_total, paid, remain, self.username
+        lines = [
+            {
+                "item_id": self.table.cellWidget(row, 0).currentData(),
+                "price": self.table.cellWidget(row, 1).value(),
+                "qty": self.table.cellWidget(row, 2).value(),
+            }
+            for row in range(self.table.rowCount())
+        ]
+
+        # الفاتورة + الأصناف + حركات المخزون + السجل في transaction واحدة
+        invoice_id = self.db.commit_purchase_invoice(
+            {"supplier_id": supplier_id, "total": net_total, "user": self.username}, lines
         )
 
-        # حفظ الأصناف
-        for row in range(self.table.rowCount()):
-            item_id = self.table.cellWidget(row, 0).currentData()
-            price = self.table.cellWidget(row, 1).value()
-            qty = self.table.cellWidget(row, 2).value()
-            total = price * qty
-
-            self.db.add_purchase_item(invoice_id, item_id, qty, price, total)
-
         QtWidgets.QMessageBox.information(self, "✔", "تم حفظ الفاتورة بنجاح.")
 
-        global_signals.data_changed.emit()  # تحديث dashboard وباقي الصفحات
+        # تحديث الصفحات المهتمة بالمشتريات فقط
+        global_signals.notify("purchase_invoices", ChangeEvent.INSERT, [invoice_id])
+        global_signals.notify("purchase_items", ChangeEvent.INSERT)
+        global_signals.notify("items", ChangeEvent.UPDATE, [l["item_id"] for l in lines])
+        global_signals.notify("activity_log", ChangeEvent.INSERT)
@@ -2,7 +2,8 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.export_utils import Exporter
 from utils.invoice_print import InvoicePrinter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals
+from ui.search_controller import SearchController, text_matcher
 
 
 class PurchasesViewerPage(QtWidgets.QWidget):
@@ -16,7 +17,7 @@ class PurchasesViewerPage(QtWidgets.QWidget):
         self.load_data()
 
         # تحديث تلقائي عند إضافة فاتورة شراء جديدة
-        global_signals.data_changed.connect(self.load_data)
+        global_signals.subscribe(("purchase_invoices",), lambda events: self.load_data())
 
     # ======================================================
     def build_ui(self):
@@ -37,7 +38,11 @@ class PurchasesViewerPage(QtWidgets.QWidget):
 
         self.search = QtWidgets.QLineEdit()
         self.search.setPlaceholderText("🔍 بحث (رقم الفاتورة / المورد)...")
-        self.search.textChanged.connect(self.apply_filters)
+        self.search_ctl = SearchController(
+            self.search, self.show_filtered,
+            source=lambda: self.purchases,
+            match=text_matcher("invoice_no", "supplier"),
+        )
         filter_bar.addWidget(self.search)
 
         self.date_from = QtWidgets.QDateEdit()
@@ -85,15 +90,15 @@ class PurchasesViewerPage(QtWidgets.QWidget):
 
     # ======================================================
     def apply_filters(self):
-        txt = self.search.text().strip().lower()
+        # البحث النصي من SearchController ثم فلتر التاريخ على النتيجة
+        self.search_ctl.refresh()
+
+    def show_filtered(self, purchases):
         date_from = self.date_from.date().toString("yyyy-MM-dd")
         date_to = self.date_to.date().toString("yyyy-MM-dd")
 
         filtered = []
-        for p in self.purchases:
-            if txt and txt not in str(p["invoice_no"]).lower() and txt not in p["supplier"].lower():
-                continue
-
+        for p in purchases:
             if self.date_from.date().isValid() and p["date"] < date_from:
                 continue
 
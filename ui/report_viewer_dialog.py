@@ -113,33 +113,34 @@ class ReportViewerDialog(QtWidgets.QDialog):
         }
         return titles.get(self.report_key, "Report")
 
+    # =================================================================
+    # report_key → (اسم الاستعلام، فلاتر ثابتة، الأعمدة)
+    REPORTS = {
+        "items": ("items", {}, ["id", "name", "sku", "quantity", "min_quantity", "warehouse"]),
+        "warehouses": ("warehouses", {}, ["id", "name", "location"]),
+        "suppliers": ("suppliers", {}, ["id", "name", "phone", "address"]),
+        "customers": ("customers", {}, ["id", "name", "phone", "address"]),
+        "transactions": ("transactions", {}, ["id", "type", "item", "quantity", "from_wh", "to_wh", "user", "date", "notes"]),
+        "low_stock": ("items", {"low_stock": True}, ["name", "quantity", "min_quantity", "warehouse"]),
+    }
+
+    def export_query(self):
+        """مواصفة الاستعلام المعروض — العرض والتصدير يستخدمان نفس الاستعلام"""
+        name, filters, _ = self.REPORTS[self.report_key]
+        text = self.txt_search.text().strip()
+        if text:
+            filters = dict(filters, text=text)
+        return (name, filters)
+
     # =================================================================
     def load_data(self):
-        # Load the detailed data model (best option B)
-        if self.report_key == "items":
-            self.data = self.db.get_items()
-            headers = ["id", "name", "sku", "quantity", "min_quantity", "warehouse"]
-        elif self.report_key == "warehouses":
-            self.data = self.db.get_warehouses()
-            headers = ["id", "name", "location"]
-        elif self.report_key == "suppliers":
-            self.data = self.db.get_suppliers()
-            headers = ["id", "name", "phone", "address"]
-        elif self.report_key == "customers":
-            self.data = self.db.get_customers()
-            headers = ["id", "name", "phone", "address"]
-        elif self.report_key == "transactions":
-            self.data = self.db.get_transactions()
-            headers = ["id", "type", "item", "quantity", "from_wh", "to_wh", "user", "date", "notes"]
-        elif self.report_key == "low_stock":
-            items = self.db.get_items()
-            self.data = [i for i in items if i["quantity"] <= i["min_quantity"]]
-            headers = ["name", "quantity", "min_quantity", "warehouse"]
+        if self.report_key in self.REPORTS:
+            self.headers = self.REPORTS[self.report_key][2]
+            self.data = [dict(r) for r in self.db.export_rows(self.export_query())]
         else:
+            self.headers = []
             self.data = []
-            headers = []
 
-        self.headers = headers
         self.refresh_table(self.data)
 
     # =================================================================
@@ -154,52 +155,45 @@ class ReportViewerDialog(QtWidgets.QDialog):
 
     # =================================================================
     def filter_data(self):
-        text = self.txt_search.text().strip()
-
-        filtered = []
-        for row in self.data:
-            if text.lower() in str(row).lower():
-                filtered.append(row)
-
-        self.refresh_table(filtered)
+        # البحث داخل SQL بنفس فهارس البحث المستخدمة في الصفحات
+        self.load_data()
 
     # =================================================================
     def export_pdf(self):
-        path = self.reporter.export_pdf(
-            data_list=self.table_to_list(),
+        if not self.headers:
+            return
+
+        self.reporter.export_pdf(
+            data_list=None,
+            query=self.export_query(),
+            total=self.table.rowCount(),
             columns=self.headers,
             filename="report_export",
             report_title=self.get_title(),
             date_from=self.date_from.text(),
             date_to=self.date_to.text()
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ ملف PDF:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ ملف PDF:\n{path}")
-
     # =================================================================
     def export_excel(self):
-        path = self.reporter.export_excel(
-            data_list=self.table_to_list(),
+        if not self.headers:
+            return
+
+        self.reporter.export_excel(
+            data_list=None,
+            query=self.export_query(),
+            total=self.table.rowCount(),
             columns=self.headers,
             filename="report_export",
             report_title=self.get_title(),
             date_from=self.date_from.text(),
             date_to=self.date_to.text()
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ Excel:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ Excel:\n{path}")
-
     # =================================================================
     def print_report(self):
         self.reporter.print_report(self.table)
-
-    # =================================================================
-    def table_to_list(self):
-        output = []
-        for r in range(self.table.rowCount()):
-            entry = {}
-            for c, h in enumerate(self.headers):
-                item = self.table.item(r, c)
-                entry[h] = item.text() if item else ""
-            output.append(entry)
-        return output
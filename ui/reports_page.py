@@ -3,6 +3,9 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.export_utils import ExportUtils
 from utils.settings_manager import SettingsManager
+from utils.query_executor import query_executor
+from utils.cogs_engine import CostEngine
+from ui.table_models import RowBufferModel
 
 
 class ReportsPage(QtWidgets.QWidget):
@@ -77,9 +80,12 @@ class ReportsPage(QtWidgets.QWidget):
         layout.addWidget(selector_box)
 
         # ====================== TABLE ================================
-        self.table = QtWidgets.QTableWidget()
+        self.model = RowBufferModel([])
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background:white;
                 border-radius:8px;
                 border:1px solid #DDD;
@@ -109,58 +115,65 @@ class ReportsPage(QtWidgets.QWidget):
         date_to = self.date_to.text()
 
         if report == "تقرير الأصناف":
-            data = self.db.get_items()
-            headers = ["ID", "الاسم", "SKU", "الكمية", "الحد الأدنى", "المخزن"]
+            loader = self.db.get_items
+            columns = [("id", "ID"), ("name", "الاسم"), ("sku", "SKU"), ("quantity", "الكمية"),
+                       ("min_quantity", "الحد الأدنى"), ("warehouse", "المخزن")]
 
         elif report == "تقرير المخازن":
-            data = self.db.get_warehouses()
-            headers = ["ID", "اسم المخزن", "الموقع"]
+            loader = self.db.get_warehouses
+            columns = [("id", "ID"), ("name", "اسم المخزن"), ("location", "الموقع")]
 
         elif report == "تقرير الموردين":
-            data = self.db.get_suppliers()
-            headers = ["ID", "الاسم", "التليفون", "العنوان"]
+            loader = self.db.get_suppliers
+            columns = [("id", "ID"), ("name", "الاسم"), ("phone", "التليفون"), ("address", "العنوان")]
 
         elif report == "تقرير العملاء":
-            data = self.db.get_customers()
-            headers = ["ID", "الاسم", "التليفون", "العنوان"]
+            loader = self.db.get_customers
+            columns = [("id", "ID"), ("name", "الاسم"), ("phone", "التليفون"), ("address", "العنوان")]
 
         elif report == "تقرير المبيعات":
-            data = self.db.get_sales_invoices()
-            headers = ["ID", "التاريخ", "العميل", "عدد الأصناف", "الإجمالي", "المستخدم"]
+            loader = self.db.get_sales_invoices
+            columns = [("id", "ID"), ("date", "التاريخ"), ("customer_id", "العميل"),
+                       ("items_count", "عدد الأصناف"), ("total", "الإجمالي"), ("user", "المستخدم")]
 
         elif report == "تقرير المشتريات":
-            data = self.db.get_purchase_invoices()
-            headers = ["ID", "التاريخ", "المورد", "عدد الأصناف", "الإجمالي", "المستخدم"]
+            loader = self.db.get_purchase_invoices
+            columns = [("id", "ID"), ("date", "التاريخ"), ("supplier_id", "المورد"),
+                       ("items_count", "عدد الأصناف"), ("total", "الإجمالي"), ("user", "المستخدم")]
 
         elif report == "تقرير الأذونات":
-            data = self.db.get_transactions()
-            headers = ["ID", "النوع", "الصنف", "الكمية", "من", "إلى", "المستخدم", "التاريخ"]
+            loader = self.db.get_transactions
+            columns = [("id", "ID"), ("type", "النوع"), ("item_name", "الصنف"), ("quantity", "الكمية"),
+                       ("from_wh", "من"), ("to_wh", "إلى"), ("user", "المستخدم"), ("date", "التاريخ")]
 
         elif report == "تقرير المخزون المنخفض":
-            items = self.db.get_items()
-            data = [i for i in items if i["quantity"] <= i["min_quantity"]]
-            headers = ["ID", "الصنف", "الكمية", "الحد الأدنى", "المخزن"]
+            loader = lambda: [i for i in self.db.get_items() if i["quantity"] <= i["min_quantity"]]
+            columns = [("id", "ID"), ("name", "الصنف"), ("quantity", "الكمية"),
+                       ("min_quantity", "الحد الأدنى"), ("warehouse", "المخزن")]
 
         elif report == "تقرير الأرباح":
-            data = self.db.get_profit_report(date_from, date_to)
-            headers = ["التاريخ", "المبيعات", "المشتريات", "الربح"]
+            loader = lambda: self.load_profit_report(date_from, date_to)
+            columns = [("date", "التاريخ"), ("sales", "المبيعات"),
+                       ("purchases", "المشتريات"), ("profit", "الربح")]
 
         else:
             return
 
-        self.fill_table(headers, data)
-
-    # =====================================================================
-    def fill_table(self, headers, data):
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
+        # الاستعلام في الخلفية — تغيير التقرير أثناء التحميل يلغي الطلب السابق
+        query_executor.submit(loader, group="reports").then(
+            lambda data: self.fill_table(columns, data)
+        )
 
-        self.table.setRowCount(len(data))
+    def load_profit_report(self, date_from, date_to):
+        # حساب تكلفة سطور البيع الجديدة قبل قراءة الأرباح
+        CostEngine(self.db).process()
+        return self.db.get_profit_report(date_from, date_to)
 
-        for r, row in enumerate(data):
-            for c, h in enumerate(headers):
-                value = row.get(h, row.get(h.lower(), row.get(c, "")))
-                self.table.setItem(r, c, QtWidgets.QTableWidgetItem(str(value)))
+    # =====================================================================
+    def fill_table(self, columns, data):
+        # الموديل يعرض الصفوف على دفعات بدل QTableWidgetItem لكل خلية
+        self.model.set_columns(columns)
+        self.model.set_rows(data)
 
         self.table.horizontalHeader().setStretchLastSection(True)
 
@@ -1,7 +1,8 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.export_utils import ExportUtils
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals
+from ui.search_controller import debounced
 
 
 class ReturnsViewerPage(QtWidgets.QWidget):
@@ -14,7 +15,7 @@ class ReturnsViewerPage(QtWidgets.QWidget):
         self.build_ui()
         self.load_data()
 
-        global_signals.data_changed.connect(self.load_data)
+        global_signals.subscribe(("sales_returns", "purchase_returns"), lambda events: self.load_data())
 
     # =============================================================
     def build_ui(self):
@@ -42,7 +43,7 @@ class ReturnsViewerPage(QtWidgets.QWidget):
         # البحث
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("بحث: رقم الفاتورة، الصنف…")
-        self.search_box.textChanged.connect(self.load_data)
+        debounced(self.search_box, self.load_data)
         filters.addWidget(self.search_box)
 
         # التاريخ من
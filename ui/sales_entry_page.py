@@ -1,10 +1,16 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.invoice_print import InvoicePrinter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
+from utils.query_executor import query_executor
+from utils.sku_cache import sku_cache
+from ui.search_controller import SearchController, text_matcher
 
 
 class SalesEntryPage(QtWidgets.QWidget):
+    # أقصى عدد نتائج للبحث أثناء الكتابة
+    SEARCH_LIMIT = 200
+
     def __init__(self, permissions):
         super().__init__()
 
@@ -14,6 +20,7 @@ class SalesEntryPage(QtWidgets.QWidget):
         self.customers = self.db.get_customers()
 
         self.cart = []  # [{id, name, qty, price, total}]
+        self.cart_index = {}  # item_id → رقم السطر في السلة (للباركود)
         self.build_ui()
 
     # ===================================================================
@@ -45,11 +52,26 @@ class SalesEntryPage(QtWidgets.QWidget):
         search_layout = QtWidgets.QHBoxLayout()
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("اكتب اسم الصنف للبحث…")
-        self.search_box.textChanged.connect(self.search_items)
+        self.search_ctl = SearchController(
+            self.search_box, self.refresh_items_table,
+            source=lambda: self.items_list,
+            match=text_matcher("name", "sku"),
+            fetch=lambda text: self.db.search("items", text, limit=self.SEARCH_LIMIT),
+            limit=self.SEARCH_LIMIT,
+            executor=query_executor, group="sales_entry_search",
+        )
 
         search_layout.addWidget(QtWidgets.QLabel("🔍 بحث:"))
         search_layout.addWidget(self.search_box)
 
+        # وضع قراءة الباركود: القارئ يكتب الكود ثم Enter → الصنف يضاف مباشرة
+        self.scan_box = QtWidgets.QLineEdit()
+        self.scan_box.setPlaceholderText("امسح الباركود…")
+        self.scan_box.returnPressed.connect(self.scan_item)
+
+        search_layout.addWidget(QtWidgets.QLabel("📷 باركود:"))
+        search_layout.addWidget(self.scan_box)
+
         layout.addLayout(search_layout)
 
         # ============= Items Table ==================
@@ -98,16 +120,6 @@ class SalesEntryPage(QtWidgets.QWidget):
 
         layout.addLayout(btns)
 
-    # ===================================================================
-    def search_items(self):
-        text = self.search_box.text().strip()
-        if text == "":
-            self.refresh_items_table(self.items_list)
-            return
-
-        result = [i for i in self.items_list if text in i["name"]]
-        self.refresh_items_table(result)
-
     # ===================================================================
     def refresh_items_table(self, data):
         self.table_items.setRowCount(len(data))
@@ -147,16 +159,59 @@ class SalesEntryPage(QtWidgets.QWidget):
         self.refresh_cart()
         self.update_total()
 
+    # ===================================================================
+    def scan_item(self):
+        sku = self.scan_box.text().strip()
+        self.scan_box.clear()
+        if not sku:
+            return
+
+        item = sku_cache.lookup(sku)
+        if item is None:
+            QtWidgets.QApplication.beep()
+            self.scan_box.setPlaceholderText(f"❌ كود غير معروف: {sku}")
+            return
+
+        self.scan_box.setPlaceholderText("امسح الباركود…")
+
+        # نفس الصنف مرة أخرى → زيادة الكمية في سطره بدل سطر جديد
+        row = self.cart_index.get(item["id"])
+        if row is None:
+            row = len(self.cart)
+            self.cart.append({
+                "id": item["id"],
+                "name": item["name"],
+                "qty": 0,
+                "price": item.get("sell_price") or 0,
+                "total": 0,
+            })
+            self.cart_index[item["id"]] = row
+            self.table_cart.setRowCount(len(self.cart))
+
+        line = self.cart[row]
+        line["qty"] += 1
+        line["total"] = line["qty"] * line["price"]
+
+        self.set_cart_row(row)
+        self.update_total()
+
     # ===================================================================
     def refresh_cart(self):
         self.table_cart.setRowCount(len(self.cart))
+        self.cart_index = {}
 
         for i, item in enumerate(self.cart):
-            self.table_cart.setItem(i, 0, QtWidgets.QTableWidgetItem(item["name"]))
-            self.table_cart.setItem(i, 1, QtWidgets.QTableWidgetItem(str(item["qty"])))
-            self.table_cart.setItem(i, 2, QtWidgets.QTableWidgetItem(str(item["price"])))
-            self.table_cart.setItem(i, 3, QtWidgets.QTableWidgetItem(str(item["total"])))
+            self.cart_index.setdefault(item["id"], i)
+            self.set_cart_row(i)
+
+    def set_cart_row(self, i):
+        item = self.cart[i]
+        self.table_cart.setItem(i, 0, QtWidgets.QTableWidgetItem(item["name"]))
+        self.table_cart.setItem(i, 1, QtWidgets.QTableWidgetItem(str(item["qty"])))
+        self.table_cart.setItem(i, 2, QtWidgets.QTableWidgetItem(str(item["price"])))
+        self.table_cart.setItem(i, 3, QtWidgets.QTableWidgetItem(str(item["total"])))
 
+        if self.table_cart.cellWidget(i, 4) is None:
             btn_remove = QtWidgets.QPushButton("❌")
             btn_remove.clicked.connect(lambda _, r=i: self.remove_from_cart(r))
             self.table_cart.setCellWidget(i, 4, btn_remove)
@@ -183,12 +238,15 @@ class SalesEntryPage(QtWidgets.QWidget):
             QtWidgets.QMessageBox.warning(self, "⚠", "اختر العميل.")
             return
 
-        invoice_id = self.db.create_sales_invoice(customer_id, self.cart)
+        invoice_id = self.db.commit_sales_invoice({"customer_id": customer_id}, self.cart)
 
         QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ الفاتورة بنجاح.\nرقم الفاتورة: {invoice_id}")
 
         self.btn_print.setEnabled(True)
-        global_signals.data_changed.emit()
+        global_signals.notify("sales_invoices", ChangeEvent.INSERT, [invoice_id])
+        global_signals.notify("sales_items", ChangeEvent.INSERT)
+        global_signals.notify("items", ChangeEvent.UPDATE, [i["id"] for i in self.cart])
+        global_signals.notify("activity_log", ChangeEvent.INSERT)
 
     # ===================================================================
     def print_invoice(self):
@@ -1,6 +1,7 @@
-from PyQt5 import QtWidgets, QtCore
+from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
-from utils.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
+from utils.sku_cache import sku_cache
 
 
 class SalesPage(QtWidgets.QWidget):
@@ -14,6 +15,15 @@ class SalesPage(QtWidgets.QWidget):
         self.items = self.db.get_items()
         self.customers = self.db.get_customers()
 
+        # موديل واحد لقائمة الأصناف تشترك فيه كل الصفوف بدل ملء combo لكل صف
+        self.items_model = QtGui.QStandardItemModel()
+        self.item_rows = {}  # item_id → رقم الصنف في الموديل
+        for i, it in enumerate(self.items):
+            entry = QtGui.QStandardItem(f"{it['name']} (المتاح: {it['quantity']})")
+            entry.setData(it["id"], QtCore.Qt.UserRole)
+            self.items_model.appendRow(entry)
+            self.item_rows[it["id"]] = i
+
         self.build_ui()
 
     # ============================================================
@@ -38,7 +48,13 @@ class SalesPage(QtWidgets.QWidget):
         self.table.horizontalHeader().setStretchLastSection(True)
 
         btn_add_item = QtWidgets.QPushButton("➕ إضافة صنف")
-        btn_add_item.clicked.connect(self.add_row)
+        btn_add_item.clicked.connect(lambda: self.add_row())
+
+        # قراءة الباركود: الكود + Enter يضيف سطر بالصنف وسعر البيع
+        self.scan_box = QtWidgets.QLineEdit()
+        self.scan_box.setPlaceholderText("امسح الباركود…")
+        self.scan_box.returnPressed.connect(self.scan_item)
+        form.addRow("📷 باركود:", self.scan_box)
 
         layout.addLayout(form)
         layout.addWidget(self.table)
@@ -70,21 +86,22 @@ class SalesPage(QtWidgets.QWidget):
         layout.addWidget(btn_save)
 
     # ============================================================
-    def add_row(self):
+    def add_row(self, item=None):
         row = self.table.rowCount()
         self.table.insertRow(row)
 
         # اختيار صنف
         item_combo = QtWidgets.QComboBox()
-        for it in self.items:
-            item_combo.addItem(f"{it['name']} (المتاح: {it['quantity']})", it["id"])
+        item_combo.setModel(self.items_model)
+        if item is not None and item["id"] in self.item_rows:
+            item_combo.setCurrentIndex(self.item_rows[item["id"]])
 
         item_combo.currentIndexChanged.connect(self.calculate_totals)
 
         # السعر
         price = QtWidgets.QDoubleSpinBox()
         price.setMaximum(999999)
-        price.setValue(1)
+        price.setValue((item.get("sell_price") or 1) if item is not None else 1)
         price.valueChanged.connect(self.calculate_totals)
 
         # الكمية
@@ -108,6 +125,20 @@ class SalesPage(QtWidgets.QWidget):
 
         self.calculate_totals()
 
+    # ============================================================
+    def scan_item(self):
+        sku = self.scan_box.text().strip()
+        self.scan_box.clear()
+        if not sku:
+            return
+
+        item = sku_cache.lookup(sku)
+        if item is None or item["id"] not in self.item_rows:
+            QtWidgets.QApplication.beep()
+            return
+
+        self.add_row(item)
+
     # ============================================================
     def delete_row(self, row):
         self.table.removeRow(row)
@@ -138,26 +169,26 @@ class SalesPage(QtWidgets.QWidget):
             return
 
         customer_id = self.customer_combo.currentData()
-        total = float(self.total_lbl.text())
-        discount = self.discount_input.value()
         net_total = float(self.net_total_lbl.text())
 
-        paid = net_total  # فاتورة كاش
-        remain = 0
-
-        invoice_id = self.db.add_sale_invoice(
-            customer_id, total, discount, net_total, paid, remain, self.username
+        lines = [
+            {
+                "item_id": self.table.cellWidget(row, 0).currentData(),
+                "price": self.table.cellWidget(row, 1).value(),
+                "qty": self.table.cellWidget(row, 2).value(),
+            }
+            for row in range(self.table.rowCount())
+        ]
+
+        # الفاتورة + الأصناف + حركات المخزون + السجل في transaction واحدة
+        invoice_id = self.db.commit_sales_invoice(
+            {"customer_id": customer_id, "total": net_total, "user": self.username}, lines
         )
 
-        # حفظ الأصناف
-        for row in range(self.table.rowCount()):
-            item_id = self.table.cellWidget(row, 0).currentData()
-            price = self.table.cellWidget(row, 1).value()
-            qty = self.table.cellWidget(row, 2).value()
-            total = price * qty
-
-            self.db.add_sale_item(invoice_id, item_id, qty, price, total)
-
         QtWidgets.QMessageBox.information(self, "✔", "تم حفظ الفاتورة بنجاح.")
 
-        global_signals.data_changed.emit()  # تحديث dashboard وباقي الصفحات
+        # تحديث الصفحات المهتمة بالمبيعات فقط
+        global_signals.notify("sales_invoices", ChangeEvent.INSERT, [invoice_id])
+        global_signals.notify("sales_items", ChangeEvent.INSERT)
+        global_signals.notify("items", ChangeEvent.UPDATE, [l["item_id"] for l in lines])
+        global_signals.notify("activity_log", ChangeEvent.INSERT)
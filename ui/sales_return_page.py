@@ -1,7 +1,7 @@
 from PyQt5 import QtWidgets, QtCore
 from utils.db_manager import DatabaseManager
 from utils.return_invoice_print import ReturnInvoicePrinter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
 import datetime
 
 
@@ -144,7 +144,8 @@ class SalesReturnPage(QtWidgets.QWidget):
         # save database record
         return_id = self.db.save_sales_return(invoice_id, items)
 
-        global_signals.data_changed.emit()
+        global_signals.notify("sales_returns", ChangeEvent.INSERT, [return_id])
+        global_signals.notify("items", ChangeEvent.UPDATE)
 
         QtWidgets.QMessageBox.information(
             self, "✔", f"تم حفظ المرتجع بنجاح.\nرقم المرتجع: {return_id}"
@@ -3,6 +3,7 @@ from utils.db_manager import DatabaseManager
 from utils.export_utils import Exporter
 from utils.invoice_print import InvoicePrinter
 from ui.invoice_details_dialog import InvoiceDetailsDialog
+from ui.search_controller import debounced
 
 
 
@@ -29,7 +30,7 @@ class SalesViewer(QtWidgets.QWidget):
 
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("بحث برقم الفاتورة / العميل ...")
-        self.search_box.textChanged.connect(self.search)
+        debounced(self.search_box, lambda: self.search(self.search_box.text()))
 
         btn_export_excel = QtWidgets.QPushButton("🟩 Excel")
         btn_export_excel.clicked.connect(self.export_excel)
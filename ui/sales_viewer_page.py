@@ -2,7 +2,9 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 from utils.db_manager import DatabaseManager
 from utils.export_utils import Exporter
 from utils.invoice_print import InvoicePrinter
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals
+from ui.table_models import RowBufferModel
+from ui.search_controller import SearchController, text_matcher
 
 
 class SalesViewerPage(QtWidgets.QWidget):
@@ -16,7 +18,7 @@ class SalesViewerPage(QtWidgets.QWidget):
         self.load_data()
 
         # تحديث تلقائي عند حصول عملية جديدة
-        global_signals.data_changed.connect(self.load_data)
+        global_signals.subscribe(("sales_invoices",), lambda events: self.load_data())
 
     # ======================================================
     def build_ui(self):
@@ -37,7 +39,11 @@ class SalesViewerPage(QtWidgets.QWidget):
 
         self.search = QtWidgets.QLineEdit()
         self.search.setPlaceholderText("🔍 بحث (رقم الفاتورة / العميل)...")
-        self.search.textChanged.connect(self.apply_filters)
+        self.search_ctl = SearchController(
+            self.search, self.show_filtered,
+            source=lambda: self.sales,
+            match=text_matcher("invoice_no", "customer"),
+        )
         filter_bar.addWidget(self.search)
 
         self.date_from = QtWidgets.QDateEdit()
@@ -57,12 +63,16 @@ class SalesViewerPage(QtWidgets.QWidget):
         filter_bar.addWidget(btn_filter)
 
         # ================= TABLE ===================
-        self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "رقم الفاتورة", "العميل", "الإجمالي", "التاريخ", "عرض"
+        self.model = RowBufferModel([
+            ("id", "ID"), ("invoice_no", "رقم الفاتورة"), ("customer", "العميل"),
+            ("total", "الإجمالي"), ("date", "التاريخ"), ("view", "عرض"),
         ])
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QtWidgets.QTableView.SelectRows)
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.clicked.connect(self.on_table_clicked)
         layout.addWidget(self.table)
 
         # ================= BUTTONS ===================
@@ -85,16 +95,15 @@ class SalesViewerPage(QtWidgets.QWidget):
 
     # ======================================================
     def apply_filters(self):
-        txt = self.search.text().strip().lower()
+        # البحث النصي من SearchController ثم فلتر التاريخ على النتيجة
+        self.search_ctl.refresh()
+
+    def show_filtered(self, sales):
         date_from = self.date_from.date().toString("yyyy-MM-dd")
         date_to = self.date_to.date().toString("yyyy-MM-dd")
 
         filtered = []
-        for s in self.sales:
-            # النص
-            if txt and txt not in str(s["invoice_no"]).lower() and txt not in s["customer"].lower():
-                continue
-
+        for s in sales:
             # التاريخ
             if self.date_from.date().isValid() and s["date"] < date_from:
                 continue
@@ -108,18 +117,12 @@ class SalesViewerPage(QtWidgets.QWidget):
 
     # ======================================================
     def update_table(self, data):
-        self.table.setRowCount(len(data))
-
-        for i, s in enumerate(data):
-            self.table.setItem(i, 0, QtWidgets.QTableWidgetItem(str(s["id"])))
-            self.table.setItem(i, 1, QtWidgets.QTableWidgetItem(s["invoice_no"]))
-            self.table.setItem(i, 2, QtWidgets.QTableWidgetItem(s["customer"]))
-            self.table.setItem(i, 3, QtWidgets.QTableWidgetItem(str(s["total"])))
-            self.table.setItem(i, 4, QtWidgets.QTableWidgetItem(s["date"]))
-
-            btn_view = QtWidgets.QPushButton("🔍")
-            btn_view.clicked.connect(lambda _, sid=s["id"]: self.open_invoice(sid))
-            self.table.setCellWidget(i, 5, btn_view)
+        # عمود "عرض" نص فقط بدل زر لكل صف — الضغط عليه يفتح الفاتورة
+        self.model.set_rows(dict(s, view="🔍") for s in data)
+
+    def on_table_clicked(self, index):
+        if self.model.keys[index.column()] == "view":
+            self.open_invoice(self.model.row(index.row())["id"])
 
     # ======================================================
     def open_invoice(self, sale_id):
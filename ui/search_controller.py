@@ -0,0 +1,153 @@
+# ui/search_controller.py
+
+from PyQt5 import QtCore
+
+from utils.db_migrations import normalize_search_text
+
+
+def text_matcher(*keys, cache_size=500000):
+    """
+    match(row, text) للبحث داخل قائمة محملة — نفس قواعد DatabaseManager.search:
+    كل كلمة لازم تظهر في أحد الأعمدة، مع تجاهل الهمزات/التشكيل.
+    النص الموحد لكل صف يُحسب مرة واحدة فقط (البحث التالي يقارن مباشرة).
+    """
+    haystacks = {}
+    query = [None, ()]
+
+    def match(row, text):
+        if text != query[0]:
+            query[:] = [text, normalize_search_text(text).split()]
+
+        cached = haystacks.get(id(row))
+        if cached is None or cached[0] is not row:
+            if len(haystacks) >= cache_size:
+                haystacks.clear()
+            cached = haystacks[id(row)] = (
+                row, normalize_search_text(" ".join(str(row.get(k) or "") for k in keys))
+            )
+
+        return all(word in cached[1] for word in query[1])
+
+    return match
+
+
+def debounced(line_edit, callback, delay=250):
+    """تشغيل callback مرة واحدة بعد توقف الكتابة delay ms (بدل كل حرف)"""
+    timer = QtCore.QTimer(line_edit)
+    timer.setSingleShot(True)
+    timer.setInterval(delay)
+    timer.timeout.connect(callback)
+
+    line_edit.textChanged.connect(lambda _: timer.start())
+    line_edit.returnPressed.connect(lambda: (timer.stop(), callback()))
+    return timer
+
+
+class SearchController(QtCore.QObject):
+    """
+    بحث أثناء الكتابة لمربع بحث واحد.
+
+    - debounce: البحث يبدأ بعد توقف الكتابة delay ms → تحديث واحد للجدول
+    - narrowing: لو النص الجديد يحتوي النص السابق تتم الفلترة داخل
+      النتيجة السابقة فقط (بـ match) بدل المصدر كله
+    - fetch: بحث في قاعدة البيانات على QueryExecutor — البحث الأحدث
+      يلغي الأقدم، ونتيجة بحث قديم تصل متأخرة يتم تجاهلها
+
+    source()            -> كل الصفوف (تُعرض عند مسح النص، وتُفلتر بـ match لو لا يوجد fetch)
+    match(row, text)    -> True لو الصف يطابق النص
+    fetch(text)         -> الصفوف المطابقة من قاعدة البيانات
+    limit               -> أقصى عدد يرجعه fetch (نتيجة ناقصة لا تصلح للـ narrowing)
+    on_results(rows)    -> عرض النتيجة
+    """
+
+    def __init__(self, line_edit, on_results, source=None, match=None, fetch=None,
+                 limit=None, executor=None, group=None, delay=250):
+        super().__init__(line_edit)
+
+        self.edit = line_edit
+        self.on_results = on_results
+        self.source = source or (lambda: [])
+        self.match = match
+        self.fetch = fetch
+        self.limit = limit
+        self.executor = executor
+        self.group = group
+
+        # آخر نتيجة معروضة (للـ narrowing)
+        self._last_text = None
+        self._last_rows = None
+        self._last_complete = False
+        # يزيد مع كل بحث — نتيجة جيل قديم يتم تجاهلها
+        self._generation = 0
+
+        self._timer = debounced(line_edit, self.run, delay)
+
+    # ============================================================
+    def text(self):
+        return self.edit.text().strip()
+
+    def filter(self, rows):
+        """تطبيق النص الحالي على صفوف جديدة (مثلاً صفوف أضيفت بعد البحث)"""
+        text = self.text()
+        if not text or self.match is None:
+            return list(rows)
+        return [r for r in rows if self.match(r, text)]
+
+    def invalidate(self):
+        """المصدر تغير — البحث القادم يبدأ من المصدر كاملاً"""
+        self._last_text = None
+        self._last_rows = None
+        self._last_complete = False
+
+    def refresh(self):
+        """إعادة البحث فوراً من المصدر (بعد تحميل البيانات أو تغيير فلتر آخر)"""
+        self.invalidate()
+        self.run()
+
+    # ============================================================
+    def run(self):
+        self._timer.stop()
+        text = self.text()
+
+        if self._last_rows is not None and text == self._last_text:
+            return
+
+        self._generation += 1
+        if self.executor is not None and self.group is not None:
+            self.executor.cancel_group(self.group)
+
+        if not text:
+            self._deliver(text, list(self.source()), True)
+            return
+
+        # النص الجديد أضيق من السابق → الفلترة داخل النتيجة السابقة
+        if (self.match is not None and self._last_complete and self._last_text
+                and self._last_text in text):
+            rows = [r for r in self._last_rows if self.match(r, text)]
+            self._deliver(text, rows, True)
+            return
+
+        if self.fetch is None:
+            rows = [r for r in self.source() if self.match(r, text)]
+            self._deliver(text, rows, True)
+            return
+
+        generation = self._generation
+        if self.executor is None:
+            self._on_fetched(generation, text, self.fetch(text))
+        else:
+            self.executor.submit(self.fetch, text, group=self.group).then(
+                lambda rows: self._on_fetched(generation, text, rows)
+            )
+
+    def _on_fetched(self, generation, text, rows):
+        if generation != self._generation:
+            return
+        complete = self.limit is None or len(rows) < self.limit
+        self._deliver(text, rows, complete)
+
+    def _deliver(self, text, rows, complete):
+        self._last_text = text
+        self._last_rows = rows
+        self._last_complete = complete
+        self.on_results(rows)
@@ -1,10 +1,10 @@
-import os
 import json
-from datetime import datetime
 from PyQt5 import QtWidgets, QtGui, QtCore
 
 from utils.settings_manager import SettingsManager
-from utils.backup_manager import AutoBackupScheduler
+from utils.backup_engine import describe
+from utils.backup_manager import AutoBackupScheduler, complete_restore, submit_backup, submit_restore
+from utils.restore_engine import describe_restore
 
 
 class SettingsPage(QtWidgets.QWidget):
@@ -108,38 +108,43 @@ class SettingsPage(QtWidgets.QWidget):
 
     # ============================================================
     def manual_backup(self):
-        import shutil
-
         backup_dir = self.lbl_backup_path.text()
         if "غير" in backup_dir:
             QtWidgets.QMessageBox.warning(self, "❌", "اختر مسار النسخ أولًا.")
             return
 
-        src = "database.db"
-        name = f"manual_backup_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.db"
-        dst = os.path.join(backup_dir, name)
-
         try:
-            shutil.copy2(src, dst)
-            QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء النسخة:\n{dst}")
+            job = submit_backup(backup_dir, prefix="manual_backup", user="النظام", action="نسخ يدوي")
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, "❌ خطأ", str(e))
+            return
+
+        job.then(
+            lambda result: QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء النسخة:\n{describe(result)}"),
+            lambda error: QtWidgets.QMessageBox.warning(self, "❌ خطأ", error),
+        )
 
     # ============================================================
     def restore_backup(self):
         path, _ = QtWidgets.QFileDialog.getOpenFileName(
-            self, "اختر النسخة الاحتياطية", "", "DB Files (*.db)"
+            self, "اختر النسخة الاحتياطية", "", "Backups (*.zip *.db)"
         )
         if not path:
             return
 
-        try:
-            import shutil
-            shutil.copy2(path, "database.db")
-
-            QtWidgets.QMessageBox.information(
-                self, "✔", "تم استعادة النسخة.\nأعد تشغيل البرنامج."
-            )
+        # فحص + تجهيز في الخلفية ثم تبديل الملف (بدل النسخ فوق قاعدة بيانات مفتوحة)
+        submit_restore(path).then(
+            self.restore_ready,
+            lambda error: QtWidgets.QMessageBox.warning(self, "❌", error),
+        )
 
+    def restore_ready(self, result):
+        try:
+            complete_restore(result)
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, "❌", str(e))
+            return
+
+        QtWidgets.QMessageBox.information(
+            self, "✔", f"تم استعادة النسخة.\n{describe_restore(result)}\nأعد تشغيل البرنامج."
+        )
@@ -0,0 +1,234 @@
+# ui/table_models.py
+
+from itertools import islice
+
+from PyQt5 import QtCore, QtGui
+
+
+class RowBufferModel(QtCore.QAbstractTableModel):
+    """
+    موديل جداول افتراضي (Virtualized) لكل صفحات العرض الكبيرة.
+
+    - البيانات محفوظة بشكل عمودي: {key: [values...]} بدل QTableWidgetItem لكل خلية
+    - الصفوف تُحمل على دفعات (canFetchMore / fetchMore) عند التمرير فقط
+    - المصدر إما قائمة جاهزة (set_rows) أو دالة تجلب الصفحة التالية (set_fetcher)
+
+    columns: [(key, header), ...]
+    fetcher(last_row, limit) -> list[dict]   ← last_row = آخر صف محمل أو None
+
+    لو تم تمرير executor مع set_fetcher يتم جلب الصفحات في الخلفية
+    والجدول يظل يستجيب أثناء الاستعلام.
+    """
+
+    def __init__(self, columns, page_size=200, parent=None):
+        super().__init__(parent)
+
+        self.keys = [c[0] for c in columns]
+        self.headers = [c[1] for c in columns]
+        self.page_size = page_size
+
+        # دالة اختيارية: row(dict) -> لون الخلفية "#RRGGBB" أو None
+        self.row_background = None
+
+        self._columns = {k: [] for k in self.keys}
+        self._count = 0
+        self._pending = None
+        self._fetcher = None
+        self._exhausted = True
+
+        self._executor = None
+        self._group = None
+        self._loading = False
+        # يزيد مع كل تغيير للمصدر — نتيجة جيل قديم يتم تجاهلها
+        self._generation = 0
+
+    # ============================================================
+    # تغيير المصدر
+    # ============================================================
+    def set_columns(self, columns):
+        self.beginResetModel()
+        self.keys = [c[0] for c in columns]
+        self.headers = [c[1] for c in columns]
+        self._clear()
+        self._exhausted = True
+        self.endResetModel()
+
+    def set_rows(self, rows):
+        """قائمة صفوف جاهزة — يتم عرضها تدريجياً مع التمرير"""
+        self.beginResetModel()
+        self._clear()
+        self._pending = iter(rows)
+        self._exhausted = False
+        self.endResetModel()
+
+        self.fetchMore()
+
+    def set_fetcher(self, fetcher, executor=None, group=None):
+        """
+        مصدر من قاعدة البيانات — كل fetchMore يجلب صفحة جديدة.
+        executor / group: تشغيل الجلب على QueryExecutor (مجموعة واحدة لكل جدول)
+        """
+        self.beginResetModel()
+        self._clear()
+        self._fetcher = fetcher
+        self._executor = executor
+        self._group = group
+        self._exhausted = False
+        self.endResetModel()
+
+        self.fetchMore()
+
+    def _clear(self):
+        # إلغاء أي صفحة جاري تحميلها من المصدر السابق
+        if self._executor is not None and self._group is not None:
+            self._executor.cancel_group(self._group)
+
+        self._generation += 1
+        self._loading = False
+
+        self._columns = {k: [] for k in self.keys}
+        self._count = 0
+        self._pending = None
+        self._fetcher = None
+        self._executor = None
+        self._group = None
+
+    # ============================================================
+    # التحميل التدريجي
+    # ============================================================
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+
+        if self._fetcher is not None:
+            last = self.row(self._count - 1) if self._count else None
+
+            if self._executor is not None:
+                self._loading = True
+                generation = self._generation
+                self._executor.submit(
+                    self._fetcher, last, self.page_size, group=self._group
+                ).then(
+                    lambda batch: self._on_batch(generation, batch),
+                    lambda error: self._on_batch(generation, []),
+                )
+                return
+
+            batch = self._fetcher(last, self.page_size)
+        elif self._pending is not None:
+            batch = list(islice(self._pending, self.page_size))
+        else:
+            batch = []
+
+        self._append(batch)
+
+    def prepend_rows(self, rows):
+        """إضافة صفوف جديدة أعلى الجدول بدون إعادة تحميل الموجود"""
+        rows = list(rows)
+        if not rows:
+            return
+
+        self.beginInsertRows(QtCore.QModelIndex(), 0, len(rows) - 1)
+        for key in self.keys:
+            self._columns[key][0:0] = [r.get(key) for r in rows]
+        self._count += len(rows)
+        self.endInsertRows()
+
+    def _on_batch(self, generation, batch):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._append(batch)
+
+    def _append(self, batch):
+        if len(batch) < self.page_size:
+            self._exhausted = True
+
+        if not batch:
+            return
+
+        self.beginInsertRows(QtCore.QModelIndex(), self._count, self._count + len(batch) - 1)
+        for key in self.keys:
+            column = self._columns[key]
+            column.extend(r.get(key) for r in batch)
+        self._count += len(batch)
+        self.endInsertRows()
+
+    # ============================================================
+    # واجهة QAbstractTableModel
+    # ============================================================
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == QtCore.Qt.DisplayRole:
+            value = self._columns[self.keys[index.column()]][index.row()]
+            return "" if value is None else str(value)
+
+        if role == QtCore.Qt.BackgroundRole and self.row_background:
+            color = self.row_background(self.row(index.row()))
+            return QtGui.QBrush(QtGui.QColor(color)) if color else None
+
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+
+        if orientation == QtCore.Qt.Horizontal:
+            return self.headers[section]
+
+        return str(section + 1)
+
+    # ============================================================
+    # قراءة البيانات (للتصدير / الطباعة)
+    # ============================================================
+    def row(self, i):
+        return {k: self._columns[k][i] for k in self.keys}
+
+    def rows(self, include_pending=True):
+        """
+        الصفوف بقيمها الأصلية (بدون تحويل لنص).
+        include_pending: يشمل صفوف القائمة الجاهزة التي لم تُعرض بعد
+        """
+        for i in range(self._count):
+            yield self.row(i)
+
+        if include_pending and self._pending is not None:
+            remaining = list(self._pending)
+            self._pending = iter(remaining)
+            for r in remaining:
+                yield {k: r.get(k) for k in self.keys}
+
+    def snapshot(self):
+        """
+        نسخة ثابتة من كل الصفوف للقراءة من thread آخر (تصدير في الخلفية):
+        تغيير الموديل بعدها (بحث / إعادة تحميل) لا يؤثر على النسخة.
+        يرجع (rows generator, عدد الصفوف)
+        """
+        keys = list(self.keys)
+        columns = [self._columns[k][:self._count] for k in keys]
+
+        pending = []
+        if self._pending is not None:
+            pending = list(self._pending)
+            self._pending = iter(pending)
+
+        def rows():
+            for values in zip(*columns):
+                yield dict(zip(keys, values))
+            for r in pending:
+                yield {k: r.get(k) for k in keys}
+
+        return rows(), self._count + len(pending)
@@ -2,9 +2,13 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 
 from utils.db_manager import DatabaseManager
 from utils.report_utils import ReportUtils
+from utils.query_executor import query_executor
+from ui.table_models import RowBufferModel
 
 
 class TransactionsPage(QtWidgets.QWidget):
+    PAGE_SIZE = 200
+
     def __init__(self, username, permissions):
         super().__init__()
 
@@ -14,7 +18,8 @@ class TransactionsPage(QtWidgets.QWidget):
 
         self.reporter = ReportUtils()
 
-        self.transactions = []
+        # الفلاتر الحالية — الموديل يجلب الصفحات التالية بنفس الفلاتر
+        self.filters = {}
 
         self.build_ui()
         self.load_transactions()
@@ -87,11 +92,14 @@ class TransactionsPage(QtWidgets.QWidget):
         layout.addLayout(filter_layout)
 
         # ---------------- TABLE ----------------
-        self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels(
-            ["ID", "النوع", "الصنف", "الكمية", "من مخزن", "إلى مخزن", "المستخدم", "ملاحظات", "التاريخ"]
-        )
+        self.model = RowBufferModel([
+            ("id", "ID"), ("type", "النوع"), ("item", "الصنف"), ("quantity", "الكمية"),
+            ("from_wh", "من مخزن"), ("to_wh", "إلى مخزن"), ("user", "المستخدم"),
+            ("notes", "ملاحظات"), ("date", "التاريخ"),
+        ], page_size=self.PAGE_SIZE)
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
 
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
@@ -102,121 +110,75 @@ class TransactionsPage(QtWidgets.QWidget):
     # LOAD TRANSACTIONS
     # ===============================================================
     def load_transactions(self):
-        self.transactions = self.db.get_transactions()
-        self.refresh_table(self.transactions)
+        # أحدث العمليات بدون فلترة
+        self.reload({})
+
+    def reload(self, filters):
+        self.filters = filters
+        self.model.set_fetcher(self.fetch_page, query_executor, "transactions")
 
     # ===============================================================
-    def refresh_table(self, data):
-        self.table.setRowCount(len(data))
-
-        for i, row in enumerate(data):
-            self.table.setItem(i, 0, QtWidgets.QTableWidgetItem(str(row["id"])))
-            self.table.setItem(i, 1, QtWidgets.QTableWidgetItem(row["type"]))
-            self.table.setItem(i, 2, QtWidgets.QTableWidgetItem(row["item"]))
-            self.table.setItem(i, 3, QtWidgets.QTableWidgetItem(str(row["quantity"])))
-            self.table.setItem(i, 4, QtWidgets.QTableWidgetItem(row.get("from_wh", "")))
-            self.table.setItem(i, 5, QtWidgets.QTableWidgetItem(row.get("to_wh", "")))
-            self.table.setItem(i, 6, QtWidgets.QTableWidgetItem(row["user"]))
-            self.table.setItem(i, 7, QtWidgets.QTableWidgetItem(row["notes"]))
-            self.table.setItem(i, 8, QtWidgets.QTableWidgetItem(row["date"]))
+    def fetch_page(self, last_row, limit):
+        # keyset pagination: الصفحة التالية تبدأ بعد آخر صف معروض
+        after = (last_row["date"], last_row["id"]) if last_row else None
+        return self.db.query_transactions(**self.filters, limit=limit, after=after)
 
     # ===============================================================
     # FILTER
     # ===============================================================
     def apply_filters(self):
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-        type_filter = self.type_filter.currentText()
-        search = self.search_box.text().strip()
-
-        filtered = []
-
-        for t in self.transactions:
-            date_val = t["date"][:10]
-
-            if not (date_from <= date_val <= date_to):
-                continue
-
-            if type_filter != "الكل" and t["type"] != type_filter:
-                continue
-
-            if search:
-                if search not in t["item"] and search not in t["user"] and search not in t["notes"]:
-                    continue
-
-            filtered.append(t)
-
-        self.refresh_table(filtered)
+        # كل الفلاتر تتنفذ داخل SQL — نحمل فقط الصفحة الظاهرة
+        self.reload({
+            "date_from": self.date_from.date().toString("yyyy-MM-dd"),
+            "date_to": self.date_to.date().toString("yyyy-MM-dd"),
+            "type": self.type_filter.currentText(),
+            "text": self.search_box.text().strip(),
+        })
 
     # ===============================================================
     # EXPORT PDF
     # ===============================================================
     def export_pdf(self):
-        items = self.collect_current_table()
-        if not items:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "خطأ", "لا توجد بيانات للتصدير")
             return
 
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-
-        file_path = self.reporter.export_pdf(
-            data_list=items,
+        # نفس الفلاتر المعروضة — التصدير يعيد الاستعلام بالكامل وليس الصفحات المحملة فقط
+        self.reporter.export_pdf(
+            data_list=None,
+            query=("transactions", self.filters),
             columns=["id", "type", "item", "quantity", "from_wh", "to_wh", "user", "notes", "date"],
             filename="transactions_report",
             report_title="Transactions Report",
-            date_from=date_from,
-            date_to=date_to
+            date_from=self.filters.get("date_from"),
+            date_to=self.filters.get("date_to")
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء PDF:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم إنشاء PDF:\n{file_path}")
-
     # ===============================================================
     # EXPORT EXCEL
     # ===============================================================
     def export_excel(self):
-        items = self.collect_current_table()
-        if not items:
+        if not self.model.rowCount():
             QtWidgets.QMessageBox.warning(self, "خطأ", "لا توجد بيانات للتصدير")
             return
 
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-
-        file_path = self.reporter.export_excel(
-            data_list=items,
+        # نفس الفلاتر المعروضة — التصدير يعيد الاستعلام بالكامل وليس الصفحات المحملة فقط
+        self.reporter.export_excel(
+            data_list=None,
+            query=("transactions", self.filters),
             columns=["id", "type", "item", "quantity", "from_wh", "to_wh", "user", "notes", "date"],
             filename="transactions_report",
             report_title="Transactions Report",
-            date_from=date_from,
-            date_to=date_to
+            date_from=self.filters.get("date_from"),
+            date_to=self.filters.get("date_to")
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ ملف Excel:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"تم حفظ ملف Excel:\n{file_path}")
-
     # ===============================================================
     # PRINT
     # ===============================================================
     def print_report(self):
         self.reporter.print_report(self.table)
-
-    # ===============================================================
-    # Convert Table to List of Dicts
-    # ===============================================================
-    def collect_current_table(self):
-        data = []
-
-        rows = self.table.rowCount()
-        cols = self.table.columnCount()
-
-        headers = ["id", "type", "item", "quantity", "from_wh",
-                   "to_wh", "user", "notes", "date"]
-
-        for r in range(rows):
-            entry = {}
-            for c in range(cols):
-                item = self.table.item(r, c)
-                entry[headers[c]] = item.text() if item else ""
-            data.append(entry)
-
-        return data
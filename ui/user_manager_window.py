@@ -1,5 +1,6 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
 from utils.db_manager import DatabaseManager
+from ui.search_controller import debounced
 
 class UserManagerWindow(QtWidgets.QDialog):
     def __init__(self, parent=None):
@@ -38,7 +39,7 @@ class UserManagerWindow(QtWidgets.QDialog):
         search_layout = QtWidgets.QHBoxLayout()
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("🔍 ابحث عن مستخدم بالاسم أو البريد...")
-        self.search_box.textChanged.connect(self.filter_users)
+        debounced(self.search_box, lambda: self.filter_users(self.search_box.text()))
         btn_add = QtWidgets.QPushButton("➕ إضافة مستخدم جديد")
         btn_add.clicked.connect(self.add_user_dialog)
         search_layout.addWidget(self.search_box)
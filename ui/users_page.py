@@ -1,6 +1,6 @@
 from PyQt5 import QtWidgets, QtCore
 from utils.db_manager import DatabaseManager
-from ui.global_signals import global_signals
+from utils.global_signals import global_signals, ChangeEvent
 
 
 class UsersPage(QtWidgets.QWidget):
@@ -103,7 +103,7 @@ class UsersPage(QtWidgets.QWidget):
         role_id = self.role_map[role_name]
 
         self.db.add_user(username, password, fullname, role_id)
-        global_signals.data_changed.emit()
+        global_signals.notify("users", ChangeEvent.INSERT)
 
         self.in_user.clear()
         self.in_pass.clear()
@@ -120,6 +120,6 @@ class UsersPage(QtWidgets.QWidget):
         uid = int(self.table.item(row, 0).text())
         self.db.delete_user(uid)
 
-        global_signals.data_changed.emit()
+        global_signals.notify("users", ChangeEvent.DELETE, [uid])
 
         self.load_users()
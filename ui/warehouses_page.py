@@ -2,6 +2,7 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 
 from utils.db_manager import DatabaseManager
 from utils.report_utils import ReportUtils
+from ui.search_controller import debounced
 
 
 class WarehousesPage(QtWidgets.QWidget):
@@ -39,7 +40,7 @@ class WarehousesPage(QtWidgets.QWidget):
         # بحث
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText("بحث... (اسم المخزن، العنوان)")
-        self.search_box.textChanged.connect(self.apply_filters)
+        debounced(self.search_box, self.apply_filters)
         bar.addWidget(self.search_box)
 
         bar.addStretch()
@@ -94,84 +95,60 @@ class WarehousesPage(QtWidgets.QWidget):
     # FILTER
     # ===============================================================
     def apply_filters(self):
-        search = self.search_box.text().strip()
+        # نفس الاستعلام الذي يستخدمه التصدير — المعروض = المُصدَّر
+        self.refresh_table(list(self.db.export_rows(self.export_query())))
 
-        filtered = []
-
-        for wh in self.warehouses:
-            if search:
-                if (search not in wh["name"] and search not in wh["location"]):
-                    continue
-            filtered.append(wh)
-
-        self.refresh_table(filtered)
+    def export_query(self):
+        return ("warehouses", {"text": self.search_box.text().strip()})
 
     # ===============================================================
     # EXPORT PDF
     # ===============================================================
     def export_pdf(self):
-        data = self.collect_table_data()
-        if not data:
+        if not self.table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا توجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_pdf(
-            data_list=data,
+        self.reporter.export_pdf(
+            data_list=None,
+            query=self.export_query(),
+            total=self.table.rowCount(),
             columns=["id", "name", "location"],
             filename="warehouses_report",
             report_title="Warehouses Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"PDF تم إنشاؤه:\n{file_path}")
-
     # ===============================================================
     # EXPORT EXCEL
     # ===============================================================
     def export_excel(self):
-        data = self.collect_table_data()
-        if not data:
+        if not self.table.rowCount():
             QtWidgets.QMessageBox.warning(self, "⚠", "لا توجد بيانات للتصدير")
             return
 
-        file_path = self.reporter.export_excel(
-            data_list=data,
+        self.reporter.export_excel(
+            data_list=None,
+            query=self.export_query(),
+            total=self.table.rowCount(),
             columns=["id", "name", "location"],
             filename="warehouses_report",
             report_title="Warehouses Report",
             date_from="N/A",
             date_to="N/A"
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{path}")
         )
 
-        QtWidgets.QMessageBox.information(self, "✔", f"Excel تم حفظه:\n{file_path}")
-
     # ===============================================================
     # PRINT PAGE
     # ===============================================================
     def print_page(self):
         self.reporter.print_report(self.table)
 
-    # ===============================================================
-    # Collect Data
-    # ===============================================================
-    def collect_table_data(self):
-        rows = self.table.rowCount()
-        cols = self.table.columnCount()
-
-        headers = ["id", "name", "location"]
-
-        data = []
-
-        for r in range(rows):
-            entry = {}
-            for c in range(cols):
-                item = self.table.item(r, c)
-                entry[headers[c]] = item.text() if item else ""
-            data.append(entry)
-
-        return data
-
     # ===============================================================
     # ADD WAREHOUSE
     # ===============================================================
@@ -0,0 +1,300 @@
+# utils/backup_archiver.py
+
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import shutil
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from utils.backup_engine import BackupCancelled, snapshot_database
+
+
+# codec → امتداد الملف داخل الأرشيف
+# كل الأنواع تقبل دمج أجزاء مضغوطة مستقلة متتالية في ملف واحد
+# (gzip multi-member / bz2 multi-stream / xz multi-stream) — يفكها gzip/bzip2/xz العادية
+CODECS = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "xz": ".xz",
+    "none": "",
+}
+CODEC_LEVELS = {"gzip": (0, 9), "bz2": (1, 9), "xz": (0, 9), "none": (0, 0)}
+
+DEFAULT_CODEC = "gzip"
+DEFAULT_LEVEL = 1
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MANIFEST = "archive_manifest.json"
+INFO_ENTRY = "backup.json"
+ARCHIVE_VERSION = 2
+
+# الـ snapshot المؤقت قبل الضغط (بجانب قاعدة البيانات)
+SNAPSHOT_SUFFIX = ".snapshot"
+
+
+def compress_chunk(codec, level, data):
+    """جزء مضغوط مستقل (يعمل في أي thread — المكتبات تترك الـ GIL أثناء الضغط)"""
+    if codec == "gzip":
+        c = zlib.compressobj(level, zlib.DEFLATED, 31)      # 31 = gzip member كامل
+        return c.compress(data) + c.flush()
+    if codec == "bz2":
+        return bz2.compress(data, level)
+    if codec == "xz":
+        return lzma.compress(data, preset=level)
+    return data
+
+
+def open_decompressed(codec, fileobj):
+    """file-like يفك الأجزاء المتتالية كملف واحد"""
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fileobj)
+    if codec == "bz2":
+        return bz2.BZ2File(fileobj)
+    if codec == "xz":
+        return lzma.LZMAFile(fileobj)
+    return fileobj
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupArchiver:
+    """
+    أرشيف النسخة الكاملة (zip):
+    - قاعدة البيانات: snapshot متسق ← أجزاء CHUNK_SIZE تُضغط بالتوازي ←
+      تُكتب بالترتيب مباشرة داخل الأرشيف (بدون ملف مضغوط وسيط)
+    - الـ snapshot نفسه (غير مضغوط) ملف مؤقت بجانب قاعدة البيانات وليس في مجلد
+      النسخ: المساحة المطلوبة = حجم قاعدة البيانات في مجلدها + حجم الأرشيف في مجلد النسخ
+    - الفواتير: manifest بجانب الأرشيفات (mtime/الحجم/sha256) — الملف الذي لم
+      يتغير يُنسخ كما هو من الأرشيف السابق بدون إعادة ضغط
+    - backup.json داخل الأرشيف: codec / level / اسم ملف قاعدة البيانات
+
+    عناصر الـ zip نفسها ZIP_STORED (الضغط تم قبلها)، لذلك نسخ عنصر من أرشيف
+    سابق هو نسخ bytes فقط.
+    """
+
+    def __init__(self, codec=DEFAULT_CODEC, level=DEFAULT_LEVEL, workers=None,
+                 chunk_size=CHUNK_SIZE):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown backup codec: {codec}")
+
+        low, high = CODEC_LEVELS[codec]
+        self.codec = codec
+        self.level = min(max(int(level), low), high)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+
+    @property
+    def ext(self):
+        return CODECS[self.codec]
+
+    # ============================================================
+    def archive(self, dst, src="database.db", files=("settings.json",), folders=("invoices",),
+                progress=None):
+        """
+        progress: صفحات الـ snapshot ثم صفحات الضغط (الإجمالي = 2 × عدد الصفحات)
+        يرجع dict: path / bytes / pages / seconds / mb_s / ratio / reused / compressed
+        """
+        snapshot = snapshot_database(os.path.abspath(src) + SNAPSHOT_SUFFIX, src, progress=progress)
+        pages = snapshot["pages"]
+        part = dst + ".part"
+
+        manifest_path = os.path.join(os.path.dirname(os.path.abspath(dst)), MANIFEST)
+        previous = self._load_manifest(manifest_path)
+        started = time.perf_counter()
+
+        def report(done_bytes):
+            done = min(pages, done_bytes * pages // max(1, snapshot["bytes"]))
+            if progress is not None and progress(pages + done) is False:
+                raise BackupCancelled()
+
+        try:
+            with ThreadPoolExecutor(self.workers) as pool, \
+                    zipfile.ZipFile(part, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+
+                db_entry = os.path.basename(src) + self.ext
+                with open(snapshot["path"], "rb") as f, \
+                        zf.open(db_entry, "w", force_zip64=True) as out:
+                    self._compress_stream(pool, iter(lambda: f.read(self.chunk_size), b""), out, report)
+
+                for path in files:
+                    if os.path.exists(path):
+                        zf.write(path, os.path.basename(path))
+
+                entries, reused, compressed = self._archive_folders(pool, zf, folders, previous)
+
+                zf.writestr(INFO_ENTRY, json.dumps({
+                    "version": ARCHIVE_VERSION,
+                    "created": datetime.now().isoformat(timespec="seconds"),
+                    "codec": self.codec,
+                    "level": self.level,
+                    "database": db_entry,
+                    "database_bytes": snapshot["bytes"],
+                    "files": len(entries),
+                }, ensure_ascii=False))
+
+            os.replace(part, dst)
+
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+
+        finally:
+            os.remove(snapshot["path"])
+
+        self._save_manifest(manifest_path, dst, entries)
+
+        seconds = snapshot["seconds"] + time.perf_counter() - started
+        size = os.path.getsize(dst)
+        return dict(
+            snapshot,
+            path=dst,
+            bytes=size,
+            seconds=seconds,
+            # السرعة محسوبة بحجم قاعدة البيانات المنسوخة وليس حجم الأرشيف
+            mb_s=snapshot["bytes"] / (1024 * 1024) / seconds if seconds else 0.0,
+            ratio=snapshot["bytes"] / size if size else 0.0,
+            reused=reused,
+            compressed=compressed,
+        )
+
+    # ============================================================
+    def _compress_stream(self, pool, chunks, out, report=None):
+        """ضغط متوازي بنافذة محدودة (ذاكرة ثابتة) مع الكتابة بنفس ترتيب القراءة"""
+        window = deque()
+        done = 0
+
+        def drain(limit):
+            nonlocal done
+            while len(window) > limit:
+                size, future = window.popleft()
+                out.write(future.result())
+                done += size
+                if report is not None:
+                    report(done)
+
+        for data in chunks:
+            window.append((len(data), pool.submit(compress_chunk, self.codec, self.level, data)))
+            drain(self.workers * 2)
+        drain(0)
+
+    def _archive_folders(self, pool, zf, folders, previous):
+        entries = {}
+        reused = compressed = 0
+        old_files = previous.get("files", {}) if previous else {}
+        old_zip = None
+        if previous and os.path.exists(previous.get("archive", "")):
+            old_zip = zipfile.ZipFile(previous["archive"])
+
+        window = deque()
+
+        def drain(limit):
+            while len(window) > limit:
+                rel, info, future = window.popleft()
+                zinfo = zipfile.ZipInfo(info["entry"], time.localtime(info["mtime_ns"] / 1e9)[:6])
+                zf.writestr(zinfo, future.result())
+
+        try:
+            for folder in folders:
+                for root, _, names in os.walk(folder):
+                    for name in sorted(names):
+                        full = os.path.join(root, name)
+                        rel = os.path.relpath(full).replace(os.sep, "/")
+                        st = os.stat(full)
+                        info = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "entry": rel + self.ext}
+                        old = old_files.get(rel)
+
+                        # نفس الوقت والحجم ← بدون قراءة؛ غير ذلك نقارن الـ hash
+                        same = old is not None and old["size"] == st.st_size and (
+                            old["mtime_ns"] == st.st_mtime_ns or old["sha256"] == _file_sha256(full)
+                        )
+                        if same and old_zip is not None and old["entry"] in old_zip.NameToInfo:
+                            info["sha256"] = old["sha256"]
+                            with old_zip.open(old["entry"]) as r, \
+                                    zf.open(info["entry"], "w", force_zip64=True) as w:
+                                shutil.copyfileobj(r, w, 1024 * 1024)
+                            reused += 1
+                        else:
+                            with open(full, "rb") as f:
+                                data = f.read()
+                            info["sha256"] = hashlib.sha256(data).hexdigest()
+                            window.append((rel, info, pool.submit(compress_chunk, self.codec, self.level, data)))
+                            drain(self.workers * 2)
+                            compressed += 1
+
+                        entries[rel] = info
+            drain(0)
+        finally:
+            if old_zip is not None:
+                old_zip.close()
+
+        return entries, reused, compressed
+
+    # ============================================================
+    def _load_manifest(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # ضغط مختلف = لا يمكن استخدام العناصر القديمة كما هي
+        if manifest.get("codec") != self.codec or manifest.get("level") != self.level:
+            return None
+        return manifest
+
+    def _save_manifest(self, path, archive, entries):
+        data = {"archive": os.path.abspath(archive), "codec": self.codec, "level": self.level,
+                "files": entries}
+        with open(path + ".part", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(path + ".part", path)
+
+
+# ================================================================
+# القراءة
+# ================================================================
+def archive_info(path):
+    """backup.json من الأرشيف — الأرشيفات القديمة (قبله) = database.db مضغوط deflate عادي"""
+    with zipfile.ZipFile(path) as zf:
+        if INFO_ENTRY in zf.NameToInfo:
+            return json.loads(zf.read(INFO_ENTRY).decode("utf-8"))
+    return {"version": 1, "codec": "none", "database": "database.db"}
+
+
+def extract_database(path, dst, progress=None):
+    """فك ملف قاعدة البيانات من الأرشيف إلى dst (تدفق بدون تحميل كامل في الذاكرة)"""
+    info = archive_info(path)
+    part = dst + ".part"
+    done = 0
+
+    try:
+        with zipfile.ZipFile(path) as zf, zf.open(info["database"]) as raw, open(part, "wb") as out:
+            reader = open_decompressed(info["codec"], raw)
+            for block in iter(lambda: reader.read(CHUNK_SIZE), b""):
+                out.write(block)
+                done += len(block)
+                if progress is not None and progress(done) is False:
+                    raise BackupCancelled()
+        os.replace(part, dst)
+
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+
+    return dst
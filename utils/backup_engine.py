@@ -0,0 +1,133 @@
+# utils/backup_engine.py
+
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+
+class BackupCancelled(Exception):
+    """المستخدم ألغى النسخ — الملف الناقص يتم حذفه"""
+
+
+# عدد الصفحات في كل خطوة + الانتظار بين الخطوات:
+# الكاتب يأخذ فرصته بين الخطوات بدل انتظار نسخ الملف كله
+STEP_PAGES = 1024
+STEP_SLEEP = 0.002
+
+# rollback journal: بعد هذا العدد من إعادة النسخ من البداية (كتابة مستمرة)
+# نثبت قفل القراءة حتى ينتهي النسخ — الكاتب ينتظر باقي النسخ فقط
+MAX_RESTARTS = 3
+
+
+def database_pages(src="database.db"):
+    """عدد صفحات قاعدة البيانات (لشريط التقدم قبل بدء النسخ)"""
+    conn = sqlite3.connect(src)
+    try:
+        return conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def snapshot_database(dst, src="database.db", pages=STEP_PAGES, sleep=STEP_SLEEP,
+                      progress=None):
+    """
+    نسخة متسقة من قاعدة البيانات عبر Online Backup API (بدل نسخ الملف).
+
+    - WAL: النسخ يتم من read transaction واحدة (snapshot ثابت) والكتابة مستمرة
+      أثناء النسخ — آخر العمليات بعد بداية النسخ لا تدخل فيها
+    - rollback journal: الكاتب يدخل بين الخطوات، وأي تعديل يعيد النسخ من
+      البداية تلقائياً (SQLite يضمن أن الناتج متسق) — بعد MAX_RESTARTS
+      يتم تثبيت قفل القراءة حتى لا يعاد النسخ بلا نهاية
+    - progress(عدد الصفحات المنسوخة) — لو رجع False يتم الإلغاء
+    - النسخة تكتب في ملف .part ثم تأخذ اسمها النهائي (لا ملفات ناقصة)
+
+    يرجع dict: path / bytes / pages / restarts / seconds / mb_s
+    """
+    part = dst + ".part"
+    if os.path.exists(part):
+        os.remove(part)
+
+    source = sqlite3.connect(src, timeout=10)
+    target = sqlite3.connect(part)
+    started = time.perf_counter()
+
+    state = {"done": 0, "restarts": 0, "pinned": False}
+
+    def pin():
+        # read transaction مفتوحة: كل الخطوات تقرأ نفس نسخة الصفحات
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        state["pinned"] = True
+
+    def step(status, remaining, total):
+        done = total - remaining
+        if done < state["done"]:
+            state["restarts"] += 1
+            if state["restarts"] >= MAX_RESTARTS and not state["pinned"]:
+                pin()
+        state["done"] = done
+
+        if progress is not None and progress(done) is False:
+            raise BackupCancelled()
+
+    try:
+        if source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            pin()
+
+        source.backup(target, pages=pages, progress=step, sleep=sleep)
+
+        if state["pinned"]:
+            source.rollback()
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        target.close()
+        os.replace(part, dst)
+
+    except BaseException:
+        target.close()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+
+    finally:
+        source.close()
+
+    seconds = time.perf_counter() - started
+    size = os.path.getsize(dst)
+
+    return {
+        "path": dst,
+        "bytes": size,
+        "pages": page_count,
+        "restarts": state["restarts"],
+        "seconds": seconds,
+        "mb_s": size / (1024 * 1024) / seconds if seconds else 0.0,
+    }
+
+
+def backup_path(folder, prefix="backup", ext=".db"):
+    """
+    backup_<timestamp>.db داخل المجلد (يتم إنشاؤه لو غير موجود).
+    نسختين في نفس الثانية: الثانية تأخذ backup_<timestamp>_2.db بدل الكتابة فوق الأولى
+    """
+    os.makedirs(folder, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+    path = os.path.join(folder, f"{prefix}_{timestamp}{ext}")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(folder, f"{prefix}_{timestamp}_{n}{ext}")
+    return path
+
+
+def describe(result):
+    """نص مختصر للسجل / الرسائل"""
+    text = (
+        f"{result['path']} — {result['bytes'] / (1024 * 1024):,.1f} MB "
+        f"في {result['seconds']:.1f}s ({result['mb_s']:,.1f} MB/s)"
+    )
+    if "new_bytes" in result:
+        # نسخة تزايدية: الجزء الذي كُتب فعلاً على القرص
+        text += f" — جديد: {result['new_bytes'] / (1024 * 1024):,.1f} MB"
+    return text
@@ -1,12 +1,132 @@
 import os
-import shutil
-from datetime import datetime
 
 from PyQt5 import QtCore
 from PyQt5.QtWidgets import QMessageBox
 
 from utils.settings_manager import SettingsManager
-from utils.db_manager import DatabaseManager
+from utils.db_manager import DatabaseManager, connection_registry
+from utils.export_jobs import ExportJobManager, export_jobs
+from utils.query_executor import query_executor
+from utils.global_signals import global_signals, ChangeEvent
+from utils.backup_engine import backup_path, database_pages, describe, snapshot_database
+from utils.backup_archiver import BackupArchiver, DEFAULT_CODEC, DEFAULT_LEVEL
+from utils.chunk_store import ChunkStore
+from utils.restore_engine import describe_restore, prepare_restore, restore_tables, swap_database
+
+
+STORE_DIR = "ChunkStore"
+
+
+# طابور النسخ الاحتياطي (نفس آلية التصدير: thread منفصل + تقدم + إلغاء)
+# منفصل عن طابور التصدير حتى لا ينتظر أحدهما الآخر
+backup_jobs = ExportJobManager(max_threads=1)
+
+
+def chunk_store(folder):
+    """مخزن النسخ التزايدية داخل مجلد النسخ (مشترك بين النسخ اليدوية والتلقائية)"""
+    return ChunkStore(os.path.join(folder, STORE_DIR))
+
+
+def incremental_backup(folder, src="database.db", keep_last=24, keep_days=30, progress=None):
+    """نسخة تزايدية ثم تطبيق سياسة الاحتفاظ في نفس الـ job (نفس الطابور = لا تعارض)"""
+    store = chunk_store(folder)
+    result = store.backup(src, progress=progress)
+    result["pruned"] = store.prune(keep_last, keep_days)
+    return result
+
+
+def submit_backup(folder, prefix="backup", archive=False, incremental=False, src="database.db",
+                  user="Auto-Backup", action="نسخ تلقائي"):
+    """
+    نسخة احتياطية في الخلفية — يرجع ExportJob (finished يحمل dict النتيجة).
+    archive=True: zip فيه قاعدة البيانات + الإعدادات + الفواتير
+    incremental=True: الأجزاء المتغيرة فقط داخل ChunkStore (مع سياسة الاحتفاظ)
+    """
+    pages = database_pages(src)
+    settings = SettingsManager()
+
+    if incremental:
+        job = backup_jobs.submit(
+            "نسخ تزايدي", incremental_backup, folder, src,
+            settings.get("backup_keep_last", 24), settings.get("backup_keep_days", 30),
+            total=2 * pages,
+        )
+    elif archive:
+        # ضغط متوازي بالـ codec / المستوى المختار في الإعدادات
+        archiver = BackupArchiver(
+            settings.get("backup_codec", DEFAULT_CODEC), settings.get("backup_level", DEFAULT_LEVEL)
+        )
+        dst = backup_path(folder, prefix, ".zip")
+        job = backup_jobs.submit(
+            f"نسخ احتياطي — {os.path.basename(dst)}", archiver.archive, dst, src,
+            total=2 * pages,
+        )
+    else:
+        dst = backup_path(folder, prefix, ".db")
+        job = backup_jobs.submit(
+            f"نسخ احتياطي — {os.path.basename(dst)}", snapshot_database, dst, src,
+            total=pages,
+        )
+
+    return job.then(lambda result: DatabaseManager().add_log(user, action, "النظام", describe(result)))
+
+
+# ================================================================
+# الاستعادة
+# ================================================================
+def submit_restore(path, tables=None, target="database.db", user="النظام"):
+    """
+    استعادة في الخلفية (نفس طابور النسخ = لا نسخ أثناء الاستعادة).
+    tables=None: استعادة كاملة — الـ job يجهز ويفحص الملف فقط، والتبديل يتم بعدها
+                 بـ complete_restore() على thread الواجهة
+    tables=[...]: استعادة جداول محددة فقط (تكتمل داخل الـ job)
+    """
+    name = os.path.basename(path)
+
+    if tables:
+        job = backup_jobs.submit(
+            f"استعادة جزئية — {name}", restore_tables, path, list(tables), target,
+            total=len(tables),
+        )
+
+        def done(result):
+            DatabaseManager(target).add_log(user, "استعادة جزئية", "النظام", describe_restore(result))
+            notify_restored(list(result["tables"]) + ["activity_log"])
+
+        return job.then(done)
+
+    return backup_jobs.submit(f"استعادة — {name}", prepare_restore, path, target, total=100)
+
+
+def complete_restore(result, user="النظام"):
+    """
+    تبديل قاعدة البيانات بالنسخة المجهزة (على thread الواجهة بعد نجاح الـ job):
+    إيقاف التصديرات والاستعلامات ← إغلاق كل الاتصالات ← تبديل الملف ←
+    ترحيل الـ schema لو النسخة أقدم. الاتصالات التالية تفتح الملف الجديد.
+    """
+    export_jobs.cancel_all()
+    export_jobs.wait()
+    query_executor.wait()
+    connection_registry.close_all()
+
+    result["swap_seconds"] = swap_database(result["staged"], result["target"])
+    result["seconds"] += result["swap_seconds"]
+
+    db = DatabaseManager(result["target"])
+    db.migrate()
+    db.add_log(user, "استعادة نسخة", "النظام", describe_restore(result))
+
+    # كل الجداول تغيرت: الكاش (sku_cache) والصفحات المفتوحة تعيد التحميل
+    notify_restored([r[0] for r in db.conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )])
+    return result
+
+
+def notify_restored(tables):
+    """الصفوف استُبدلت بالكامل (أرقام غير معروفة) — المشترك يعيد تحميل الجدول كله"""
+    for table in tables:
+        global_signals.notify(table, ChangeEvent.UPDATE)
 
 
 class AutoBackupScheduler(QtCore.QObject):
@@ -46,31 +166,20 @@ class AutoBackupScheduler(QtCore.QObject):
 
     # ==========================================================
     def perform_backup(self):
-        try:
-            backup_dir = self.settings.get("backup_path", "")
-            if not backup_dir:
-                return
-
-            # ملف قاعدة البيانات
-            src = "database.db"
-            if not os.path.exists(src):
-                return
-
-            # مجلد AutoBackups داخل المسار
-            folder_path = os.path.join(backup_dir, "AutoBackups")
-            os.makedirs(folder_path, exist_ok=True)
-
-            # اسم النسخة
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-            dst = os.path.join(folder_path, f"backup_{timestamp}.db")
-
-            shutil.copy2(src, dst)
-
-            # سجل النشاط
-            self.db.add_log("Auto-Backup", "نسخ تلقائي", "النظام", dst)
-
-            # إشعار
-            self.backup_done.emit(dst)
+        backup_dir = self.settings.get("backup_path", "")
+        if not backup_dir or not os.path.exists("database.db"):
+            return
 
+        # Backup API في الخلفية: نسخة متسقة بدون إيقاف الواجهة أو الكتابة
+        try:
+            if self.settings.get("backup_mode", "full") == "incremental":
+                job = submit_backup(backup_dir, incremental=True)
+            else:
+                job = submit_backup(os.path.join(backup_dir, "AutoBackups"))
+
+            job.then(
+                lambda result: self.backup_done.emit(result["path"]),
+                lambda error: print("AutoBackup Error:", error),
+            )
         except Exception as e:
             print("AutoBackup Error:", e)
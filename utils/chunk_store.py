@@ -0,0 +1,261 @@
+# utils/chunk_store.py
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils.backup_engine import BackupCancelled, backup_path, snapshot_database
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".part", "wb") as f:
+        f.write(data)
+    os.replace(path + ".part", path)
+
+
+def _page_size(path):
+    # رأس ملف SQLite: حجم الصفحة في البايتات 16-17 (القيمة 1 تعني 65536)
+    with open(path, "rb") as f:
+        header = f.read(100)
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+class ChunkStore:
+    """
+    نسخ احتياطي تزايدي بدون تكرار:
+    - كل snapshot يتقسم لأجزاء بحدود الصفحات (CHUNK_PAGES صفحة لكل جزء)
+    - كل جزء يتخزن مرة واحدة فقط باسم الـ sha256 الخاص به (chunks/ab/abcd...)
+    - كل نسخة = manifest فيه قائمة الأجزاء بالترتيب (manifests/backup_<timestamp>.json)
+    النسخة التالية تكتب فقط الأجزاء التي تغيرت، وأي نسخة يمكن إعادة بنائها كاملة.
+
+    الحذف (prune) يجب ألا يعمل بالتوازي مع backup (نفس طابور backup_jobs)
+    وإلا قد تُحذف أجزاء نسخة لم يُكتب الـ manifest الخاص بها بعد.
+    """
+
+    # 64KB لكل جزء مع صفحات 4KB: التعديلات تتوزع على صفحات الفهارس في كل الملف،
+    # الجزء الأصغر = بيانات جديدة أقل لكل نسخة لكن manifest أكبر وملفات أكثر
+    CHUNK_PAGES = 16
+
+    def __init__(self, root):
+        self.root = root
+        self.chunks_dir = os.path.join(root, "chunks")
+        self.manifests_dir = os.path.join(root, "manifests")
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    # ============================================================
+    # BACKUP
+    # ============================================================
+    def backup(self, src="database.db", progress=None):
+        """
+        snapshot متسق (Backup API) ثم تقسيمه وتخزين الأجزاء الجديدة فقط.
+        progress: صفحات الـ snapshot ثم صفحات التقسيم (الإجمالي = 2 × عدد الصفحات)
+        """
+        os.makedirs(self.root, exist_ok=True)
+        snapshot = snapshot_database(os.path.join(self.root, "snapshot.tmp"), src, progress=progress)
+        pages = snapshot["pages"]
+        started = time.perf_counter()
+
+        chunks, new_chunks, new_bytes = [], 0, 0
+        try:
+            page_size = _page_size(snapshot["path"])
+            chunk_size = page_size * self.CHUNK_PAGES
+
+            with open(snapshot["path"], "rb") as f:
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+
+                    digest = hashlib.sha256(data).hexdigest()
+                    path = self.chunk_path(digest)
+                    if not os.path.exists(path):
+                        _write_atomic(path, data)
+                        new_chunks += 1
+                        new_bytes += len(data)
+                    chunks.append(digest)
+
+                    done = min(pages, len(chunks) * self.CHUNK_PAGES)
+                    if progress is not None and progress(pages + done) is False:
+                        # الأجزاء المكتوبة بدون manifest يحذفها prune لاحقاً
+                        raise BackupCancelled()
+        finally:
+            os.remove(snapshot["path"])
+
+        seconds = snapshot["seconds"] + time.perf_counter() - started
+        manifest = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "source": os.path.abspath(src),
+            "size": snapshot["bytes"],
+            "page_size": page_size,
+            "chunk_size": chunk_size,
+            "chunks": chunks,
+            "new_chunks": new_chunks,
+            "new_bytes": new_bytes,
+            "seconds": round(seconds, 3),
+        }
+        # الاسم يُحدد عند الكتابة (وليس في البداية) حتى لا يأخذ اسم manifest كُتب أثناء التقسيم
+        manifest_path = backup_path(self.manifests_dir, "backup", ".json")
+        _write_atomic(manifest_path, json.dumps(manifest).encode("utf-8"))
+
+        return dict(
+            snapshot,
+            path=manifest_path,
+            new_chunks=new_chunks,
+            new_bytes=new_bytes,
+            seconds=seconds,
+            mb_s=snapshot["bytes"] / (1024 * 1024) / seconds if seconds else 0.0,
+        )
+
+    # ============================================================
+    # MANIFESTS
+    # ============================================================
+    def manifests(self):
+        """كل النسخ من الأقدم للأحدث — dict الـ manifest + name + path"""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+
+        result = []
+        for name in sorted(os.listdir(self.manifests_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.manifests_dir, name)
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest["name"] = name[:-len(".json")]
+            manifest["path"] = path
+            result.append(manifest)
+
+        # نفس الثانية: backup_<ts> ثم backup_<ts>_2 ثم ... _10 (الطول قبل الترتيب النصي)
+        result.sort(key=lambda m: (m["created"], len(m["name"]), m["name"]))
+        return result
+
+    def manifest(self, name):
+        path = os.path.join(self.manifests_dir, f"{name}.json")
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["name"] = name
+        manifest["path"] = path
+        return manifest
+
+    # ============================================================
+    # RESTORE (إعادة بناء نسخة)
+    # ============================================================
+    def restore(self, name, dst, progress=None):
+        """
+        إعادة بناء النسخة name كملف .db كامل في dst.
+        كل جزء يتم التحقق من الـ hash الخاص به قبل كتابته.
+        """
+        manifest = self.manifest(name)
+        pages_per_chunk = manifest["chunk_size"] // manifest["page_size"]
+        total_pages = manifest["size"] // manifest["page_size"]
+        part = dst + ".part"
+        started = time.perf_counter()
+
+        try:
+            with open(part, "wb") as out:
+                for i, digest in enumerate(manifest["chunks"], 1):
+                    path = self.chunk_path(digest)
+                    if not os.path.exists(path):
+                        raise ValueError(f"جزء مفقود من النسخة {name}: {digest}")
+
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        raise ValueError(f"جزء تالف في النسخة {name}: {digest}")
+
+                    out.write(data)
+
+                    if progress is not None and progress(min(total_pages, i * pages_per_chunk)) is False:
+                        raise BackupCancelled()
+
+            os.replace(part, dst)
+
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+
+        seconds = time.perf_counter() - started
+        return {
+            "path": dst,
+            "bytes": manifest["size"],
+            "pages": total_pages,
+            "seconds": seconds,
+            "mb_s": manifest["size"] / (1024 * 1024) / seconds if seconds else 0.0,
+        }
+
+    # ============================================================
+    # RETENTION
+    # ============================================================
+    def prune(self, keep_last=24, keep_days=30, progress=None):
+        """
+        سياسة الاحتفاظ:
+        - آخر keep_last نسخة دائماً
+        - + آخر نسخة من كل يوم خلال آخر keep_days يوم
+        ثم حذف الأجزاء التي لم تعد أي نسخة تستخدمها.
+        """
+        manifests = self.manifests()
+        keep = {m["name"] for m in manifests[-keep_last:]} if keep_last > 0 else set()
+
+        since = (datetime.now() - timedelta(days=keep_days)).date().isoformat()
+        daily = {}
+        for m in manifests:
+            day = m["created"][:10]
+            if day >= since:
+                daily[day] = m["name"]      # الترتيب تصاعدي → تبقى آخر نسخة في اليوم
+        keep.update(daily.values())
+
+        removed = [m for m in manifests if m["name"] not in keep]
+        for m in removed:
+            os.remove(m["path"])
+
+        freed = self.collect_garbage({d for m in manifests if m["name"] in keep for d in m["chunks"]})
+        return {"removed": len(removed), "kept": len(keep), "freed_bytes": freed}
+
+    def collect_garbage(self, referenced=None):
+        """حذف الأجزاء غير المستخدمة في أي manifest — يرجع المساحة المحررة"""
+        if referenced is None:
+            referenced = {d for m in self.manifests() for d in m["chunks"]}
+
+        freed = 0
+        for entry in self._chunk_files():
+            if entry.name not in referenced:
+                freed += entry.stat().st_size
+                os.remove(entry.path)
+        return freed
+
+    # ============================================================
+    # SPACE ACCOUNTING
+    # ============================================================
+    def usage(self):
+        """
+        logical_bytes: مجموع أحجام كل النسخ لو كانت نسخاً كاملة
+        stored_bytes: المساحة الفعلية للأجزاء على القرص
+        """
+        manifests = self.manifests()
+        logical = sum(m["size"] for m in manifests)
+        stored = sum(entry.stat().st_size for entry in self._chunk_files())
+
+        return {
+            "backups": len(manifests),
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "saved_bytes": max(0, logical - stored),
+            "ratio": logical / stored if stored else 0.0,
+        }
+
+    def _chunk_files(self):
+        if not os.path.isdir(self.chunks_dir):
+            return
+        for bucket in os.scandir(self.chunks_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file():
+                    yield entry
@@ -0,0 +1,392 @@
+# utils/cogs_engine.py
+
+import uuid
+from collections import deque
+
+from utils.db_manager import DatabaseManager
+from utils.settings_manager import SettingsManager
+
+
+PURCHASE, SALE = 0, 1
+
+# كل حركات الشراء والبيع بترتيبها الزمني (الشراء قبل البيع في نفس اللحظة)
+EVENTS_SQL = """
+    SELECT 0 AS kind, pi.id AS id, pi.item_id AS item_id,
+           COALESCE(pi.qty, 0) AS qty, COALESCE(pi.price, 0) AS price,
+           NULL AS unit_cost, COALESCE(p.date, '') AS date
+    FROM purchase_items pi
+    JOIN purchase_invoices p ON p.id = pi.invoice_id
+    WHERE pi.item_id IS NOT NULL AND {purchases}
+    UNION ALL
+    SELECT 1, si.id, si.item_id,
+           COALESCE(si.qty, 0), COALESCE(si.price, 0),
+           si.unit_cost, COALESCE(s.date, '')
+    FROM sales_items si
+    JOIN sales_invoices s ON s.id = si.invoice_id
+    WHERE si.item_id IS NOT NULL AND {sales}
+    ORDER BY date, kind, id
+"""
+
+
+class _Superseded(Exception):
+    """معالجة أخرى غيرت cogs_state أثناء الكتابة"""
+
+
+class _ItemCost:
+    """حالة التكلفة لصنف واحد أثناء المعالجة"""
+
+    def __init__(self, method, fallback, on_hand=0, avg_cost=0, last_cost=None, layers=()):
+        self.method = method
+        self.fallback = fallback or 0
+        self.on_hand = on_hand
+        self.avg_cost = avg_cost
+        self.last_cost = last_cost
+        self.layers = deque([list(l) for l in layers])
+
+    def current_cost(self):
+        if self.method == "fifo" and self.layers:
+            return self.layers[0][1]
+        if self.method == "average" and self.last_cost is not None:
+            return self.avg_cost
+        return self.last_cost if self.last_cost is not None else self.fallback
+
+    def purchase(self, qty, price):
+        if self.method == "average":
+            if self.on_hand > 0 and self.on_hand + qty > 0:
+                self.avg_cost = (self.on_hand * self.avg_cost + qty * price) / (self.on_hand + qty)
+            else:
+                self.avg_cost = price
+        elif qty > 0:
+            self.layers.append([qty, price])
+
+        self.on_hand += qty
+        self.last_cost = price
+
+    def sale(self, qty):
+        """يرجع تكلفة الوحدة لسطر البيع"""
+        if self.method == "average" or qty <= 0:
+            cost = self.current_cost()
+            if self.method == "fifo" and qty < 0:
+                # مرتجع بكمية سالبة: يرجع كطبقة بنفس التكلفة الحالية
+                self.layers.appendleft([-qty, cost])
+            self.on_hand -= qty
+            return cost
+
+        remaining, total = qty, 0.0
+        while remaining > 1e-9 and self.layers:
+            layer = self.layers[0]
+            take = min(layer[0], remaining)
+            total += take * layer[1]
+            layer[0] -= take
+            remaining -= take
+            if layer[0] <= 1e-9:
+                self.layers.popleft()
+
+        # بيع بدون رصيد كافٍ: الباقي بآخر تكلفة معروفة
+        if remaining > 1e-9:
+            total += remaining * (self.last_cost if self.last_cost is not None else self.fallback)
+
+        self.on_hand -= qty
+        return total / qty
+
+
+class CostEngine:
+    """
+    محرك تكلفة البضاعة المباعة (COGS).
+
+    - يحسب تكلفة الوحدة لكل سطر بيع ويكتبها في sales_items.unit_cost
+      (ومنها تتحدث تجميعات الأرباح profit_rollup تلقائياً)
+    - method: "fifo" (طبقات بالأقدم أولاً) أو "average" (متوسط متحرك)
+    - process() يعالج السطور الجديدة فقط من آخر نقطة توقف،
+      والسطور المؤرخة بتاريخ قديم تعيد حساب أصنافها فقط
+    """
+    METHODS = ("fifo", "average")
+
+    # حجم كل transaction كتابة (سطور بيع / أصناف) — قفل الكتابة يتحرر بين الدفعات.
+    # التحديث يمر على triggers الأرباح سطراً سطراً (~0.1s لكل دفعة): إعادة بناء
+    # profit_rollup مرة واحدة أسرع إجمالاً لكنها transaction واحدة طويلة
+    BATCH_ROWS = 5000
+    BATCH_ITEMS = 500
+
+    def __init__(self, db=None, method=None):
+        self.db = db or DatabaseManager()
+        self.method = method or SettingsManager().get("cogs_method", "fifo")
+
+        if self.method not in self.METHODS:
+            raise ValueError(f"Unknown COGS method: {self.method}")
+
+    # ============================================================
+    # المعالجة التدريجية
+    # ============================================================
+    def process(self):
+        """معالجة سطور الشراء/البيع الجديدة — يرجع عدد سطور البيع التي تغيرت تكلفتها"""
+        plan = self._plan()
+        return self._apply(plan) if plan else 0
+
+    def rebuild(self, item_ids=None):
+        """إعادة حساب التكلفة من أول حركة (كل الأصناف أو أصناف محددة)"""
+        return self._apply(self._plan(rebuild=True, item_ids=item_ids))
+
+    # ============================================================
+    # الاستعلام
+    # ============================================================
+    def item_cost(self, item_id):
+        """تكلفة الوحدة الحالية للصنف (أقدم طبقة في FIFO / المتوسط)"""
+        self.process()
+        item = self._load_items(self.db.conn, [item_id]).get(item_id)
+        return item.current_cost() if item else 0
+
+    def sale_line_costs(self, invoice_id):
+        """سطور فاتورة البيع مع تكلفة كل سطر وربحه"""
+        self.process()
+        rows = self.db.conn.execute("""
+            SELECT si.id, si.item_id, items.name AS item_name,
+                   si.qty, si.price, si.unit_cost,
+                   si.qty * si.unit_cost AS cost,
+                   si.qty * (si.price - si.unit_cost) AS profit
+            FROM sales_items si
+            LEFT JOIN items ON items.id = si.item_id
+            WHERE si.invoice_id = ?
+            ORDER BY si.id
+        """, (invoice_id,))
+        return [dict(r) for r in rows]
+
+    # ============================================================
+    # التنفيذ الداخلي
+    # ============================================================
+    @staticmethod
+    def _mark(event):
+        # ترتيب الحركة زمنياً كنص قابل للمقارنة (نفس ترتيب EVENTS_SQL)
+        return f"{event['date']}\x01{event['kind']}\x01{event['id']:012d}"
+
+    def _plan(self, rebuild=False, item_ids=None):
+        """
+        الحساب كله على اتصال القراءة داخل read transaction واحدة (snapshot ثابت)
+        بدون قفل الكتابة — يرجع ما يجب كتابته أو None لو لا جديد
+        """
+        conn = self.db.conn
+        conn.execute("BEGIN")
+        try:
+            state = self._load_state(conn)
+
+            if rebuild or state.get("method") != self.method:
+                plan = self._plan_rebuild(conn, item_ids if rebuild else None)
+            else:
+                plan = self._plan_incremental(conn, state)
+        finally:
+            conn.rollback()
+
+        if plan is not None:
+            plan["watermark"] = state
+        return plan
+
+    def _plan_incremental(self, conn, state):
+        last_purchase = int(state.get("purchase_line", 0))
+        last_sale = int(state.get("sale_line", 0))
+        mark = state.get("mark", "")
+
+        events = conn.execute(
+            EVENTS_SQL.format(purchases="pi.id > ?", sales="si.id > ?"),
+            (last_purchase, last_sale)
+        ).fetchall()
+
+        if not events:
+            return None
+
+        # حركة بتاريخ أقدم من آخر ما تمت معالجته → إعادة حساب الصنف من البداية
+        backdated = {e["item_id"] for e in events if self._mark(e) < mark}
+        items, updates = {}, []
+        if backdated:
+            items, updates = self._replay(conn, self._item_events(conn, backdated), backdated, reset=True)
+
+        fresh = [e for e in events if e["item_id"] not in backdated]
+        fresh_items, fresh_updates = self._replay(conn, fresh, {e["item_id"] for e in fresh}, reset=False)
+        items.update(fresh_items)
+        updates += fresh_updates
+
+        return {
+            "clear_all": False,
+            "items": items,
+            "updates": updates,
+            "state": {
+                "purchase_line": max([last_purchase] + [e["id"] for e in events if e["kind"] == PURCHASE]),
+                "sale_line": max([last_sale] + [e["id"] for e in events if e["kind"] == SALE]),
+                "mark": max([mark] + [self._mark(e) for e in events]),
+            },
+        }
+
+    def _plan_rebuild(self, conn, item_ids):
+        if item_ids is not None:
+            item_ids = set(item_ids)
+            items, updates = self._replay(conn, self._item_events(conn, item_ids), item_ids, reset=True)
+            return {"clear_all": False, "items": items, "updates": updates, "state": {}}
+
+        events = conn.execute(EVENTS_SQL.format(purchases="1", sales="1")).fetchall()
+        items, updates = self._replay(conn, events, {e["item_id"] for e in events}, reset=True)
+
+        last = {PURCHASE: 0, SALE: 0}
+        for e in events:
+            last[e["kind"]] = max(last[e["kind"]], e["id"])
+
+        return {
+            "clear_all": True,
+            "items": items,
+            "updates": updates,
+            "state": {
+                "purchase_line": max(last[PURCHASE], self._max_id(conn, "purchase_items")),
+                "sale_line": max(last[SALE], self._max_id(conn, "sales_items")),
+                "mark": self._mark(events[-1]) if events else "",
+            },
+        }
+
+    @staticmethod
+    def _item_events(conn, item_ids):
+        events = []
+        item_ids = list(item_ids)
+        for n in range(0, len(item_ids), 500):
+            chunk = item_ids[n:n + 500]
+            in_items = "item_id IN (%s)" % ",".join("?" * len(chunk))
+            events += conn.execute(
+                EVENTS_SQL.format(purchases="pi." + in_items, sales="si." + in_items), chunk * 2
+            ).fetchall()
+        events.sort(key=CostEngine._mark)
+        return events
+
+    def _replay(self, conn, events, item_ids, reset):
+        """حساب فقط — يرجع (حالة الأصناف, [(التكلفة, id سطر البيع)] للسطور المتغيرة)"""
+        if not item_ids:
+            return {}, []
+
+        items = self._load_items(conn, item_ids, fresh=reset)
+        updates = []
+
+        for e in events:
+            item = items[e["item_id"]]
+            if e["kind"] == PURCHASE:
+                item.purchase(e["qty"], e["price"])
+            else:
+                cost = item.sale(e["qty"])
+                if e["unit_cost"] is None or abs(e["unit_cost"] - cost) > 1e-9:
+                    updates.append((cost, e["id"]))
+
+        return items, updates
+
+    # ============================================================
+    # الكتابة على دفعات
+    # ============================================================
+    def _apply(self, plan):
+        """
+        كتابة نتيجة _plan في transactions قصيرة (BATCH_ROWS لكل دفعة) حتى لا يقف
+        حفظ الفواتير / السجل خلف إعادة بناء كاملة.
+
+        قبل كل دفعة: cogs_state لازم يكون كما قرأناه (watermark) — لو تغير فمعالجة
+        أخرى بدأت بعدنا ونتوقف. أول دفعة تكتب method = "" (حالة غير مكتملة):
+        لو توقف البرنامج في المنتصف، المعالجة التالية تعيد البناء كاملاً.
+        """
+        expected = dict(plan["watermark"])
+        run = uuid.uuid4().hex
+        updates = plan["updates"]
+        items = list(plan["items"].items())
+        state = dict(plan["state"], method=self.method, run=run)
+
+        def batch(work):
+            with self.db.writer() as conn:
+                if self._load_state(conn) != expected:
+                    raise _Superseded()
+                work(conn)
+
+        def start(conn):
+            self._save_state(conn, {"method": "", "run": run})
+            if plan["clear_all"]:
+                conn.execute("DELETE FROM item_costs")
+                conn.execute("DELETE FROM cost_layers")
+
+        def update_costs(chunk):
+            # تحديث التكلفة فقط للسطور التي تغيرت (profit_rollup يتحدث بالـ triggers)
+            return lambda conn: conn.executemany("UPDATE sales_items SET unit_cost = ? WHERE id = ?", chunk)
+
+        done = 0
+        try:
+            batch(start)
+            expected.update(method="", run=run)
+
+            for n in range(0, len(updates), self.BATCH_ROWS):
+                chunk = updates[n:n + self.BATCH_ROWS]
+                batch(update_costs(chunk))
+                done += len(chunk)
+
+            for n in range(0, len(items), self.BATCH_ITEMS):
+                chunk = dict(items[n:n + self.BATCH_ITEMS])
+                batch(lambda conn: self._save_items(conn, chunk))
+
+            batch(lambda conn: self._save_state(conn, state))
+
+        except _Superseded:
+            pass
+
+        return done
+
+    def _load_items(self, conn, item_ids, fresh=False):
+        item_ids = [i for i in item_ids if i is not None]
+        fallback, stored, layers = {}, {}, {}
+
+        # على دفعات حتى لا نتجاوز حد المتغيرات في SQLite
+        for n in range(0, len(item_ids), 500):
+            chunk = item_ids[n:n + 500]
+            marks = ",".join("?" * len(chunk))
+
+            fallback.update(conn.execute(
+                f"SELECT id, COALESCE(buy_price, 0) FROM items WHERE id IN ({marks})", chunk
+            ).fetchall())
+
+            if fresh:
+                continue
+
+            for r in conn.execute(f"SELECT * FROM item_costs WHERE item_id IN ({marks})", chunk):
+                stored[r["item_id"]] = r
+            for r in conn.execute(
+                f"SELECT item_id, qty, unit_cost FROM cost_layers WHERE item_id IN ({marks}) ORDER BY id",
+                chunk
+            ):
+                layers.setdefault(r["item_id"], []).append((r["qty"], r["unit_cost"]))
+
+        items = {}
+
+        for item_id in item_ids:
+            s = stored.get(item_id)
+            items[item_id] = _ItemCost(
+                self.method, fallback.get(item_id),
+                on_hand=s["on_hand"] if s else 0,
+                avg_cost=s["avg_cost"] if s else 0,
+                last_cost=s["last_cost"] if s else None,
+                layers=layers.get(item_id, ()),
+            )
+
+        return items
+
+    def _save_items(self, conn, items):
+        conn.executemany(
+            "INSERT OR REPLACE INTO item_costs(item_id, on_hand, avg_cost, last_cost) VALUES (?, ?, ?, ?)",
+            [(i, c.on_hand, c.avg_cost, c.last_cost) for i, c in items.items()]
+        )
+
+        conn.executemany("DELETE FROM cost_layers WHERE item_id = ?", [(i,) for i in items])
+        conn.executemany(
+            "INSERT INTO cost_layers(item_id, qty, unit_cost) VALUES (?, ?, ?)",
+            [(i, q, cost) for i, c in items.items() for q, cost in c.layers]
+        )
+
+    @staticmethod
+    def _load_state(conn):
+        return dict(conn.execute("SELECT name, value FROM cogs_state").fetchall())
+
+    @staticmethod
+    def _save_state(conn, values):
+        conn.executemany(
+            "INSERT OR REPLACE INTO cogs_state(name, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()]
+        )
+
+    @staticmethod
+    def _max_id(conn, table):
+        return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
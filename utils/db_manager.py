@@ -1,167 +1,338 @@
 import sqlite3
 import os
 import json
-from datetime import datetime
+import re
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 
-class DatabaseManager:
-    def __init__(self, db_path="database.db"):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.cur = self.conn.cursor()
+from utils import db_migrations
+from utils.settings_manager import SettingsManager
 
-        self.create_all_tables()
-        self.ensure_default_roles()
-        self.ensure_admin_user()
 
-    # ===============================================================
-    # إنشاء الجداول
-    # ===============================================================
-    def create_all_tables(self):
+# ===============================================================
+# بروفايلات الأداء (PRAGMA) — يتم اختيارها من settings.json
+# ===============================================================
+DB_PROFILES = {
+    # الإعدادات الافتراضية لـ SQLite (rollback journal)
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "mmap_size": 0,
+        "busy_timeout": 5000,
+    },
+    # WAL: القراءة لا تمنع الكتابة والعكس
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,           # ~16MB
+        "temp_store": "MEMORY",
+        "mmap_size": 64 * 1024 * 1024,
+        "busy_timeout": 5000,
+    },
+    # للسيرفرات / الأجهزة ذات الذاكرة الكبيرة
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,           # ~64MB
+        "temp_store": "MEMORY",
+        "mmap_size": 256 * 1024 * 1024,
+        "busy_timeout": 10000,
+    },
+}
 
-        # --- roles ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS roles(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                permissions TEXT
-            )
-        """)
+DEFAULT_DB_PROFILE = "balanced"
 
-        # --- users ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS users(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                full_name TEXT,
-                role_id INTEGER,
-                created_at TEXT,
-                FOREIGN KEY(role_id) REFERENCES roles(id)
-            )
-        """)
+# الترتيب مهم: journal_mode أولاً ثم باقي الإعدادات
+PRAGMA_ORDER = ["busy_timeout", "journal_mode", "synchronous",
+                "cache_size", "temp_store", "mmap_size"]
 
-        # --- activity log ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS activity_log(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user TEXT,
-                action TEXT,
-                section TEXT,
-                details TEXT,
-                timestamp TEXT
-            )
-        """)
 
-        # --- warehouses ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS warehouses(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                location TEXT
-            )
-        """)
+def load_db_pragmas(settings=None):
+    """
+    يقرأ البروفايل من settings.json:
+        "db_profile": "safe" | "balanced" | "performance"
+        "db_pragmas": {"cache_size": -32000, ...}   ← تعديل قيم منفردة (اختياري)
+    """
+    settings = settings or SettingsManager()
 
-        # --- items ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS items(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                sku TEXT,
-                quantity INTEGER DEFAULT 0,
-                min_quantity INTEGER DEFAULT 0,
-                warehouse_id INTEGER,
-                FOREIGN KEY(warehouse_id) REFERENCES warehouses(id)
-            )
-        """)
+    name = settings.get("db_profile", DEFAULT_DB_PROFILE)
+    pragmas = dict(DB_PROFILES.get(name, DB_PROFILES[DEFAULT_DB_PROFILE]))
 
-        # --- suppliers ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS suppliers(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                phone TEXT,
-                address TEXT
-            )
-        """)
+    overrides = settings.get("db_pragmas", {}) or {}
+    for key, value in overrides.items():
+        if key in PRAGMA_ORDER:
+            pragmas[key] = value
 
-        # --- customers ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS customers(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                phone TEXT,
-                address TEXT
-            )
-        """)
+    return pragmas
 
-        # --- transactions ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS transactions(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT,
-                item_id INTEGER,
-                quantity INTEGER,
-                from_warehouse INTEGER,
-                to_warehouse INTEGER,
-                user TEXT,
-                notes TEXT,
-                date TEXT,
-                FOREIGN KEY(item_id) REFERENCES items(id),
-                FOREIGN KEY(from_warehouse) REFERENCES warehouses(id),
-                FOREIGN KEY(to_warehouse) REFERENCES warehouses(id)
-            )
-        """)
 
-        # --- sales invoices ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS sales_invoices(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                total REAL,
-                date TEXT,
-                user TEXT
-            )
-        """)
+def apply_pragmas(conn, pragmas):
+    for key in PRAGMA_ORDER:
+        if key not in pragmas:
+            continue
 
-        # --- sales items ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS sales_items(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                invoice_id INTEGER,
-                item_id INTEGER,
-                qty INTEGER,
-                price REAL,
-                FOREIGN KEY(invoice_id) REFERENCES sales_invoices(id),
-                FOREIGN KEY(item_id) REFERENCES items(id)
-            )
-        """)
+        value = pragmas[key]
+        if not isinstance(value, int) and not str(value).isalpha():
+            continue
 
-        # --- purchases invoices ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS purchase_invoices(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                supplier_id INTEGER,
-                total REAL,
-                date TEXT,
-                user TEXT
-            )
-        """)
+        try:
+            conn.execute(f"PRAGMA {key} = {value}")
+        except sqlite3.OperationalError as e:
+            # مثال: تغيير journal_mode أثناء وجود اتصالات أخرى
+            print(f"PRAGMA {key} error: {e}")
 
-        # --- purchase items ---
-        self.cur.execute("""
-            CREATE TABLE IF NOT EXISTS purchase_items(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                invoice_id INTEGER,
-                item_id INTEGER,
-                qty INTEGER,
-                price REAL,
-                FOREIGN KEY(invoice_id) REFERENCES purchase_invoices(id),
-                FOREIGN KEY(item_id) REFERENCES items(id)
-            )
-        """)
 
-        self.conn.commit()
+# الجداول التي تكبر مع الوقت ولا يجب عمل SCAN عليها داخل join
+LARGE_TABLES = {
+    "items", "transactions", "activity_log",
+    "sales_invoices", "sales_items",
+    "purchase_invoices", "purchase_items",
+}
+
+SQL_KEYWORDS = {"ON", "WHERE", "LEFT", "INNER", "JOIN", "ORDER", "GROUP",
+                "LIMIT", "USING", "CROSS", "NATURAL", "UNION", "HAVING"}
+
+
+def date_range(column, date_from=None, date_to=None):
+    """شروط فترة تاريخ تستخدم فهرس العمود — date_to شامل لليوم كله"""
+    where, params = [], []
+
+    if date_from:
+        where.append(f"{column} >= ?")
+        params.append(date_from)
+
+    if date_to:
+        # أقل من بداية اليوم التالي — يشمل الوقت داخل نفس اليوم ويستخدم الفهرس
+        where.append(f"{column} < date(?, '+1 day')")
+        params.append(date_to)
+
+    return where, params
+
+
+def split_months(date_from=None, date_to=None):
+    """
+    تقسيم فترة [date_from, date_to] إلى أشهر كاملة + أيام على الأطراف.
+    يرجع (أول شهر, آخر شهر, [(من, إلى), ...]) — None = مفتوح، "" = لا أشهر كاملة
+    """
+    start = date.fromisoformat(date_from[:10]) if date_from else None
+    end = date.fromisoformat(date_to[:10]) if date_to else None
+    edges = []
+
+    first = None
+    if start and start.day != 1:
+        month_end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        edge_end = min(month_end, end) if end else month_end
+        edges.append((start.isoformat(), edge_end.isoformat()))
+        start = edge_end + timedelta(days=1)
+    if start:
+        first = start.strftime("%Y-%m")
+
+    last = None
+    if end:
+        next_day = end + timedelta(days=1)
+        if next_day.day != 1:
+            edge_start = max(end.replace(day=1), start) if start else end.replace(day=1)
+            if edge_start <= end:
+                edges.append((edge_start.isoformat(), end.isoformat()))
+            end = edge_start - timedelta(days=1)
+        last = end.strftime("%Y-%m")
+
+    if start and end and start > end:
+        first = last = ""
+
+    return first, last, edges
+
+
+def like_pattern(text):
+    """نص بحث → نمط LIKE '%text%' مع escape لـ % و _ (استخدم ESCAPE '\\')"""
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{text}%"
+
+
+# ===============================================================
+# سجل الاتصالات — اتصال واحد لكل thread + اتصال كتابة مشترك
+# ===============================================================
+class _WriterSlot:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.depth = 0
+
+
+class ConnectionRegistry:
+    """
+    يوزع اتصالات SQLite بدلاً من فتح اتصال جديد مع كل DatabaseManager:
+    - اتصال قراءة واحد لكل thread لكل قاعدة بيانات
+    - اتصال كتابة واحد مشترك لكل قاعدة بيانات محمي بـ lock
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writers = {}
+        self._connections = []
+        self._generation = 0
+        self._pragmas = None
+
+    # ---------------------------------------------------------------
+    @staticmethod
+    def _key(db_path):
+        return os.path.abspath(db_path)
+
+    def configure(self, pragmas):
+        """تغيير بروفايل الـ PRAGMA (يطبق على الاتصالات الجديدة)"""
+        self._pragmas = dict(pragmas)
+
+    @property
+    def pragmas(self):
+        if self._pragmas is None:
+            self._pragmas = load_db_pragmas()
+        return self._pragmas
+
+    def _open(self, db_path):
+        # check_same_thread=False حتى نستطيع الإغلاق من close_all
+        # الاستخدام الفعلي يظل محصوراً في thread واحد (أو تحت lock الكاتب)
+        pragmas = self.pragmas
+        conn = sqlite3.connect(
+            db_path,
+            timeout=pragmas.get("busy_timeout", 5000) / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, pragmas)
+
+        with self._lock:
+            self._connections.append(conn)
+
+        return conn
+
+    def _thread_slots(self):
+        if getattr(self._local, "generation", None) != self._generation:
+            self._local.generation = self._generation
+            self._local.conns = {}
+            self._local.cursors = {}
+        return self._local.conns, self._local.cursors
+
+    # ---------------------------------------------------------------
+    def get_connection(self, db_path):
+        """اتصال القراءة الخاص بالـ thread الحالي"""
+        conns, _ = self._thread_slots()
+        key = self._key(db_path)
+
+        if key not in conns:
+            conns[key] = self._open(db_path)
+
+        return conns[key]
+
+    def get_cursor(self, db_path):
+        """Cursor مشترك لكل الـ DatabaseManager على نفس الـ thread"""
+        conns, cursors = self._thread_slots()
+        key = self._key(db_path)
+
+        if key not in cursors:
+            cursors[key] = self.get_connection(db_path).cursor()
+
+        return cursors[key]
+
+    # ---------------------------------------------------------------
+    @contextmanager
+    def writer(self, db_path):
+        """
+        اتصال الكتابة المشترك داخل transaction واحدة.
+        الاستدعاءات المتداخلة تنضم لنفس الـ transaction ويتم الـ commit
+        مرة واحدة عند الخروج من المستوى الخارجي.
+        """
+        key = self._key(db_path)
+
+        with self._lock:
+            slot = self._writers.get(key)
+
+        if slot is None:
+            conn = self._open(db_path)
+            with self._lock:
+                slot = self._writers.setdefault(key, _WriterSlot(conn))
+            if slot.conn is not conn:
+                conn.close()
+
+        with slot.lock:
+            outer = slot.depth == 0
+            if outer:
+                slot.conn.execute("BEGIN IMMEDIATE")
+
+            slot.depth += 1
+            try:
+                yield slot.conn
+            except BaseException:
+                slot.depth -= 1
+                if outer:
+                    slot.conn.rollback()
+                raise
+            else:
+                slot.depth -= 1
+                if outer:
+                    slot.conn.commit()
+
+    # ---------------------------------------------------------------
+    def close_all(self):
+        """إغلاق كل الاتصالات المفتوحة (عند الخروج من البرنامج)"""
+        with self._lock:
+            connections = self._connections
+            self._connections = []
+            self._writers = {}
+            self._generation += 1
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+# كائن واحد عالمي يستخدمه كل DatabaseManager
+connection_registry = ConnectionRegistry()
+
+
+class DatabaseManager:
+    def __init__(self, db_path="database.db"):
+        self.db_path = db_path
+
+    # ---------------------------------------------------------------
+    @property
+    def conn(self):
+        return connection_registry.get_connection(self.db_path)
+
+    @property
+    def cur(self):
+        return connection_registry.get_cursor(self.db_path)
+
+    def writer(self):
+        return connection_registry.writer(self.db_path)
+
+    # ===============================================================
+    # إنشاء / ترقية الجداول
+    # ===============================================================
+    def migrate(self):
+        """
+        تطبيق ترحيلات الـ schema + البيانات الافتراضية في transaction واحدة.
+        تُستدعى مرة واحدة عند تشغيل البرنامج (InventoryApp).
+        """
+        with self.writer() as conn:
+            db_migrations.migrate(conn)
+            self.ensure_default_roles()
+            self.ensure_admin_user()
+
+    def create_all_tables(self):
+        self.migrate()
+
+    def checkpoint(self):
+        """
+        دمج ملف الـ WAL داخل ملف قاعدة البيانات.
+        ضروري قبل نسخ database.db كملف وإلا النسخة هتفقد آخر العمليات.
+        """
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
     # ===============================================================
     # أدوار وصلاحيات
@@ -180,28 +351,28 @@ class DatabaseManager:
         return perms
 
     def ensure_default_roles(self):
-        self.cur.execute("SELECT COUNT(*) FROM roles")
-        if self.cur.fetchone()[0] == 0:
-            self.add_role("مدير النظام", self.get_default_permissions())
+        with self.writer() as conn:
+            if conn.execute("SELECT COUNT(*) FROM roles").fetchone()[0] == 0:
+                self.add_role("مدير النظام", self.get_default_permissions())
 
     def ensure_admin_user(self):
-        self.cur.execute("SELECT * FROM users WHERE username='admin'")
-        if not self.cur.fetchone():
-            self.cur.execute("SELECT id FROM roles WHERE name='مدير النظام'")
-            role_id = self.cur.fetchone()["id"]
+        with self.writer() as conn:
+            if not conn.execute("SELECT id FROM users WHERE username='admin'").fetchone():
+                role_id = conn.execute(
+                    "SELECT id FROM roles WHERE name='مدير النظام'"
+                ).fetchone()["id"]
 
-            self.cur.execute("""
-                INSERT INTO users(username, password, full_name, role_id)
-                VALUES('admin', 'admin', 'Administrator', ?)
-            """, (role_id,))
-            self.conn.commit()
+                conn.execute("""
+                    INSERT INTO users(username, password, full_name, role_id)
+                    VALUES('admin', 'admin', 'Administrator', ?)
+                """, (role_id,))
 
     def add_role(self, name, permissions):
-        self.cur.execute("""
-            INSERT INTO roles(name, permissions)
-            VALUES(?, ?)
-        """, (name, json.dumps(permissions)))
-        self.conn.commit()
+        with self.writer() as conn:
+            conn.execute("""
+                INSERT INTO roles(name, permissions)
+                VALUES(?, ?)
+            """, (name, json.dumps(permissions)))
 
     # ===============================================================
     # إحضار جميع الأدوار
@@ -259,14 +430,271 @@ class DatabaseManager:
         self.cur.execute("SELECT * FROM warehouses")
         return [dict(r) for r in self.cur.fetchall()]
 
-    def get_items(self):
+    def get_items(self, ids=None):
+        sql = """
+            SELECT items.*, warehouses.name AS warehouse
+            FROM items
+            LEFT JOIN warehouses ON warehouses.id = items.warehouse_id
+        """
+        params = ()
+        if ids is not None:
+            ids = list(ids)
+            sql += " WHERE items.id IN (%s)" % ",".join("?" * len(ids))
+            params = ids
+
+        self.cur.execute(sql, params)
+        return [dict(r) for r in self.cur.fetchall()]
+
+    def add_item(self, name, sku, quantity=0, min_quantity=0, warehouse_id=None):
+        """الكود الفارغ يُحفظ NULL (الفهرس الفريد idx_items_sku يسمح بتكراره)"""
+        with self.writer() as conn:
+            return conn.execute("""
+                INSERT INTO items(name, sku, quantity, min_quantity, warehouse_id)
+                VALUES (?, NULLIF(TRIM(?), ''), ?, ?, ?)
+            """, (name, sku or "", quantity, min_quantity, warehouse_id)).lastrowid
+
+    def get_item_by_sku(self, sku):
+        """صنف واحد بالكود / الباركود (فهرس idx_items_sku) — None لو غير موجود"""
+        sku = (sku or "").strip()
+        if not sku:
+            return None
+
         self.cur.execute("""
             SELECT items.*, warehouses.name AS warehouse
             FROM items
             LEFT JOIN warehouses ON warehouses.id = items.warehouse_id
-        """)
+            WHERE items.sku = ?
+        """, (sku,))
+        row = self.cur.fetchone()
+        return dict(row) if row else None
+
+    def update_item_buy_price(self, item_id, price):
+        with self.writer() as conn:
+            conn.execute("UPDATE items SET buy_price=? WHERE id=?", (price, item_id))
+
+    def update_item_sell_price(self, item_id, price):
+        with self.writer() as conn:
+            conn.execute("UPDATE items SET sell_price=? WHERE id=?", (price, item_id))
+
+    # ===============================================================
+    # دفتر حركة المخزون — items.quantity يتحدث منه بالـ triggers
+    # ===============================================================
+    def record_stock_movement(self, item_id, qty, kind, ref_table=None, ref_id=None,
+                              date=None, user=None, warehouse_id=None):
+        """
+        إضافة حركة يدوية للدفتر (مرتجع / تسوية جرد ...).
+        qty موجبة = دخول للمخزن، سالبة = خروج.
+        """
+        date = date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.writer() as conn:
+            cur = conn.execute("""
+                INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user)
+                SELECT id, COALESCE(?, warehouse_id), ?, ?, ?, ?, ?, ?
+                FROM items WHERE id = ?
+            """, (warehouse_id, qty, kind, ref_table, ref_id, date, user, item_id))
+            return cur.lastrowid if cur.rowcount else None
+
+    def update_item_quantity(self, item_id, qty, user=None):
+        """ضبط الكمية على قيمة فعلية (جرد) — يُسجل الفرق فقط كحركة audit"""
+        with self.writer() as conn:
+            row = conn.execute("SELECT COALESCE(quantity, 0) FROM items WHERE id = ?", (item_id,)).fetchone()
+            if row is None or row[0] == qty:
+                return None
+
+            cur = conn.execute("""
+                INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, date, user)
+                SELECT id, warehouse_id, ? - COALESCE(quantity, 0), 'audit', ?, ?
+                FROM items WHERE id = ?
+            """, (qty, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), user, item_id))
+            return cur.lastrowid
+
+    def log_audit_adjustment(self, user, item_id, system_qty, actual_qty):
+        self.add_log(
+            user, "تسوية جرد", "الجرد",
+            f"صنف #{item_id}: {system_qty} → {actual_qty} (فرق {actual_qty - system_qty})"
+        )
+
+    def get_stock_movements(self, item_id, date_from=None, date_to=None):
+        """حركات الصنف مع الرصيد بعد كل حركة"""
+        where, params = date_range("date", date_from, date_to)
+        where = " AND ".join(["item_id = ?"] + where)
+        opening = self.stock_at(item_id, self._day_before(date_from)) if date_from else 0
+
+        self.cur.execute(f"""
+            SELECT id, item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user,
+                   ? + SUM(qty) OVER (ORDER BY date, id) AS balance
+            FROM stock_ledger
+            WHERE {where}
+            ORDER BY date, id
+        """, [opening, item_id] + params)
         return [dict(r) for r in self.cur.fetchall()]
 
+    @staticmethod
+    def _day_before(day):
+        return (datetime.strptime(day[:10], "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # ---------------------------------------------------------------
+    # الرصيد في تاريخ معين = أقرب نقطة حفظ قبله + الحركات بعدها
+    # ---------------------------------------------------------------
+    STOCK_AT_SQL = """
+        SELECT items.id AS item_id, items.name,
+               COALESCE(sn.qty, 0) + COALESCE((
+                   SELECT SUM(l.qty) FROM stock_ledger l
+                   WHERE l.item_id = items.id
+                     AND l.date >= COALESCE(date(sn.as_of, '+1 day'), '')
+                     AND l.date < date(:day, '+1 day')
+               ), 0) AS qty
+        FROM items
+        LEFT JOIN stock_snapshots sn
+               ON sn.item_id = items.id
+              AND sn.as_of = (SELECT MAX(as_of) FROM stock_snapshots
+                              WHERE item_id = items.id AND as_of <= :day)
+    """
+
+    def stock_at(self, item_id, day):
+        """رصيد صنف واحد في نهاية يوم day"""
+        row = self.conn.execute(
+            self.STOCK_AT_SQL + " WHERE items.id = :item", {"day": day[:10], "item": item_id}
+        ).fetchone()
+        return row["qty"] if row else 0
+
+    def stock_at_date(self, day, item_ids=None):
+        """أرصدة كل الأصناف (أو أصناف محددة) في نهاية يوم day → {item_id: qty}"""
+        sql, params = self.STOCK_AT_SQL, {"day": day[:10]}
+        if item_ids is not None:
+            item_ids = list(item_ids)
+            sql += " WHERE items.id IN (%s)" % ",".join(f":i{n}" for n in range(len(item_ids)))
+            params.update({f"i{n}": i for n, i in enumerate(item_ids)})
+
+        return {r["item_id"]: r["qty"] for r in self.conn.execute(sql, params)}
+
+    def create_stock_snapshots(self, as_of=None):
+        """
+        نقطة حفظ لرصيد كل الأصناف في نهاية يوم as_of (افتراضياً أمس).
+        تُحسب من نقطة الحفظ السابقة + حركات الفترة فقط.
+        الحركات المؤرخة قبل نقطة حفظ تحذفها تلقائياً (trigger) فتُعاد لاحقاً.
+        """
+        as_of = (as_of or self._day_before(date.today().isoformat()))[:10]
+        with self.writer() as conn:
+            conn.execute("DELETE FROM stock_snapshots WHERE as_of = ?", (as_of,))
+            cur = conn.execute(f"""
+                INSERT INTO stock_snapshots(item_id, as_of, qty)
+                SELECT item_id, :day, qty FROM ({self.STOCK_AT_SQL})
+                WHERE qty != 0 OR item_id IN (SELECT item_id FROM stock_ledger)
+            """, {"day": as_of})
+            return cur.rowcount
+
+    def ensure_stock_snapshots(self, interval_days=30):
+        """إنشاء نقطة حفظ جديدة لو مر على آخر نقطة أكثر من interval_days"""
+        last = self.conn.execute("SELECT MAX(as_of) FROM stock_snapshots").fetchone()[0]
+        as_of = self._day_before(date.today().isoformat())
+
+        if last and (date.fromisoformat(as_of) - date.fromisoformat(last)).days < interval_days:
+            return 0
+        return self.create_stock_snapshots(as_of)
+
+    def check_stock_ledger(self, repair=False):
+        """
+        مقارنة items.quantity بمجموع الدفتر.
+        يرجع {item_id: (الكمية, مجموع الدفتر)}، ومع repair=True تُضاف حركة تسوية.
+        """
+        mismatches = {
+            r[0]: (r[1], r[2]) for r in self.conn.execute("""
+                SELECT items.id, COALESCE(items.quantity, 0), COALESCE(SUM(l.qty), 0) AS total
+                FROM items
+                LEFT JOIN stock_ledger l ON l.item_id = items.id
+                GROUP BY items.id
+                HAVING abs(COALESCE(items.quantity, 0) - total) > 1e-9
+            """)
+        }
+
+        if mismatches and repair:
+            with self.writer() as conn:
+                # opening لا تغير items.quantity — فقط تضبط الدفتر على الكمية الحالية
+                conn.executemany("""
+                    INSERT INTO stock_ledger(item_id, qty, kind, date)
+                    VALUES (?, ?, 'opening', ?)
+                """, [
+                    (item_id, qty - total, db_migrations.OPENING_DATE)
+                    for item_id, (qty, total) in mismatches.items()
+                ])
+
+        return mismatches
+
+    # ===============================================================
+    # البحث النصي (فهارس FTS5 — تتحدث بالـ triggers)
+    # ===============================================================
+    # أعمدة إضافية لكل كيان في نتيجة البحث (نفس شكل get_items)
+    SEARCH_SELECT = {
+        "items": ("items.*, warehouses.name AS warehouse",
+                  "LEFT JOIN warehouses ON warehouses.id = items.warehouse_id"),
+    }
+
+    @staticmethod
+    def _search_match(index, query):
+        """
+        شروط البحث على جدول الفهرس: كل كلمة لازم تظهر (AND).
+        الكلمات من 3 حروف فأكثر تستخدم MATCH (trigram)، والأقصر LIKE.
+        """
+        where, params = [], []
+        words = db_migrations.normalize_search_text(query).split()
+
+        long_words = [w for w in words if len(w) >= 3]
+        if long_words:
+            where.append(f"{index}.text MATCH ?")
+            params.append(" ".join('"%s"' % w.replace('"', '""') for w in long_words))
+
+        for w in words:
+            if len(w) < 3:
+                where.append(f"{index}.text LIKE ? ESCAPE '\\'")
+                params.append(like_pattern(w))
+
+        return where, params
+
+    def search_ids(self, entity, query, limit=None):
+        """أرقام الصفوف المطابقة فقط (للفلترة داخل قائمة محملة)"""
+        index = f"search_{entity}"
+        where, params = self._search_match(index, query)
+        if not where:
+            return []
+
+        sql = f"SELECT rowid FROM {index} WHERE {' AND '.join(where)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [r[0] for r in self.conn.execute(sql, params)]
+
+    def search(self, entity, query, limit=50):
+        """
+        بحث في items / suppliers / customers / transactions.
+        يتجاهل الفرق بين أ/إ/آ/ا و ى/ي و ة/ه والتشكيل، ويطابق أي جزء من الكلمة.
+        يرجع صفوف الجدول الأصلي (أول limit نتيجة) — استعلام فارغ يرجع [].
+        """
+        table, _ = db_migrations.SEARCH_INDEXES[entity]
+        index = f"search_{entity}"
+        where, params = self._search_match(index, query)
+        if not where:
+            return []
+
+        columns, joins = self.SEARCH_SELECT.get(entity, (f"{table}.*", ""))
+        sql = f"""
+            SELECT {columns}
+            FROM {index}
+            JOIN {table} ON {table}.id = {index}.rowid
+            {joins}
+            WHERE {" AND ".join(where)}
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        self.cur.execute(sql, params)
+        return [dict(r) for r in self.cur.fetchall()]
+
+    def rebuild_search_index(self, entities=None):
+        with self.writer() as conn:
+            db_migrations.rebuild_search_index(conn.cursor(), entities)
+
     # ===============================================================
     # الموردين + العملاء
     # ===============================================================
@@ -296,6 +724,98 @@ class DatabaseManager:
         """)
         return [dict(r) for r in self.cur.fetchall()]
 
+    def query_transactions(self, date_from=None, date_to=None, type=None, text=None,
+                           limit=200, offset=0, order="desc", after=None):
+        """
+        فلترة الأذونات داخل SQL مع pagination.
+
+        - date_from / date_to: "YYYY-MM-DD" (date_to شامل اليوم كله)
+        - type: صرف / استلام / تحويل (None أو "الكل" = بدون فلتر)
+        - text: بحث في اسم الصنف / المستخدم / الملاحظات
+        - after: (date, id) لآخر صف في الصفحة السابقة (keyset pagination)
+          لو None يتم استخدام offset
+        """
+        filters = (date_from, date_to, type, text, order)
+        if after is None:
+            sql, params = self._transactions_query(*filters)
+            self.cur.execute(sql + " LIMIT ? OFFSET ?", params + [int(limit), int(offset)])
+            return [dict(r) for r in self.cur.fetchall()]
+
+        # الصفحة تكمل من الجزء التالي (NULL / غير NULL) لو خلص الجزء الحالي
+        rows = []
+        for keyset in self._keyset_after(after, str(order).lower() != "asc"):
+            sql, params = self._transactions_query(*filters, keyset=keyset)
+            self.cur.execute(sql + " LIMIT ?", params + [int(limit) - len(rows)])
+            rows += [dict(r) for r in self.cur.fetchall()]
+            if len(rows) >= limit:
+                break
+        return rows
+
+    @staticmethod
+    def _keyset_after(after, desc):
+        """
+        شروط "بعد (date, id)" بنفس ترتيب ORDER BY t.date, t.id — بالترتيب.
+        date يقبل NULL: SQLite يضع NULL أولاً في ASC وأخيراً في DESC، والمقارنة
+        (t.date, t.id) < (?, ?) لا تكون صحيحة أبداً مع NULL.
+        كل شرط بدون OR حتى يبدأ البحث من موضع المؤشر في idx_transactions_date
+        (OR أو COALESCE = مسح الفهرس من أوله في كل صفحة).
+        """
+        date, row_id = after
+        if desc:
+            if date is None:
+                return [("t.date IS NULL AND t.id < ?", [row_id])]
+            return [("(t.date, t.id) < (?, ?)", [date, row_id]), ("t.date IS NULL", [])]
+
+        if date is None:
+            return [("t.date IS NULL AND t.id > ?", [row_id]), ("t.date IS NOT NULL", [])]
+        return [("(t.date, t.id) > (?, ?)", [date, row_id])]
+
+    def _transactions_query(self, date_from=None, date_to=None, type=None, text=None,
+                            order="desc", keyset=None):
+        desc = str(order).lower() != "asc"
+        where, params = self._transactions_where(date_from, date_to, type, text)
+
+        if keyset is not None:
+            clause, values = keyset
+            where.append(clause)
+            params.extend(values)
+
+        direction = "DESC" if desc else "ASC"
+        sql = f"""
+            SELECT
+                t.*,
+                items.name AS item,
+                w1.name AS from_wh,
+                w2.name AS to_wh
+            FROM transactions t
+            LEFT JOIN items ON items.id = t.item_id
+            LEFT JOIN warehouses w1 ON w1.id = t.from_warehouse
+            LEFT JOIN warehouses w2 ON w2.id = t.to_warehouse
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY t.date {direction}, t.id {direction}
+        """
+        return sql, params
+
+    def _transactions_where(self, date_from, date_to, type, text):
+        where, params = date_range("t.date", date_from, date_to)
+
+        if type and type != "الكل":
+            where.append("t.type = ?")
+            params.append(type)
+
+        if text:
+            # الصنف / المستخدم / الملاحظات من فهارس البحث بدل LIKE على كل الصفوف
+            items_where, items_params = self._search_match("search_items", text)
+            tx_where, tx_params = self._search_match("search_transactions", text)
+            if items_where:
+                where.append(f"""(
+                    t.id IN (SELECT rowid FROM search_transactions WHERE {" AND ".join(tx_where)})
+                    OR t.item_id IN (SELECT rowid FROM search_items WHERE {" AND ".join(items_where)})
+                )""")
+                params.extend(tx_params + items_params)
+
+        return where, params
+
     # ===============================================================
     # الفواتير (مبيعات/مشتريات)
     # ===============================================================
@@ -307,11 +827,318 @@ class DatabaseManager:
         self.cur.execute("SELECT * FROM purchase_invoices ORDER BY id DESC")
         return [dict(r) for r in self.cur.fetchall()]
 
+    # ---------------------------------------------------------------
+    # حفظ فاتورة كاملة في transaction واحدة
+    # ---------------------------------------------------------------
+    # (جدول الفاتورة, جدول السطور, عمود الطرف الآخر, اسم القسم في السجل)
+    INVOICE_TABLES = {
+        "sales": ("sales_invoices", "sales_items", "customer_id", "المبيعات"),
+        "purchases": ("purchase_invoices", "purchase_items", "supplier_id", "المشتريات"),
+    }
+
+    def commit_sales_invoice(self, header, lines):
+        """
+        header: {"customer_id", "total"?, "date"?, "user"?}
+        lines:  [{"item_id" (أو "id"), "qty", "price"}, ...]
+        يرجع رقم الفاتورة — الفاتورة وسطورها وحركات المخزون والسجل تُحفظ معاً أو لا شيء.
+        """
+        return self._commit_invoice("sales", header, lines)
+
+    def commit_purchase_invoice(self, header, lines):
+        """نفس commit_sales_invoice مع supplier_id بدل customer_id"""
+        return self._commit_invoice("purchases", header, lines)
+
+    def _commit_invoice(self, kind, header, lines):
+        invoices, items, party, section = self.INVOICE_TABLES[kind]
+
+        rows = [
+            (line.get("item_id", line.get("id")), line["qty"], line["price"])
+            for line in lines
+        ]
+        if not rows:
+            raise ValueError("Invoice has no lines")
+
+        total = header.get("total")
+        if total is None:
+            total = sum(qty * price for _, qty, price in rows)
+
+        date = header.get("date") or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        user = header.get("user")
+
+        with self.writer() as conn:
+            invoice_id = conn.execute(
+                f"INSERT INTO {invoices}({party}, total, date, user) VALUES (?, ?, ?, ?)",
+                (header.get(party), total, date, user)
+            ).lastrowid
+
+            # حركات المخزون تُضاف من triggers السطور (stock_ledger) داخل نفس الـ transaction
+            conn.executemany(
+                f"INSERT INTO {items}(invoice_id, item_id, qty, price) VALUES (?, ?, ?, ?)",
+                [(invoice_id,) + r for r in rows]
+            )
+
+            self.add_log(
+                user, "إضافة فاتورة", section,
+                f"فاتورة #{invoice_id} — {len(rows)} صنف — الإجمالي {total}"
+            )
+
+        return invoice_id
+
     # ===============================================================
-    # أرباح المبيعات
+    # الداشبورد: الأعداد + آخر العمليات بدون تحميل الجداول
     # ===============================================================
-    def get_sales_profit_data(self):
+    def dashboard_snapshot(self, recent=10):
+        # الأعداد من kpi_counters (تتحدث بالـ triggers) — صفوف قليلة مهما كبر حجم البيانات
+        kpi = self.get_kpi_counters()
+        counts = {
+            "items": kpi.get("items", 0),
+            "low_stock": kpi.get("low_stock", 0),
+            "warehouses": kpi.get("warehouses", 0),
+            "suppliers": kpi.get("suppliers", 0),
+            "customers": kpi.get("customers", 0),
+            "sales": kpi.get("sales_invoices", 0),
+            "purchases": kpi.get("purchase_invoices", 0),
+        }
+
+        today = self.cur.execute(
+            "SELECT invoices, total FROM kpi_daily_sales WHERE day = date('now', 'localtime')"
+        ).fetchone()
+
+        # كل جدول يرجع أحدث N فقط من فهرس التاريخ ثم الدمج على N صف
         self.cur.execute("""
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT id, 'فاتورة بيع' AS type, total, date, user
+                    FROM sales_invoices
+                    ORDER BY date DESC, id DESC LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT id, 'فاتورة شراء' AS type, total, date, user
+                    FROM purchase_invoices
+                    ORDER BY date DESC, id DESC LIMIT ?
+                )
+            )
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        """, (recent, recent, recent))
+
+        return {
+            "counts": counts,
+            "today_sales": dict(today) if today else {"invoices": 0, "total": 0},
+            "recent": [dict(r) for r in self.cur.fetchall()],
+        }
+
+    # ===============================================================
+    # عدادات KPI
+    # ===============================================================
+    def get_kpi_counters(self):
+        self.cur.execute("SELECT name, value FROM kpi_counters")
+        return {r["name"]: r["value"] for r in self.cur.fetchall()}
+
+    def get_daily_sales(self, date_from=None, date_to=None):
+        sql = "SELECT day, invoices, total FROM kpi_daily_sales WHERE invoices > 0"
+        params = []
+        if date_from:
+            sql += " AND day >= ?"
+            params.append(date_from)
+        if date_to:
+            sql += " AND day <= ?"
+            params.append(date_to)
+
+        self.cur.execute(sql + " ORDER BY day", params)
+        return [dict(r) for r in self.cur.fetchall()]
+
+    def check_kpi_counters(self, repair=False):
+        """
+        مقارنة العدادات بالقيم الفعلية من الجداول.
+        يرجع {اسم العداد: (المخزن, الفعلي)} للعدادات غير المتطابقة،
+        ومع repair=True يعيد بناء كل العدادات لو وجد أي اختلاف.
+        """
+        stored = self.get_kpi_counters()
+        mismatches = {}
+
+        for name, sql in db_migrations.KPI_QUERIES.items():
+            actual = self.conn.execute(sql).fetchone()[0]
+            if stored.get(name) != actual:
+                mismatches[name] = (stored.get(name), actual)
+
+        daily = {
+            r["day"]: (r["invoices"], r["total"])
+            for r in self.conn.execute("SELECT * FROM kpi_daily_sales WHERE invoices != 0")
+        }
+        actual_daily = {
+            r["day"]: (r["invoices"], r["total"])
+            for r in self.conn.execute(db_migrations.DAILY_SALES_QUERY)
+        }
+        for day in daily.keys() | actual_daily.keys():
+            s, a = daily.get(day), actual_daily.get(day)
+            if s is None or a is None or s[0] != a[0] or abs(s[1] - a[1]) > 1e-6 * max(1, abs(a[1])):
+                mismatches[f"daily_sales:{day}"] = (s, a)
+
+        if mismatches and repair:
+            with self.writer() as conn:
+                db_migrations.rebuild_kpi_counters(conn.cursor())
+
+        return mismatches
+
+    # ===============================================================
+    # محرك الأرباح — من جدول profit_rollup (يتحدث بالـ triggers)
+    # ===============================================================
+    # الربح = الإيراد - (الكمية × تكلفة الوحدة المسجلة على سطر البيع)
+    @staticmethod
+    def _with_profit(row):
+        row = dict(row)
+        row["profit"] = row["revenue"] - row["cost"]
+        row["margin"] = round(row["profit"] / row["revenue"] * 100, 2) if row["revenue"] else 0
+        return row
+
+    @staticmethod
+    def _period_range(date_from, date_to, size=10):
+        """شروط period في profit_rollup (يوم = 10 حروف، شهر = 7)"""
+        where, params = [], []
+        if date_from:
+            where.append("period >= ?")
+            params.append(date_from[:size])
+        if date_to:
+            where.append("period <= ?")
+            params.append(date_to[:size])
+        return where, params
+
+    def _rollup_days(self, dim, date_from, date_to, group="period"):
+        where, params = self._period_range(date_from, date_to)
+        sql = f"""
+            SELECT {group} AS key,
+                   SUM(revenue) AS revenue, SUM(cost) AS cost, SUM(qty) AS qty
+            FROM profit_rollup
+            WHERE {" AND ".join(["dim = ?"] + where)}
+            GROUP BY 1 ORDER BY 1
+        """
+        return self.conn.execute(sql, [dim] + params).fetchall()
+
+    def profit_summary(self, date_from=None, date_to=None):
+        """الإيراد والتكلفة والربح وإجمالي المشتريات للفترة"""
+        sales = self._rollup_days("day", date_from, date_to, group="''")
+        purchases = self._rollup_days("purchases", date_from, date_to, group="''")
+
+        summary = self._with_profit(
+            sales[0] if sales else {"key": "", "revenue": 0, "cost": 0, "qty": 0}
+        )
+        summary["purchases"] = purchases[0]["revenue"] if purchases else 0
+        del summary["key"]
+        return summary
+
+    def profit_by(self, group, date_from=None, date_to=None, limit=None):
+        """
+        الأرباح مجمعة حسب: day / month / item / customer
+        التجميع حسب التاريخ مرتب زمنياً، والباقي حسب الربح (الأعلى أولاً)
+        """
+        if group == "day":
+            rows = self._rollup_days("day", date_from, date_to)
+        elif group == "month":
+            rows = self._rollup_days("day", date_from, date_to, group="substr(period, 1, 7)")
+        elif group in ("item", "customer"):
+            rows = self._profit_by_key(group, date_from, date_to, limit)
+        else:
+            raise ValueError(f"Unknown profit group: {group}")
+
+        rows = [self._with_profit(r) for r in rows]
+        for r in rows:
+            r.setdefault("label", r["key"])
+        return rows
+
+    def _profit_by_key(self, dim, date_from, date_to, limit):
+        """
+        الأشهر الكاملة داخل الفترة من التجميع الشهري،
+        والأيام الجزئية على أطراف الفترة من سطور الفواتير مباشرة.
+        """
+        first, last, edges = split_months(date_from, date_to)
+        parts, params = [], []
+
+        if first != "" and last != "":
+            where, p = self._period_range(first, last, size=7)
+            parts.append(f"""
+                SELECT key, revenue, cost, qty FROM profit_rollup
+                WHERE {" AND ".join(["dim = ?"] + where)}
+            """)
+            params += [dim] + p
+
+        key = "si.item_id" if dim == "item" else "s.customer_id"
+        for edge_from, edge_to in edges:
+            where, p = date_range("s.date", edge_from, edge_to)
+            parts.append(f"""
+                SELECT COALESCE({key}, 0) AS key,
+                       SUM(si.qty * si.price) AS revenue,
+                       SUM(si.qty * COALESCE(si.unit_cost, 0)) AS cost,
+                       SUM(si.qty) AS qty
+                FROM sales_invoices s
+                JOIN sales_items si ON si.invoice_id = s.id
+                WHERE {" AND ".join(where)}
+                GROUP BY 1
+            """)
+            params += p
+
+        table = "items" if dim == "item" else "customers"
+        sql = f"""
+            SELECT x.key, COALESCE({table}.name, '') AS label,
+                   SUM(x.revenue) AS revenue, SUM(x.cost) AS cost, SUM(x.qty) AS qty
+            FROM ({" UNION ALL ".join(parts)}) x
+            LEFT JOIN {table} ON {table}.id = x.key
+            GROUP BY x.key
+            ORDER BY SUM(x.revenue) - SUM(x.cost) DESC
+        """
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return self.conn.execute(sql, params).fetchall()
+
+    def get_profit_report(self, date_from=None, date_to=None):
+        """تقرير الأرباح اليومي: المبيعات / المشتريات / الربح"""
+        where, params = self._period_range(date_from, date_to)
+        sql = f"""
+            SELECT period AS date,
+                   SUM(CASE WHEN dim = 'day' THEN revenue ELSE 0 END) AS sales,
+                   SUM(CASE WHEN dim = 'purchases' THEN revenue ELSE 0 END) AS purchases,
+                   SUM(CASE WHEN dim = 'day' THEN revenue - cost ELSE 0 END) AS profit
+            FROM profit_rollup
+            WHERE {" AND ".join(["dim IN ('day', 'purchases')"] + where)}
+            GROUP BY period ORDER BY period
+        """
+        return [dict(r) for r in self.conn.execute(sql, params)]
+
+    def check_profit_rollup(self, repair=False):
+        """مثل check_kpi_counters — مقارنة profit_rollup بالحساب المباشر من السطور"""
+        def load(sql):
+            return {
+                (r[0], r[1], r[2]): (r[3], r[4], r[5])
+                for r in self.conn.execute(sql)
+                if any(abs(v) > 1e-9 for v in (r[3], r[4], r[5]))
+            }
+
+        stored = load("SELECT dim, period, key, revenue, cost, qty FROM profit_rollup")
+        actual = {}
+        for dim in db_migrations.PROFIT_ROLLUPS:
+            actual.update(load(db_migrations.profit_rollup_query(dim)))
+
+        mismatches = {}
+        for k in stored.keys() | actual.keys():
+            s, a = stored.get(k, (0, 0, 0)), actual.get(k, (0, 0, 0))
+            if any(abs(x - y) > 1e-6 * max(1, abs(y)) for x, y in zip(s, a)):
+                mismatches[k] = (s, a)
+
+        if mismatches and repair:
+            with self.writer() as conn:
+                db_migrations.rebuild_profit_rollup(conn.cursor())
+
+        return mismatches
+
+    # ===============================================================
+    # تفاصيل سطور المبيعات / المشتريات (للتصدير التفصيلي)
+    # ===============================================================
+    def get_sales_profit_data(self, date_from=None, date_to=None):
+        where, params = date_range("s.date", date_from, date_to)
+        sql = """
             SELECT 
                 s.id AS invoice_id,
                 s.date,
@@ -324,16 +1151,15 @@ class DatabaseManager:
             FROM sales_items si
             LEFT JOIN sales_invoices s ON s.id = si.invoice_id
             LEFT JOIN items ON items.id = si.item_id
-            ORDER BY s.id DESC
-        """)
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        self.cur.execute(sql + " ORDER BY s.id DESC", params)
         return [dict(r) for r in self.cur.fetchall()]
 
-
-    # ===============================================================
-    # تكلفة المشتريات
-    # ===============================================================
-    def get_purchase_cost_data(self):
-        self.cur.execute("""
+    def get_purchase_cost_data(self, date_from=None, date_to=None):
+        where, params = date_range("p.date", date_from, date_to)
+        sql = """
             SELECT 
                 p.id AS invoice_id,
                 p.date,
@@ -344,23 +1170,233 @@ class DatabaseManager:
             FROM purchase_items pi
             LEFT JOIN purchase_invoices p ON p.id = pi.invoice_id
             LEFT JOIN items ON items.id = pi.item_id
-            ORDER BY p.id DESC
-        """)
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        self.cur.execute(sql + " ORDER BY p.id DESC", params)
         return [dict(r) for r in self.cur.fetchall()]
 
+    # ===============================================================
+    # قراءة بالتدفق (للتصدير) — الصفوف لا تُحمل كلها في الذاكرة
+    # ===============================================================
+    def stream(self, sql, params=(), size=1000):
+        """
+        يرجع sqlite3.Row صف بصف على دفعات fetchmany(size).
+        cursor مستقل حتى لا يتأثر بأي استعلام آخر على نفس الاتصال أثناء التصدير.
+        """
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                batch = cur.fetchmany(size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            cur.close()
+
+    # ===============================================================
+    # التصدير بمواصفة الاستعلام (query spec)
+    # ===============================================================
+    # الصفحة تعطي التصدير نفس الفلاتر التي عرضتها: spec = (name, {filters})
+    # والتصدير يعيد تنفيذ الاستعلام كـ cursor بالتدفق بالقيم الأصلية (أرقام/تواريخ)
+    EXPORT_QUERIES = ("items", "warehouses", "suppliers", "customers",
+                      "transactions", "activity_log")
+
+    def export_query(self, name, **filters):
+        """(sql, params) لتقرير بالاسم مع فلاتره"""
+        if name not in self.EXPORT_QUERIES:
+            raise ValueError(f"Unknown export query: {name}")
+        return getattr(self, f"_{name}_query")(**filters)
+
+    def export_rows(self, spec):
+        """
+        spec = (name, filters) — generator: الاستعلام يُنفذ على الـ thread الذي
+        يقرأ الصفوف (thread التصدير) باتصال القراءة الخاص به
+        """
+        name, filters = spec
+        sql, params = self.export_query(name, **(filters or {}))
+        yield from self.stream(sql, params)
 
+    def _search_in(self, entity, column, text):
+        """شرط column IN (نتيجة فهرس البحث) — None لو النص بدون كلمات"""
+        index = f"search_{entity}"
+        where, params = self._search_match(index, text)
+        if not where:
+            return None, []
+        return f"{column} IN (SELECT rowid FROM {index} WHERE {' AND '.join(where)})", params
+
+    def _items_query(self, text=None, warehouse=None, low_stock=False, search_warehouse=False):
+        """
+        text: بحث في الاسم / الكود (و اسم المخزن لو search_warehouse)
+        warehouse: اسم المخزن بالضبط — low_stock: الكمية <= الحد الأدنى
+        """
+        where, params = [], []
+
+        if text:
+            match, match_params = self._search_in("items", "items.id", text)
+            conds = [match] if match else []
+            params.extend(match_params)
+            if search_warehouse:
+                conds.append("warehouses.name LIKE ? ESCAPE '\\'")
+                params.append(like_pattern(text))
+            if conds:
+                where.append("(" + " OR ".join(conds) + ")")
+
+        if warehouse:
+            where.append("warehouses.name = ?")
+            params.append(warehouse)
+
+        if low_stock:
+            where.append("items.quantity <= items.min_quantity")
+
+        sql = f"""
+            SELECT items.*, warehouses.name AS warehouse
+            FROM items
+            LEFT JOIN warehouses ON warehouses.id = items.warehouse_id
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY items.id
+        """
+        return sql, params
+
+    def _warehouses_query(self, text=None):
+        where, params = [], []
+        if text:
+            where.append("(name LIKE ? ESCAPE '\\' OR location LIKE ? ESCAPE '\\')")
+            params.extend([like_pattern(text)] * 2)
+
+        sql = f"""
+            SELECT * FROM warehouses
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY id
+        """
+        return sql, params
+
+    def _partners_query(self, table, text):
+        where, params = self._search_in(table, f"{table}.id", text) if text else (None, [])
+        return f"SELECT * FROM {table} {'WHERE ' + where if where else ''} ORDER BY id", params
+
+    def _suppliers_query(self, text=None):
+        return self._partners_query("suppliers", text)
+
+    def _customers_query(self, text=None):
+        return self._partners_query("customers", text)
+
+    def _activity_log_query(self, user=None, section=None, action=None,
+                            date_from=None, date_to=None, text=None):
+        """نفس فلاتر صفحة سجل النشاط ("الكل" = بدون فلتر) — النص بدون اعتبار الهمزات"""
+        where, params = date_range("timestamp", date_from, date_to)
+
+        if user and user != "الكل":
+            where.append("user = ?")
+            params.append(user)
+        if section and section != "الكل":
+            where.append("section = ?")
+            params.append(section)
+        if action and action != "الكل":
+            where.append("instr(action, ?) > 0")
+            params.append(action)
+
+        if text:
+            haystack = db_migrations.normalize_search_sql(
+                "COALESCE(user, '') || ' ' || COALESCE(action, '') || ' ' || COALESCE(details, '')"
+            )
+            for word in db_migrations.normalize_search_text(text).split():
+                where.append(f"{haystack} LIKE ? ESCAPE '\\'")
+                params.append(like_pattern(word))
+
+        sql = f"""
+            SELECT * FROM activity_log
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY id DESC
+        """
+        return sql, params
 
     # ===============================================================
     # سجل النشاط
     # ===============================================================
     def add_log(self, user, action, section, details):
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.cur.execute("""
-            INSERT INTO activity_log(user, action, section, details, timestamp)
-            VALUES(?, ?, ?, ?, ?)
-        """, (user, action, section, details, ts))
-        self.conn.commit()
+        with self.writer() as conn:
+            conn.execute("""
+                INSERT INTO activity_log(user, action, section, details, timestamp)
+                VALUES(?, ?, ?, ?, ?)
+            """, (user, action, section, details, ts))
 
-    def get_logs(self):
-        self.cur.execute("SELECT * FROM activity_log ORDER BY id DESC")
+    def get_logs(self, after_id=None):
+        """after_id: السجلات الأحدث فقط (للتحديث التدريجي)"""
+        if after_id is None:
+            self.cur.execute("SELECT * FROM activity_log ORDER BY id DESC")
+        else:
+            self.cur.execute(
+                "SELECT * FROM activity_log WHERE id > ? ORDER BY id DESC", (after_id,)
+            )
         return [dict(r) for r in self.cur.fetchall()]
+
+    # ===============================================================
+    # فحص خطط الاستعلامات (EXPLAIN QUERY PLAN)
+    # ===============================================================
+    def explain(self, sql, params=()):
+        return [r["detail"] for r in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def capture_queries(self, func, *args, **kwargs):
+        """تشغيل func وإرجاع كل جمل الـ SQL التي نفذتها (بالقيم الفعلية)"""
+        statements = []
+        self.conn.set_trace_callback(statements.append)
+        try:
+            func(*args, **kwargs)
+        finally:
+            self.conn.set_trace_callback(None)
+        return statements
+
+    def find_plan_scans(self, sql, params=()):
+        """
+        يرجع أي SCAN على جدول كبير داخل join (أي ليس الجدول الرئيسي)
+        أو أي فهرس مؤقت (AUTOMATIC INDEX) يبنيه SQLite أثناء التنفيذ.
+        """
+        aliases = {}
+        for table, alias in re.findall(r"(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+            aliases[table] = table
+            if alias and alias.upper() not in SQL_KEYWORDS:
+                aliases[alias] = table
+
+        problems = []
+        loops = 0
+        for detail in self.explain(sql, params):
+            match = re.match(r"(SCAN|SEARCH) (\w+)", detail)
+            if not match:
+                continue
+
+            loops += 1
+            table = aliases.get(match.group(2), match.group(2))
+
+            if "AUTOMATIC" in detail:
+                problems.append(detail)
+            elif match.group(1) == "SCAN" and loops > 1 and table in LARGE_TABLES:
+                problems.append(detail)
+
+        return problems
+
+    def audit_query_plans(self, checks=None):
+        """
+        يشغل استعلامات القراءة الأساسية ويرجع {الاستعلام: [المشاكل]}
+        لأي استعلام يعمل full scan على جدول كبير داخل join.
+        قاموس فارغ = كل الخطط تستخدم الفهارس.
+        """
+        if checks is None:
+            checks = [
+                self.get_items,
+                self.get_users,
+                self.get_transactions,
+                self.get_sales_profit_data,
+                self.get_purchase_cost_data,
+            ]
+
+        report = {}
+        for check in checks:
+            for sql in self.capture_queries(check):
+                problems = self.find_plan_scans(sql)
+                if problems:
+                    report[" ".join(sql.split())] = problems
+
+        return report
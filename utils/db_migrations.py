@@ -0,0 +1,855 @@
+# utils/db_migrations.py
+
+"""
+ترحيلات قاعدة البيانات (Schema Migrations)
+
+كل ترحيل له رقم إصدار ويتم تطبيقه مرة واحدة فقط حسب PRAGMA user_version.
+كل الترحيلات المعلقة تُطبق داخل transaction واحدة، ويجب أن تكون كل خطوة
+آمنة لو اتنفذت على قاعدة بيانات قديمة فيها الجداول بالفعل (idempotent).
+"""
+
+MIGRATIONS = []
+
+
+def migration(version):
+    """تسجيل دالة ترحيل برقم إصدار"""
+    def register(func):
+        MIGRATIONS.append((version, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+# ===============================================================
+# أدوات مساعدة
+# ===============================================================
+def column_exists(cur, table, column):
+    cur.execute(f"PRAGMA table_info({table})")
+    return any(r[1] == column for r in cur.fetchall())
+
+
+def add_column(cur, table, column, definition):
+    if not column_exists(cur, table, column):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+# ===============================================================
+# تطبيق الترحيلات
+# ===============================================================
+def migrate(conn):
+    """
+    يطبق كل الترحيلات الأحدث من user_version الحالي.
+    لازم يتم استدعاؤها داخل transaction مفتوحة (اتصال الكتابة)
+    عشان الترقية كلها تنجح أو تترجع مرة واحدة.
+    """
+    version = current_version(conn)
+
+    if version > latest_version():
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this application "
+            f"(supports up to {latest_version()})"
+        )
+
+    cur = conn.cursor()
+    for target, func in MIGRATIONS:
+        if target <= version:
+            continue
+
+        func(cur)
+        cur.execute(f"PRAGMA user_version = {int(target)}")
+        version = target
+
+    return version
+
+
+# ===============================================================
+# 1) الجداول الأساسية
+# ===============================================================
+@migration(1)
+def create_base_tables(cur):
+    # --- roles ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS roles(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            permissions TEXT
+        )
+    """)
+
+    # --- users ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            full_name TEXT,
+            role_id INTEGER,
+            created_at TEXT,
+            FOREIGN KEY(role_id) REFERENCES roles(id)
+        )
+    """)
+
+    # --- activity log ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS activity_log(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT,
+            action TEXT,
+            section TEXT,
+            details TEXT,
+            timestamp TEXT
+        )
+    """)
+
+    # --- warehouses ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS warehouses(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            location TEXT
+        )
+    """)
+
+    # --- items ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS items(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            sku TEXT,
+            quantity INTEGER DEFAULT 0,
+            min_quantity INTEGER DEFAULT 0,
+            warehouse_id INTEGER,
+            FOREIGN KEY(warehouse_id) REFERENCES warehouses(id)
+        )
+    """)
+
+    # --- suppliers ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            phone TEXT,
+            address TEXT
+        )
+    """)
+
+    # --- customers ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS customers(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            phone TEXT,
+            address TEXT
+        )
+    """)
+
+    # --- transactions ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS transactions(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT,
+            item_id INTEGER,
+            quantity INTEGER,
+            from_warehouse INTEGER,
+            to_warehouse INTEGER,
+            user TEXT,
+            notes TEXT,
+            date TEXT,
+            FOREIGN KEY(item_id) REFERENCES items(id),
+            FOREIGN KEY(from_warehouse) REFERENCES warehouses(id),
+            FOREIGN KEY(to_warehouse) REFERENCES warehouses(id)
+        )
+    """)
+
+    # --- sales invoices ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sales_invoices(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            total REAL,
+            date TEXT,
+            user TEXT
+        )
+    """)
+
+    # --- sales items ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sales_items(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER,
+            item_id INTEGER,
+            qty INTEGER,
+            price REAL,
+            FOREIGN KEY(invoice_id) REFERENCES sales_invoices(id),
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+    """)
+
+    # --- purchases invoices ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_invoices(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER,
+            total REAL,
+            date TEXT,
+            user TEXT
+        )
+    """)
+
+    # --- purchase items ---
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_items(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_id INTEGER,
+            item_id INTEGER,
+            qty INTEGER,
+            price REAL,
+            FOREIGN KEY(invoice_id) REFERENCES purchase_invoices(id),
+            FOREIGN KEY(item_id) REFERENCES items(id)
+        )
+    """)
+
+
+# ===============================================================
+# 2) أسعار الشراء والبيع للأصناف
+# ===============================================================
+@migration(2)
+def add_item_prices(cur):
+    add_column(cur, "items", "buy_price", "REAL DEFAULT 0")
+    add_column(cur, "items", "sell_price", "REAL DEFAULT 0")
+
+
+# ===============================================================
+# 3) فهارس المفاتيح الأجنبية وأعمدة التاريخ
+# ===============================================================
+INDEXES = [
+    # (اسم الفهرس, الجدول, الأعمدة)
+    ("idx_users_role", "users", "role_id"),
+    ("idx_items_warehouse", "items", "warehouse_id"),
+    ("idx_transactions_item", "transactions", "item_id"),
+    ("idx_transactions_from_wh", "transactions", "from_warehouse"),
+    ("idx_transactions_to_wh", "transactions", "to_warehouse"),
+    ("idx_transactions_date", "transactions", "date"),
+    ("idx_sales_invoices_customer", "sales_invoices", "customer_id"),
+    ("idx_sales_invoices_date", "sales_invoices", "date"),
+    ("idx_sales_items_invoice", "sales_items", "invoice_id"),
+    ("idx_sales_items_item", "sales_items", "item_id"),
+    ("idx_purchase_invoices_supplier", "purchase_invoices", "supplier_id"),
+    ("idx_purchase_invoices_date", "purchase_invoices", "date"),
+    ("idx_purchase_items_invoice", "purchase_items", "invoice_id"),
+    ("idx_purchase_items_item", "purchase_items", "item_id"),
+    ("idx_activity_log_timestamp", "activity_log", "timestamp"),
+]
+
+
+def create_indexes(cur, indexes):
+    for name, table, columns in indexes:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+
+
+@migration(3)
+def add_base_indexes(cur):
+    create_indexes(cur, INDEXES)
+
+
+# ===============================================================
+# 4) عدادات الداشبورد (KPI) — تتحدث تلقائياً بالـ triggers
+# ===============================================================
+COUNTED_TABLES = [
+    "items", "warehouses", "suppliers", "customers",
+    "sales_invoices", "purchase_invoices",
+]
+
+# القيمة الصحيحة لكل عداد — تستخدم في البناء الأول وفحص التطابق
+KPI_QUERIES = {t: f"SELECT COUNT(*) FROM {t}" for t in COUNTED_TABLES}
+KPI_QUERIES["low_stock"] = "SELECT COUNT(*) FROM items WHERE quantity <= min_quantity"
+
+DAILY_SALES_QUERY = """
+    SELECT COALESCE(substr(date, 1, 10), '') AS day,
+           COUNT(*) AS invoices,
+           COALESCE(SUM(total), 0) AS total
+    FROM sales_invoices
+    GROUP BY day
+"""
+
+
+def _low(row):
+    # 1 لو الصنف تحت الحد الأدنى (NULL = لا)
+    return f"COALESCE({row}.quantity <= {row}.min_quantity, 0)"
+
+
+def _day(row):
+    return f"COALESCE(substr({row}.date, 1, 10), '')"
+
+
+def _add_daily(row, sign):
+    if sign > 0:
+        return f"""
+            INSERT INTO kpi_daily_sales(day, invoices, total)
+            VALUES ({_day(row)}, 1, COALESCE({row}.total, 0))
+            ON CONFLICT(day) DO UPDATE SET
+                invoices = invoices + 1,
+                total = total + excluded.total;
+        """
+    return f"""
+        UPDATE kpi_daily_sales SET
+            invoices = invoices - 1,
+            total = total - COALESCE({row}.total, 0)
+        WHERE day = {_day(row)};
+    """
+
+
+def create_kpi_triggers(cur):
+    for t in COUNTED_TABLES:
+        ins = f"UPDATE kpi_counters SET value = value + 1 WHERE name = '{t}';"
+        dele = f"UPDATE kpi_counters SET value = value - 1 WHERE name = '{t}';"
+
+        if t == "items":
+            ins += f" UPDATE kpi_counters SET value = value + {_low('NEW')} WHERE name = 'low_stock';"
+            dele += f" UPDATE kpi_counters SET value = value - {_low('OLD')} WHERE name = 'low_stock';"
+        elif t == "sales_invoices":
+            ins += _add_daily("NEW", 1)
+            dele += _add_daily("OLD", -1)
+
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS kpi_{t}_insert AFTER INSERT ON {t} BEGIN {ins} END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS kpi_{t}_delete AFTER DELETE ON {t} BEGIN {dele} END")
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS kpi_items_low_stock
+        AFTER UPDATE OF quantity, min_quantity ON items
+        BEGIN
+            UPDATE kpi_counters SET value = value + {_low('NEW')} - {_low('OLD')}
+            WHERE name = 'low_stock';
+        END
+    """)
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS kpi_sales_invoices_update
+        AFTER UPDATE OF total, date ON sales_invoices
+        BEGIN
+            {_add_daily("OLD", -1)}
+            {_add_daily("NEW", 1)}
+        END
+    """)
+
+
+def rebuild_kpi_counters(cur):
+    """إعادة حساب كل العدادات من الجداول نفسها"""
+    cur.execute("DELETE FROM kpi_counters")
+    for name, sql in KPI_QUERIES.items():
+        cur.execute(f"INSERT INTO kpi_counters(name, value) VALUES (?, ({sql}))", (name,))
+
+    cur.execute("DELETE FROM kpi_daily_sales")
+    cur.execute(f"INSERT INTO kpi_daily_sales(day, invoices, total) {DAILY_SALES_QUERY}")
+
+
+@migration(4)
+def add_kpi_counters(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_counters(
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_daily_sales(
+            day TEXT PRIMARY KEY,
+            invoices INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    create_kpi_triggers(cur)
+    rebuild_kpi_counters(cur)
+
+
+# ===============================================================
+# 5) محرك الأرباح: تكلفة كل سطر بيع + تجميعات جاهزة للأرباح
+# ===============================================================
+# dim: (جدول الفواتير, جدول السطور, الفترة من تاريخ الفاتورة, المفتاح, له تكلفة؟)
+#   day      → يوم / 0              (المبيعات)
+#   item     → شهر / رقم الصنف       (المبيعات)
+#   customer → شهر / رقم العميل      (المبيعات)
+#   purchases→ يوم / 0              (المشتريات — المبلغ في revenue)
+_DAY = "COALESCE(substr({inv}.date, 1, 10), '')"
+_MONTH = "COALESCE(substr({inv}.date, 1, 7), '')"
+
+PROFIT_ROLLUPS = {
+    "day": ("sales_invoices", "sales_items", _DAY, "0", True),
+    "item": ("sales_invoices", "sales_items", _MONTH, "COALESCE({line}.item_id, 0)", True),
+    "customer": ("sales_invoices", "sales_items", _MONTH, "COALESCE({inv}.customer_id, 0)", True),
+    "purchases": ("purchase_invoices", "purchase_items", _DAY, "0", False),
+}
+
+_ROLLUP_UPSERT = """
+    ON CONFLICT(dim, period, key) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        cost = cost + excluded.cost,
+        qty = qty + excluded.qty;
+"""
+
+
+def _rollup_values(line, unit_cost, sign="", agg=""):
+    cost = f"{line}.qty * COALESCE({unit_cost}, 0)" if unit_cost else "0"
+    return (
+        f"{sign}{agg}(COALESCE({line}.qty * {line}.price, 0)), "
+        f"{sign}{agg}(COALESCE({cost}, 0)), "
+        f"{sign}{agg}(COALESCE({line}.qty, 0))"
+    )
+
+
+def _rollup_line(dim, row, sign, unit_cost=None):
+    """تطبيق سطر واحد (NEW / OLD) على تجميع dim"""
+    invoices, _, period, key, with_cost = PROFIT_ROLLUPS[dim]
+    period = period.format(inv="inv")
+    key = key.format(inv="inv", line=row)
+    unit_cost = (unit_cost or f"{row}.unit_cost") if with_cost else None
+    return f"""
+        INSERT INTO profit_rollup(dim, period, key, revenue, cost, qty)
+        SELECT '{dim}', {period}, {key}, {_rollup_values(row, unit_cost, sign)}
+        FROM {invoices} inv WHERE inv.id = {row}.invoice_id
+        {_ROLLUP_UPSERT}
+    """
+
+
+def _rollup_invoice(dim, row, sign):
+    """تطبيق كل سطور فاتورة (NEW / OLD) على تجميع dim — عند تغيير التاريخ/العميل أو الحذف"""
+    _, lines, period, key, with_cost = PROFIT_ROLLUPS[dim]
+    period = period.format(inv=row)
+    key = key.format(inv=row, line="li")
+    return f"""
+        INSERT INTO profit_rollup(dim, period, key, revenue, cost, qty)
+        SELECT '{dim}', {period}, {key}, {_rollup_values("li", with_cost and "li.unit_cost", sign, "SUM")}
+        FROM {lines} li WHERE li.invoice_id = {row}.id
+        GROUP BY 3
+        {_ROLLUP_UPSERT}
+    """
+
+
+def create_profit_triggers(cur):
+    for invoices, lines in (("sales_invoices", "sales_items"), ("purchase_invoices", "purchase_items")):
+        dims = [d for d, spec in PROFIT_ROLLUPS.items() if spec[1] == lines]
+        add = lambda row, cost=None: "".join(_rollup_line(d, row, "", cost) for d in dims)
+        sub = lambda row: "".join(_rollup_line(d, row, "-") for d in dims)
+
+        if lines == "sales_items":
+            # السطر بدون تكلفة يأخذ سعر الشراء الحالي للصنف ويتم حفظه عليه
+            default_cost = "(SELECT buy_price FROM items WHERE id = NEW.item_id)"
+            insert = add("NEW", f"COALESCE(NEW.unit_cost, {default_cost})") + f"""
+                UPDATE sales_items SET unit_cost = COALESCE({default_cost}, 0)
+                WHERE id = NEW.id AND NEW.unit_cost IS NULL;
+            """
+            watched = "invoice_id, item_id, qty, price, unit_cost"
+            # تعبئة unit_cost بعد الإضافة محسوبة بالفعل — لا تعيد تطبيقها
+            when = """
+                WHEN OLD.unit_cost IS NOT NULL OR OLD.qty IS NOT NEW.qty
+                  OR OLD.price IS NOT NEW.price OR OLD.item_id IS NOT NEW.item_id
+                  OR OLD.invoice_id IS NOT NEW.invoice_id
+            """
+        else:
+            insert = add("NEW")
+            watched = "invoice_id, item_id, qty, price"
+            when = ""
+
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS profit_{lines}_insert AFTER INSERT ON {lines} BEGIN {insert} END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS profit_{lines}_delete AFTER DELETE ON {lines} BEGIN {sub('OLD')} END")
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS profit_{lines}_update
+            AFTER UPDATE OF {watched} ON {lines} {when}
+            BEGIN {sub('OLD')} {add('NEW')} END
+        """)
+
+        # الفاتورة نفسها: تغيير التاريخ/العميل ينقل سطورها، والحذف يطرحها
+        move_old = "".join(_rollup_invoice(d, "OLD", "-") for d in dims)
+        move_new = "".join(_rollup_invoice(d, "NEW", "") for d in dims)
+        watched = "date, customer_id" if invoices == "sales_invoices" else "date"
+
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS profit_{invoices}_update
+            AFTER UPDATE OF {watched} ON {invoices}
+            BEGIN {move_old} {move_new} END
+        """)
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS profit_{invoices}_delete AFTER DELETE ON {invoices} BEGIN {move_old} END")
+
+
+def profit_rollup_query(dim):
+    """القيم الصحيحة لتجميع dim محسوبة من السطور مباشرة"""
+    invoices, lines, period, key, with_cost = PROFIT_ROLLUPS[dim]
+    period = period.format(inv="inv")
+    key = key.format(inv="inv", line="li")
+    return f"""
+        SELECT '{dim}' AS dim, {period} AS period, {key} AS key,
+               {_rollup_values("li", with_cost and "li.unit_cost", "", "SUM")}
+        FROM {lines} li
+        JOIN {invoices} inv ON inv.id = li.invoice_id
+        GROUP BY period, key
+    """
+
+
+def rebuild_profit_rollup(cur):
+    cur.execute("DELETE FROM profit_rollup")
+    for dim in PROFIT_ROLLUPS:
+        cur.execute(
+            "INSERT INTO profit_rollup(dim, period, key, revenue, cost, qty) "
+            + profit_rollup_query(dim)
+        )
+
+
+@migration(5)
+def add_profit_engine(cur):
+    # تكلفة الوحدة وقت البيع — الأسطر القديمة تأخذ سعر الشراء الحالي
+    add_column(cur, "sales_items", "unit_cost", "REAL")
+    cur.execute("""
+        UPDATE sales_items
+        SET unit_cost = COALESCE((SELECT buy_price FROM items WHERE id = sales_items.item_id), 0)
+        WHERE unit_cost IS NULL
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS profit_rollup(
+            dim TEXT NOT NULL,
+            period TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            revenue REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            qty REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY(dim, period, key)
+        ) WITHOUT ROWID
+    """)
+
+    create_profit_triggers(cur)
+    rebuild_profit_rollup(cur)
+
+
+# ===============================================================
+# 6) تكلفة البضاعة المباعة (FIFO / متوسط متحرك)
+# ===============================================================
+@migration(6)
+def add_cost_layers(cur):
+    # حالة التكلفة لكل صنف: الرصيد + متوسط التكلفة + آخر سعر شراء
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS item_costs(
+            item_id INTEGER PRIMARY KEY,
+            on_hand REAL NOT NULL DEFAULT 0,
+            avg_cost REAL NOT NULL DEFAULT 0,
+            last_cost REAL
+        )
+    """)
+
+    # طبقات FIFO: كل شراء طبقة، والبيع يستهلك من الأقدم
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cost_layers(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            qty REAL NOT NULL,
+            unit_cost REAL NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cost_layers_item ON cost_layers(item_id, id)")
+
+    # الطريقة الحالية + آخر سطر تمت معالجته (المعالجة تدريجية)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cogs_state(
+            name TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID
+    """)
+
+
+# ===============================================================
+# 7) دفتر حركة المخزون (append-only) + نقاط حفظ الرصيد
+# ===============================================================
+# رصيد افتتاحي قبل أي حركة مسجلة
+OPENING_DATE = "0000-01-01"
+
+NOW = "datetime('now', 'localtime')"
+
+# مصادر الحركة: (الجدول, النوع, إشارة الكمية, جدول الفاتورة)
+LINE_MOVEMENTS = [
+    ("purchase_items", "purchase", "", "purchase_invoices"),
+    ("sales_items", "sale", "-", "sales_invoices"),
+]
+
+# أنواع الأذونات في جدول transactions
+TRANSACTION_MOVEMENTS = [
+    # (type, kind, إشارة الكمية, عمود المخزن)
+    ("استلام", "receive", "", "to_warehouse"),
+    ("صرف", "issue", "-", "from_warehouse"),
+    ("تحويل", "transfer_out", "-", "from_warehouse"),
+    ("تحويل", "transfer_in", "", "to_warehouse"),
+]
+
+
+def _line_movement_sql(lines, kind, sign, invoices, row, void=False):
+    if void:
+        kind, sign = "void", "" if sign == "-" else "-"
+    return f"""
+        INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user)
+        SELECT {row}.item_id, items.warehouse_id, {sign}COALESCE({row}.qty, 0), '{kind}',
+               '{lines}', {row}.id, COALESCE(inv.date, {NOW}), inv.user
+        FROM items
+        LEFT JOIN {invoices} inv ON inv.id = {row}.invoice_id
+        WHERE items.id = {row}.item_id;
+    """
+
+
+def _transaction_movement_sql(row, void=False):
+    sql = ""
+    for type_, kind, sign, warehouse in TRANSACTION_MOVEMENTS:
+        if void:
+            kind, sign = "void", "" if sign == "-" else "-"
+        sql += f"""
+            INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user)
+            SELECT {row}.item_id, {row}.{warehouse}, {sign}COALESCE({row}.quantity, 0), '{kind}',
+                   'transactions', {row}.id, COALESCE({row}.date, {NOW}), {row}.user
+            WHERE {row}.type = '{type_}' AND {row}.item_id IS NOT NULL;
+        """
+    return sql
+
+
+def create_stock_ledger_triggers(cur):
+    # الدفتر لا يُعدل ولا يُحذف — التصحيح بحركة عكسية
+    for op in ("UPDATE", "DELETE"):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS stock_ledger_no_{op.lower()}
+            BEFORE {op} ON stock_ledger
+            BEGIN SELECT RAISE(ABORT, 'stock_ledger is append-only'); END
+        """)
+
+    # كل حركة تحدث الرصيد الحالي وتلغي نقاط الحفظ التي بعد تاريخها
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS stock_ledger_apply
+        AFTER INSERT ON stock_ledger
+        BEGIN
+            UPDATE items SET quantity = COALESCE(quantity, 0) + NEW.qty
+            WHERE id = NEW.item_id AND NEW.kind != 'opening';
+
+            DELETE FROM stock_snapshots
+            WHERE item_id = NEW.item_id AND as_of >= substr(NEW.date, 1, 10);
+        END
+    """)
+
+    # صنف جديد: كميته الأولى رصيد افتتاحي
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_items_opening
+        AFTER INSERT ON items
+        WHEN COALESCE(NEW.quantity, 0) != 0
+        BEGIN
+            INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, date)
+            VALUES (NEW.id, NEW.warehouse_id, NEW.quantity, 'opening', {NOW});
+        END
+    """)
+
+    for lines, kind, sign, invoices in LINE_MOVEMENTS:
+        add = _line_movement_sql(lines, kind, sign, invoices, "NEW")
+        void = _line_movement_sql(lines, kind, sign, invoices, "OLD", void=True)
+
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS stock_{lines}_insert AFTER INSERT ON {lines} BEGIN {add} END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS stock_{lines}_delete AFTER DELETE ON {lines} BEGIN {void} END")
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS stock_{lines}_update
+            AFTER UPDATE OF item_id, qty ON {lines}
+            BEGIN {void} {add} END
+        """)
+
+    add = _transaction_movement_sql("NEW")
+    void = _transaction_movement_sql("OLD", void=True)
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS stock_transactions_insert AFTER INSERT ON transactions BEGIN {add} END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS stock_transactions_delete AFTER DELETE ON transactions BEGIN {void} END")
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS stock_transactions_update
+        AFTER UPDATE OF type, item_id, quantity, from_warehouse, to_warehouse ON transactions
+        BEGIN {void} {add} END
+    """)
+
+
+@migration(7)
+def add_stock_ledger(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_ledger(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            warehouse_id INTEGER,
+            qty REAL NOT NULL,
+            kind TEXT NOT NULL,
+            ref_table TEXT,
+            ref_id INTEGER,
+            date TEXT NOT NULL,
+            user TEXT
+        )
+    """)
+
+    # رصيد الصنف في نهاية يوم as_of
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stock_snapshots(
+            item_id INTEGER NOT NULL,
+            as_of TEXT NOT NULL,
+            qty REAL NOT NULL,
+            PRIMARY KEY(item_id, as_of)
+        ) WITHOUT ROWID
+    """)
+
+    # ترحيل الحركات القديمة (قبل إنشاء الـ triggers حتى لا تتغير الكميات)
+    cur.execute("DELETE FROM stock_snapshots")
+    if not cur.execute("SELECT 1 FROM stock_ledger LIMIT 1").fetchone():
+        for lines, kind, sign, invoices in LINE_MOVEMENTS:
+            cur.execute(f"""
+                INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user)
+                SELECT li.item_id, items.warehouse_id, {sign}COALESCE(li.qty, 0), '{kind}',
+                       '{lines}', li.id, COALESCE(inv.date, {NOW}), inv.user
+                FROM {lines} li
+                JOIN items ON items.id = li.item_id
+                LEFT JOIN {invoices} inv ON inv.id = li.invoice_id
+                ORDER BY li.id
+            """)
+
+        for type_, kind, sign, warehouse in TRANSACTION_MOVEMENTS:
+            cur.execute(f"""
+                INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, ref_table, ref_id, date, user)
+                SELECT t.item_id, t.{warehouse}, {sign}COALESCE(t.quantity, 0), '{kind}',
+                       'transactions', t.id, COALESCE(t.date, {NOW}), t.user
+                FROM transactions t
+                WHERE t.type = ? AND t.item_id IS NOT NULL
+                ORDER BY t.id
+            """, (type_,))
+
+        # الرصيد الافتتاحي = الكمية الحالية - صافي الحركات المسجلة
+        cur.execute(f"""
+            INSERT INTO stock_ledger(item_id, warehouse_id, qty, kind, date)
+            SELECT items.id, items.warehouse_id,
+                   COALESCE(items.quantity, 0) - COALESCE(SUM(l.qty), 0), 'opening', '{OPENING_DATE}'
+            FROM items
+            LEFT JOIN stock_ledger l ON l.item_id = items.id
+            GROUP BY items.id
+            HAVING COALESCE(items.quantity, 0) - COALESCE(SUM(l.qty), 0) != 0
+        """)
+
+    # الفهارس بعد الترحيل — أسرع من تحديثها مع كل صف
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_ledger_item_date ON stock_ledger(item_id, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_ledger_date ON stock_ledger(date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_ledger_ref ON stock_ledger(ref_table, ref_id)")
+
+    create_stock_ledger_triggers(cur)
+
+
+# ===============================================================
+# 8) فهرس البحث النصي (FTS5 trigram) مع توحيد الحروف العربية
+# ===============================================================
+# الكيان → (الجدول, الأعمدة المفهرسة) — جدول الفهرس: search_<entity> و rowid = id الصف
+SEARCH_INDEXES = {
+    "items": ("items", ("name", "sku")),
+    "suppliers": ("suppliers", ("name", "phone", "address")),
+    "customers": ("customers", ("name", "phone", "address")),
+    "transactions": ("transactions", ("type", "user", "notes")),
+}
+
+# توحيد أشكال الحروف: الألف/الهمزة/الياء/التاء المربوطة + حذف التشكيل والتطويل
+ARABIC_FOLDING = [
+    ("أ", "ا"), ("إ", "ا"), ("آ", "ا"), ("ٱ", "ا"),
+    ("ى", "ي"), ("ی", "ي"), ("ئ", "ي"),
+    ("ؤ", "و"), ("ة", "ه"), ("ک", "ك"),
+    ("ـ", ""),
+] + [(chr(c), "") for c in range(0x064B, 0x0653)]
+
+
+def normalize_search_text(text):
+    """نفس توحيد normalize_search_sql لكن في Python (لنص البحث)"""
+    text = (text or "").lower()
+    for src, dst in ARABIC_FOLDING:
+        if src in text:
+            text = text.replace(src, dst)
+    return " ".join(text.split())
+
+
+def normalize_search_sql(expr):
+    """تعبير SQL يوحد النص بـ replace() متداخلة — بدون دوال مسجلة في Python"""
+    expr = f"lower({expr})"
+    for src, dst in ARABIC_FOLDING:
+        expr = f"replace({expr}, '{src}', '{dst}')"
+    return expr
+
+
+def _search_text_sql(columns, row):
+    joined = " || ' ' || ".join(f"COALESCE({row}.{c}, '')" for c in columns)
+    return normalize_search_sql(joined)
+
+
+def create_search_triggers(cur):
+    for entity, (table, columns) in SEARCH_INDEXES.items():
+        index = f"search_{entity}"
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {index}(rowid, text) VALUES (NEW.id, {_search_text_sql(columns, "NEW")});
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {", ".join(columns)} ON {table}
+            BEGIN
+                UPDATE {index} SET text = {_search_text_sql(columns, "NEW")} WHERE rowid = NEW.id;
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {index} WHERE rowid = OLD.id;
+            END
+        """)
+
+
+def rebuild_search_index(cur, entities=None):
+    for entity in entities or SEARCH_INDEXES:
+        table, columns = SEARCH_INDEXES[entity]
+        cur.execute(f"DELETE FROM search_{entity}")
+        cur.execute(f"""
+            INSERT INTO search_{entity}(rowid, text)
+            SELECT id, {_search_text_sql(columns, table)} FROM {table}
+        """)
+        cur.execute(f"INSERT INTO search_{entity}(search_{entity}) VALUES ('optimize')")
+
+
+@migration(8)
+def add_search_index(cur):
+    for entity in SEARCH_INDEXES:
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_{entity}
+            USING fts5(text, tokenize = 'trigram')
+        """)
+
+    rebuild_search_index(cur)
+    create_search_triggers(cur)
+
+
+# ===============================================================
+# 9) فهرس فريد لكود الصنف (SKU / باركود)
+# ===============================================================
+@migration(9)
+def add_sku_index(cur):
+    # الكود الفارغ = بدون كود (NULL مسموح بتكراره في الفهرس الفريد)
+    cur.execute("UPDATE items SET sku = NULLIF(TRIM(sku), '') WHERE sku != TRIM(sku) OR sku = ''")
+
+    # كود مكرر: يبقى لأقدم صنف، والباقي يُضاف له رقم الصنف حتى يتم تصحيحه
+    cur.execute("""
+        UPDATE items SET sku = sku || '-' || id
+        WHERE id IN (
+            SELECT i.id
+            FROM items i
+            JOIN (
+                SELECT sku, MIN(id) AS keep FROM items
+                WHERE sku IS NOT NULL
+                GROUP BY sku HAVING COUNT(*) > 1
+            ) d ON d.sku = i.sku
+            WHERE i.id != d.keep
+        )
+    """)
+
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_sku ON items(sku)")
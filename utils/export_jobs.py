@@ -0,0 +1,157 @@
+# utils/export_jobs.py
+
+import threading
+import traceback
+
+from PyQt5 import QtCore
+
+from utils.backup_engine import BackupCancelled
+
+
+class ExportJob(QtCore.QObject):
+    """
+    تصدير واحد (PDF / Excel) يعمل في الخلفية.
+    الإشارات تصل للواجهة على الـ GUI thread (queued connection).
+    """
+    started = QtCore.pyqtSignal()
+    progress = QtCore.pyqtSignal(int)       # عدد الصفوف المكتوبة حتى الآن
+    finished = QtCore.pyqtSignal(object)    # نتيجة دالة التصدير (مسار الملف)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, name, total=None):
+        super().__init__()
+        self.name = name
+        self.total = total
+        self.rows = 0
+        self.running = False
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """إيقاف التصدير — الملف الناقص يتم حذفه"""
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def then(self, on_finished, on_failed=None):
+        self.finished.connect(on_finished)
+        if on_failed:
+            self.failed.connect(on_failed)
+        return self
+
+    def _report(self, rows):
+        # يُستدعى من دالة التصدير كل عدد من الصفوف — False = أوقف الكتابة
+        self.rows = rows
+        self.progress.emit(rows)
+        return not self.is_cancelled()
+
+
+class _ExportTask(QtCore.QRunnable):
+    def __init__(self, job, func, args, kwargs):
+        super().__init__()
+        self.job = job
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        job = self.job
+
+        try:
+            if job.is_cancelled():
+                job.cancelled.emit()
+                return
+
+            job.running = True
+            job.started.emit()
+
+            try:
+                result = self.func(*self.args, progress=job._report, **self.kwargs)
+            except BackupCancelled:
+                job.cancelled.emit()
+                return
+            except Exception as e:
+                # خطأ بعد الإلغاء (ملف ناقص / قاعدة مغلقة) = إلغاء وليس فشل
+                if job.is_cancelled():
+                    job.cancelled.emit()
+                else:
+                    traceback.print_exc()
+                    job.failed.emit(str(e))
+                return
+
+            if job.is_cancelled():
+                job.cancelled.emit()
+            else:
+                job.finished.emit(result)
+        finally:
+            job.running = False
+
+
+class ExportJobManager(QtCore.QObject):
+    """
+    طابور التصدير: كل export_pdf / export_excel يعمل على thread منفصل
+    والشاشة تظل تستجيب أثناء كتابة تقرير كبير.
+
+    - func(*args, progress=callback, **kwargs): دالة التصدير لازم تستدعي
+      progress(عدد الصفوف) دورياً وتتوقف لو رجع False (مثل export_rows_pdf)
+    - max_threads: عدد التصديرات في نفس الوقت، والباقي ينتظر في الطابور
+    - البيانات المرسلة لازم تكون نسخة ثابتة (قائمة / cursor) وليست
+      widgets أو موديل الجدول نفسه
+    """
+    job_added = QtCore.pyqtSignal(object)
+
+    def __init__(self, max_threads=1):
+        super().__init__()
+
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        # threads دائمة: connection_registry يفتح اتصال قراءة لكل thread ولا يغلقه
+        # إلا close_all — thread ينتهي بعد الخمول (30s افتراضياً) = اتصال مفتوح ضائع
+        self.pool.setExpiryTimeout(-1)
+
+        self._lock = threading.Lock()
+        self._jobs = []
+
+    # ============================================================
+    def submit(self, name, func, *args, total=None, **kwargs):
+        """
+        name: اسم التصدير المعروض في شريط التقدم
+        total: عدد الصفوف لو معروف (شريط تقدم بنسبة مئوية بدل مؤشر انتظار)
+        """
+        job = ExportJob(name, total)
+
+        with self._lock:
+            self._jobs.append(job)
+
+        # نحتفظ بالـ job حتى تصل إشارته الأخيرة للواجهة ثم نتركه
+        for signal in (job.finished, job.failed, job.cancelled):
+            signal.connect(lambda *_, j=job: self._release(j))
+
+        self.job_added.emit(job)
+
+        task = _ExportTask(job, func, args, kwargs)
+        QtCore.QTimer.singleShot(0, lambda: self.pool.start(task))
+        return job
+
+    def jobs(self):
+        """التصديرات الجارية والمنتظرة بالترتيب"""
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel_all(self):
+        for job in self.jobs():
+            job.cancel()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    # ============================================================
+    def _release(self, job):
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+
+# كائن واحد عالمي لكل التصديرات
+export_jobs = ExportJobManager()
@@ -1,8 +1,8 @@
 import os
-import xlsxwriter
-from fpdf import FPDF
 from datetime import datetime
 from utils.settings_manager import SettingsManager
+from utils.excel_export import export_rows_excel
+from utils.pdf_report import export_rows_pdf
 
 
 class ExportUtils:
@@ -18,22 +18,8 @@ class ExportUtils:
     # ===============================================================
     @staticmethod
     def export_excel(filename, headers, rows):
-        wb = xlsxwriter.Workbook(filename)
-        ws = wb.add_worksheet("Report")
-
-        bold = wb.add_format({"bold": True, "bg_color": "#DDEBF7", "border": 1})
-        cell = wb.add_format({"border": 1})
-
-        # كتابة رؤوس الأعمدة
-        for col, header in enumerate(headers):
-            ws.write(0, col, header, bold)
-
-        # كتابة البيانات
-        for r, row in enumerate(rows, start=1):
-            for c, value in enumerate(row):
-                ws.write(r, c, value, cell)
-
-        wb.close()
+        # rows أي iterable (قائمة أو cursor) — يُكتب صف بصف بذاكرة ثابتة
+        export_rows_excel(filename, headers, rows)
         return True
 
     # ===============================================================
@@ -41,60 +27,21 @@ class ExportUtils:
     # ===============================================================
     @staticmethod
     def export_pdf(filename, title, headers, rows):
-        settings = SettingsManager().load_settings()
+        settings = SettingsManager().load()
 
         company = settings.get("company_name", "Company Name")
         phone = settings.get("company_phone", "01000551634")
         email = settings.get("company_email", "info@example.com")
         logo = settings.get("logo_path", "")
 
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=10)
-        pdf.add_page()
-
-        # --- HEADER ---
-        if logo and os.path.exists(logo):
-            pdf.image(logo, x=10, y=8, w=25)
-
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, company, ln=1, align="R")
-
-        pdf.set_font("Arial", "", 10)
-        pdf.cell(0, 6, f"Phone: {phone}", ln=1, align="R")
-        pdf.cell(0, 6, f"Email: {email}", ln=1, align="R")
-
-        pdf.ln(10)
-
-        # --- TITLE ---
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, title, ln=1, align="C")
-
-        pdf.ln(5)
-
-        # --- TABLE HEADER ---
-        pdf.set_font("Arial", "B", 11)
-        for h in headers:
-            pdf.cell(40, 10, str(h), border=1, align="C")
-        pdf.ln()
-
-        # --- TABLE DATA ---
-        pdf.set_font("Arial", "", 10)
-        for row in rows:
-            for value in row:
-                pdf.cell(40, 8, str(value), border=1, align="C")
-            pdf.ln()
-
-        pdf.ln(10)
-        pdf.set_font("Arial", "I", 9)
-        pdf.cell(
-            0,
-            8,
-            "Generated by Inventory Pro — All Rights Reserved",
-            ln=1,
-            align="C"
+        # rows أي iterable (قائمة أو cursor) — يُرسم صفحة بصفحة
+        export_rows_pdf(
+            filename, headers, rows, title,
+            company=company,
+            logo=logo,
+            info=f"Phone: {phone}   Email: {email}",
+            rights="Generated by Inventory Pro — All Rights Reserved",
         )
-
-        pdf.output(filename)
         return True
 
     # ===============================================================
@@ -3,9 +3,29 @@
 from PyQt5 import QtCore
 
 
+class ChangeEvent:
+    """
+    تغيير في جدول واحد: اسم الجدول + نوع العملية + أرقام الصفوف المتأثرة.
+    ids = None معناها "غير معروف" — المشترك يعيد تحميل ما يخص الجدول كله.
+    """
+    INSERT = "insert"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    __slots__ = ("table", "op", "ids")
+
+    def __init__(self, table, op, ids=None):
+        self.table = table
+        self.op = op
+        self.ids = None if ids is None else frozenset(ids)
+
+    def __repr__(self):
+        return f"ChangeEvent({self.table!r}, {self.op!r}, {self.ids!r})"
+
+
 class GlobalSignals(QtCore.QObject):
-    # إشارة تحدث عند تغيير البيانات (إضافة، حذف، تعديل)
-    data_changed = QtCore.pyqtSignal()
+    # التغييرات المجمعة خلال دورة event loop واحدة: [ChangeEvent, ...]
+    changed = QtCore.pyqtSignal(list)
 
     # إشارة تحديث للداشبورد فقط
     dashboard_update = QtCore.pyqtSignal()
@@ -16,6 +36,54 @@ class GlobalSignals(QtCore.QObject):
     # إشارة لتحديث الصلاحيات في الواجهة
     permissions_updated = QtCore.pyqtSignal()
 
+    def __init__(self):
+        super().__init__()
+        self._queue = {}
+
+    # ============================================================
+    # الإرسال
+    # ============================================================
+    def notify(self, table, op=ChangeEvent.UPDATE, ids=None):
+        """
+        تسجيل تغيير — يتم إرسال كل التغييرات معاً في الدورة التالية
+        حتى لا يعيد المشترك التحميل مرة لكل صف في نفس العملية.
+        """
+        if not self._queue:
+            QtCore.QTimer.singleShot(0, self._flush)
+
+        key = (table, op)
+        if key not in self._queue:
+            self._queue[key] = None if ids is None else set(ids)
+        elif self._queue[key] is not None:
+            if ids is None:
+                self._queue[key] = None
+            else:
+                self._queue[key].update(ids)
+
+    def _flush(self):
+        queue, self._queue = self._queue, {}
+        if queue:
+            self.changed.emit([ChangeEvent(t, op, ids) for (t, op), ids in queue.items()])
+
+    # ============================================================
+    # الاشتراك
+    # ============================================================
+    def subscribe(self, tables, callback):
+        """
+        callback(events) يُستدعى فقط لو التغييرات تخص أحد الجداول المطلوبة.
+        tables = None → كل الجداول.
+        """
+        tables = None if tables is None else set(tables)
+
+        def deliver(events):
+            if tables is not None:
+                events = [e for e in events if e.table in tables]
+            if events:
+                callback(events)
+
+        self.changed.connect(deliver)
+        return deliver
+
 
 # كائن واحد عالمي يتم استيراده في كل الصفحات
 global_signals = GlobalSignals()
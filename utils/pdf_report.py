@@ -0,0 +1,342 @@
+# utils/pdf_report.py
+
+import os
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+
+COLOR_MAIN = colors.HexColor("#0A3D91")
+COLOR_STRIPE = colors.HexColor("#F2F4F8")
+RIGHTS = "All Rights Reserved © Mahmoud Ali — Inventory Pro System"
+
+FONT_PATH = os.path.join("assets", "fonts", "Cairo-Regular.ttf")
+
+# الخطوط والصور تُحمل مرة واحدة لكل البرنامج (وليس مع كل تقرير)
+_fonts = {}
+_images = {}
+
+
+def report_font():
+    """الخط العربي Cairo لو موجود وإلا Helvetica — التسجيل مرة واحدة فقط"""
+    if "regular" not in _fonts:
+        if os.path.exists(FONT_PATH):
+            try:
+                pdfmetrics.registerFont(TTFont("Cairo", FONT_PATH))
+                _fonts.update(regular="Cairo", bold="Cairo")
+            except Exception:
+                pass
+        _fonts.setdefault("regular", "Helvetica")
+        _fonts.setdefault("bold", "Helvetica-Bold")
+    return _fonts["regular"], _fonts["bold"]
+
+
+def report_image(path):
+    """ImageReader مخزن لكل مسار — اللوجو يُقرأ من القرص مرة واحدة"""
+    if not path or not os.path.exists(path):
+        return None
+
+    key = (path, os.path.getmtime(path))
+    if key not in _images:
+        try:
+            _images[key] = ImageReader(path)
+        except Exception:
+            _images[key] = None
+    return _images[key]
+
+
+class PdfReportWriter:
+    """
+    محرك تقارير PDF الموحد لكل جداول التقارير.
+
+    - الصفوف من أي iterable (قائمة / generator / sqlite3 cursor) ويتم
+      رسمها صفحة بصفحة — لا يتم تجميع الجدول كله في الذاكرة
+    - رأس الجدول يتكرر في كل صفحة، ورقم الصفحة والحقوق في الفوتر
+    - عرض الأعمدة يُحسب من أول صفوف فقط، والنص الأطول من العمود يُقص
+    - columns: [(key, header), ...] أو [header, ...] (الصف بالترتيب)
+    - أكثر من 6 أعمدة → الصفحة بالعرض تلقائياً
+    - reportlab يحتفظ بكل صفحات الملف حتى الحفظ، فكل MAX_PAGES صفحة
+      يُحفظ الملف ويُكمل التقرير في ملف جديد "name (2).pdf" (مثل أوراق Excel)
+    """
+
+    # أقصى عدد صفحات في الملف الواحد (يحدد أقصى ذاكرة للتقرير)
+    MAX_PAGES = 1000
+
+    MARGIN = 36
+    ROW_HEIGHT = 16
+    HEADER_HEIGHT = 20
+    FONT_SIZE = 8
+
+    # عدد الصفوف الأولى التي يُحسب منها عرض الأعمدة
+    WIDTH_SAMPLE = 200
+
+    def __init__(self, path, columns, title="", subtitle="", company="", logo="",
+                 info="", rights=None, pagesize=None):
+        self.path = path
+        self.title = title
+        self.subtitle = subtitle or datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.company = company
+        self.info = info
+        self.rights = RIGHTS if rights is None else rights
+        self.logo = report_image(logo)
+
+        columns = list(columns)
+        if columns and isinstance(columns[0], (tuple, list)):
+            self.keys = [c[0] for c in columns]
+            self.headers = [str(c[1]) for c in columns]
+        else:
+            self.keys = None
+            self.headers = [str(c) for c in columns]
+
+        if pagesize is None:
+            pagesize = landscape(A4) if len(self.headers) > 6 else A4
+        self.width, self.height = pagesize
+
+        self.pagesize = pagesize
+        self.font, self.font_bold = report_font()
+
+        self.rows_written = 0
+        self.pages = 0
+        self.aborted = False
+        self.paths = []
+        self.canvas = None
+        self._new_file()
+
+        # الصفوف تنتظر هنا لحين حساب عرض الأعمدة (أول WIDTH_SAMPLE صف فقط)
+        self._buffer = []
+        self._layout = None
+        self._page_rows = 0
+
+    # ============================================================
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_file(self):
+        if self.paths:
+            base, ext = os.path.splitext(self.path)
+            path = f"{base} ({len(self.paths) + 1}){ext}"
+        else:
+            path = self.path
+
+        self.paths.append(path)
+        self.canvas = canvas.Canvas(path, pagesize=self.pagesize, pageCompression=1)
+        self.canvas.setTitle(self.title or "Report")
+        self._file_pages = 0
+
+    # ============================================================
+    # الكتابة
+    # ============================================================
+    def write_rows(self, rows, progress=None, every=1000):
+        """progress(عدد الصفوف المكتوبة) كل every صف — يرجع False للإيقاف (والملف يُحذف)"""
+        values_of = self._values_getter()
+
+        for row in rows:
+            self.write_row(values_of(row))
+
+            if progress is not None and self.rows_written % every == 0:
+                if progress(self.rows_written) is False:
+                    self.aborted = True
+                    break
+
+        return self.rows_written
+
+    def write_row(self, values):
+        cells = ["" if v is None else v for v in values]
+        self.rows_written += 1
+
+        if self._layout is None:
+            self._buffer.append(cells)
+            if len(self._buffer) >= self.WIDTH_SAMPLE:
+                self._flush_buffer()
+            return
+
+        self._draw_row(cells)
+
+    def _values_getter(self):
+        keys = self.keys
+        if keys is None:
+            return lambda row: row.values() if isinstance(row, dict) else row
+        return lambda row: [row[k] for k in keys]
+
+    def _flush_buffer(self):
+        buffer, self._buffer = self._buffer, []
+        self._layout = self._compute_layout(buffer)
+        for cells in buffer:
+            self._draw_row(cells)
+
+    # ============================================================
+    # تخطيط الأعمدة
+    # ============================================================
+    def _compute_layout(self, sample):
+        count = max(len(self.headers), 1)
+        usable = self.width - 2 * self.MARGIN
+
+        # عرض كل عمود بنسبة أطول نص فيه (بحد أدنى وأقصى) ثم ملاءمته لعرض الصفحة
+        lengths = [min(max(len(h), 4), 40) for h in self.headers] or [4]
+        for cells in sample:
+            for c, value in enumerate(cells[:count]):
+                lengths[c] = max(lengths[c], min(len(str(value)), 40))
+
+        total = sum(lengths)
+        widths = [usable * n / total for n in lengths]
+
+        xs, x = [], self.MARGIN
+        for w in widths:
+            xs.append(x)
+            x += w
+
+        # أقصى عدد حروف في كل عمود (تقدير بمتوسط عرض الحرف بدل stringWidth لكل خلية)
+        char_width = self.FONT_SIZE * 0.55
+        max_chars = [max(int((w - 6) / char_width), 1) for w in widths]
+
+        return xs, widths, max_chars
+
+    # ============================================================
+    # الرسم
+    # ============================================================
+    def _draw_row(self, cells):
+        if self._page_rows == 0:
+            self._start_page()
+
+        c = self.canvas
+        xs, widths, max_chars = self._layout
+        y = self._y
+
+        if self._page_rows % 2:
+            c.setFillColor(COLOR_STRIPE)
+            c.rect(self.MARGIN, y - 4, self.width - 2 * self.MARGIN, self.ROW_HEIGHT, stroke=0, fill=1)
+            c.setFillColor(colors.black)
+
+        # كائن نص واحد للصف كله أسرع من drawString لكل خلية
+        text = c.beginText()
+        text.setFont(self.font, self.FONT_SIZE)
+
+        for i, value in enumerate(cells[:len(xs)]):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                s = f"{value:,.2f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+                x = xs[i] + widths[i] - 3 - pdfmetrics.stringWidth(s, self.font, self.FONT_SIZE)
+            else:
+                s = str(value)
+                if len(s) > max_chars[i]:
+                    s = s[:max_chars[i] - 1] + "…"
+                x = xs[i] + 3
+            text.setTextOrigin(x, y)
+            text.textOut(s)
+
+        c.drawText(text)
+
+        self._y -= self.ROW_HEIGHT
+        self._page_rows += 1
+
+        if self._y < self.MARGIN + 24:
+            self._end_page()
+
+    def _start_page(self):
+        c = self.canvas
+        self.pages += 1
+        self._file_pages += 1
+        y = self.height - self.MARGIN
+
+        # رأس التقرير في الصفحة الأولى من كل ملف
+        if self._file_pages == 1:
+            y = self._draw_report_header(y)
+
+        xs, widths, _ = self._layout
+        c.setFillColor(COLOR_MAIN)
+        c.rect(self.MARGIN, y - self.HEADER_HEIGHT, self.width - 2 * self.MARGIN,
+               self.HEADER_HEIGHT, stroke=0, fill=1)
+        c.setFillColor(colors.white)
+        c.setFont(self.font_bold, self.FONT_SIZE + 1)
+        for i, header in enumerate(self.headers):
+            c.drawString(xs[i] + 3, y - self.HEADER_HEIGHT + 6, header)
+        c.setFillColor(colors.black)
+
+        self._y = y - self.HEADER_HEIGHT - self.ROW_HEIGHT + 4
+
+    def _draw_report_header(self, y):
+        c = self.canvas
+
+        if self.logo is not None:
+            c.drawImage(self.logo, self.MARGIN, y - 50, width=80, height=50,
+                        preserveAspectRatio=True, mask="auto")
+
+        if self.company:
+            c.setFont(self.font_bold, 16)
+            c.setFillColor(COLOR_MAIN)
+            c.drawRightString(self.width - self.MARGIN, y - 16, str(self.company))
+        if self.info:
+            c.setFont(self.font, 9)
+            c.setFillColor(colors.darkgray)
+            c.drawRightString(self.width - self.MARGIN, y - 30, str(self.info))
+
+        y -= 64
+        c.setFillColor(colors.black)
+        if self.title:
+            c.setFont(self.font_bold, 14)
+            c.drawCentredString(self.width / 2, y, str(self.title))
+            y -= 16
+        c.setFont(self.font, 9)
+        c.setFillColor(colors.gray)
+        c.drawCentredString(self.width / 2, y, str(self.subtitle))
+
+        return y - 14
+
+    def _draw_footer(self):
+        c = self.canvas
+        c.setFont(self.font, 7)
+        c.setFillColor(colors.gray)
+        c.drawCentredString(self.width / 2, self.MARGIN / 2, self.rights)
+        c.drawRightString(self.width - self.MARGIN, self.MARGIN / 2, f"{self.pages}")
+        c.setFillColor(colors.black)
+
+    def _end_page(self):
+        self._draw_footer()
+        self.canvas.showPage()
+        self._page_rows = 0
+
+        if self._file_pages >= self.MAX_PAGES:
+            self.canvas.save()
+            self._new_file()
+
+    # ============================================================
+    def close(self):
+        if self.canvas is None:
+            return
+
+        if self._layout is None:
+            self._flush_buffer()
+
+        # تقرير بدون صفوف: الرأس ورأس الجدول فقط
+        if self.pages == 0:
+            self._start_page()
+            self._page_rows = 1
+
+        if self._page_rows:
+            self._end_page()
+
+        if self._file_pages:
+            self.canvas.save()
+        else:
+            # الملف الأخير فُتح بعد آخر صفحة ولم يُكتب فيه شيء
+            self.paths.pop()
+        self.canvas = None
+
+        if self.aborted:
+            for path in self.paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def export_rows_pdf(path, columns, rows, title="", subtitle="", company="", logo="",
+                    info="", rights=None, progress=None):
+    """تصدير أي iterable من الصفوف (قائمة / cursor) إلى PDF — يرجع عدد الصفوف"""
+    with PdfReportWriter(path, columns, title, subtitle, company, logo, info, rights) as writer:
+        return writer.write_rows(rows, progress)
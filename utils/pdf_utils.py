@@ -1,10 +1,8 @@
 import os
 import json
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.units import mm
+
+from utils.pdf_report import export_rows_pdf
 
 # =========================================================
 # قراءة الإعدادات من ملف config.json
@@ -25,78 +23,25 @@ def load_settings():
             pass
     return settings
 
-COLOR_MAIN = colors.HexColor("#0A3D91")
 REPORTS_DIR = "reports"
 
 # =========================================================
 # إنشاء تقرير عام
 # =========================================================
 def generate_pdf(title, table_data, columns, filename_prefix="report"):
+    """table_data أي iterable من الصفوف (قائمة أو cursor) — يُرسم صفحة بصفحة"""
     os.makedirs(REPORTS_DIR, exist_ok=True)
     filename = os.path.join(REPORTS_DIR, f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
 
-    c = canvas.Canvas(filename, pagesize=A4)
-    width, height = A4
-
-    # تحميل الإعدادات
     cfg = load_settings()
-    logo = cfg.get("logo_path", "")
-    company = cfg.get("company_name", "")
-    rights = cfg.get("rights", "")
-
-    # رأس الصفحة (اللوجو + الشركة)
-    if logo and os.path.exists(logo):
-        try:
-            c.drawImage(logo, 40, height - 90, width=80, height=50, preserveAspectRatio=True)
-        except Exception:
-            pass
-        c.setFont("Helvetica-Bold", 16)
-        c.setFillColor(COLOR_MAIN)
-        c.drawString(140, height - 60, company)
-    else:
-        c.setFont("Helvetica-Bold", 16)
-        c.setFillColor(COLOR_MAIN)
-        c.drawString(40, height - 60, company)
-
-    # العنوان
-    c.setFont("Helvetica-Bold", 14)
-    c.setFillColor(colors.black)
-    c.drawString(40, height - 100, title)
-
-    # التاريخ
-    c.setFont("Helvetica", 10)
-    c.drawString(40, height - 115, f"تاريخ الإنشاء: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-    # رسم الجدول
-    y = height - 140
-    x = 40
-    row_height = 20
-    col_widths = [90] * len(columns)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.setFillColor(COLOR_MAIN)
-    c.rect(x - 3, y, sum(col_widths), row_height, fill=1)
-    c.setFillColor(colors.white)
-    for i, col in enumerate(columns):
-        c.drawString(x + i * col_widths[i] + 3, y + 5, str(col))
-    y -= row_height
-
-    c.setFont("Helvetica", 9)
-    c.setFillColor(colors.black)
-    for row in table_data:
-        for i, value in enumerate(row):
-            c.drawString(x + i * col_widths[i] + 3, y + 5, str(value))
-        y -= row_height
-        if y < 100:
-            c.showPage()
-            y = height - 100
-
-    # حقوق الطباعة
-    c.setFont("Helvetica-Oblique", 9)
-    c.setFillColor(colors.gray)
-    c.drawString(150, 40, rights)
 
-    c.save()
+    export_rows_pdf(
+        filename, columns, table_data, title,
+        subtitle=f"تاريخ الإنشاء: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        company=cfg.get("company_name", ""),
+        logo=cfg.get("logo_path", ""),
+        rights=cfg.get("rights", ""),
+    )
     return filename
 
 # =========================================================
@@ -1,9 +1,9 @@
 import os
-import xlsxwriter
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm
 from utils.settings_manager import SettingsManager
+from utils.excel_export import export_rows_excel
 from datetime import datetime
 
 import arabic_reshaper
@@ -106,27 +106,10 @@ def export_price_list_pdf(items):
 # ============================================================
 def export_price_list_excel(items):
     filename = f"price_list_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    workbook = xlsxwriter.Workbook(filename)
-    sheet = workbook.add_worksheet("Price List")
 
-    header_format = workbook.add_format({
-        "bold": True, "bg_color": "#0A3D91",
-        "color": "white", "font_size": 12,
-        "align": "center"
-    })
+    export_rows_excel(filename, [
+        ("name", "الصنف"), ("sku", "SKU"), ("warehouse", "المخزن"),
+        ("quantity", "الكمية"), ("min_quantity", "الحد الأدنى"),
+    ], items, sheet="Price List")
 
-    row_format = workbook.add_format({"font_size": 10, "align": "center"})
-
-    headers = ["الصنف", "SKU", "المخزن", "الكمية", "الحد الأدنى"]
-    for col, h in enumerate(headers):
-        sheet.write(0, col, h, header_format)
-
-    for row, it in enumerate(items, start=1):
-        sheet.write(row, 0, it["name"], row_format)
-        sheet.write(row, 1, it["sku"], row_format)
-        sheet.write(row, 2, it["warehouse"], row_format)
-        sheet.write(row, 3, it["quantity"], row_format)
-        sheet.write(row, 4, it["min_quantity"], row_format)
-
-    workbook.close()
     return filename
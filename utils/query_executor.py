@@ -0,0 +1,167 @@
+# utils/query_executor.py
+
+import threading
+
+from PyQt5 import QtCore
+
+from utils.db_manager import connection_registry
+
+
+class QueryFuture(QtCore.QObject):
+    """
+    نتيجة استعلام يعمل في الخلفية.
+    الإشارات تصل للواجهة على الـ GUI thread (queued connection).
+    """
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, key=None, group=None):
+        super().__init__()
+        self.key = key
+        self.group = group
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    def cancel(self):
+        """إلغاء الاستعلام — لو بدأ بالفعل يتم مقاطعة SQLite نفسه"""
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def is_done(self):
+        return self._done.is_set()
+
+    # ------------------------------------------------------------
+    # اختصار لربط الإشارات في سطر واحد
+    # ------------------------------------------------------------
+    def then(self, on_finished, on_failed=None):
+        self.finished.connect(on_finished)
+        if on_failed:
+            self.failed.connect(on_failed)
+        return self
+
+
+class _QueryTask(QtCore.QRunnable):
+    def __init__(self, executor, future, func, args, kwargs):
+        super().__init__()
+        self.executor = executor
+        self.future = future
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        future = self.future
+
+        if future.is_cancelled():
+            self.executor._release(future)
+            future.cancelled.emit()
+            return
+
+        # progress handler: SQLite يسأل كل N تعليمة — True = أوقف الاستعلام
+        conn = connection_registry.get_connection(self.executor.db_path)
+        conn.set_progress_handler(future.is_cancelled, 10000)
+
+        try:
+            result = self.func(*self.args, **self.kwargs)
+            signal, value = future.finished, result
+        except Exception as e:
+            # OperationalError بعد الإلغاء = المقاطعة من الـ progress handler
+            signal, value = future.failed, str(e)
+        finally:
+            conn.set_progress_handler(None, 0)
+
+        if future.is_cancelled():
+            signal = future.cancelled
+
+        # تحرير المفتاح قبل الإرسال: submit من داخل then() (أو بالتزامن معه)
+        # يبدأ استعلاماً جديداً بدل أن يأخذ future انتهى بالفعل
+        self.executor._release(future)
+
+        if signal is future.cancelled:
+            signal.emit()
+        else:
+            signal.emit(value)
+
+
+class QueryExecutor(QtCore.QObject):
+    """
+    تشغيل استعلامات قاعدة البيانات على QThreadPool بدل الـ GUI thread.
+
+    - key: طلبين بنفس المفتاح أثناء التنفيذ = نفس الـ future (coalescing)
+    - group: طلب جديد في نفس المجموعة يلغي الطلب السابق (مثلاً عند تغيير الفلاتر)
+    """
+
+    def __init__(self, db_path="database.db", max_threads=4):
+        super().__init__()
+
+        self.db_path = db_path
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+        # threads دائمة: connection_registry يفتح اتصال قراءة لكل thread ولا يغلقه
+        # إلا close_all — thread ينتهي بعد الخمول (30s افتراضياً) = اتصال مفتوح ضائع
+        self.pool.setExpiryTimeout(-1)
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._groups = {}
+        self._futures = set()
+
+    # ============================================================
+    def submit(self, func, *args, key=None, group=None, **kwargs):
+        with self._lock:
+            if key is not None:
+                existing = self._inflight.get(key)
+                if existing is not None and not existing.is_cancelled() and not existing.is_done():
+                    return existing
+
+            if group is not None:
+                stale = self._groups.get(group)
+                if stale is not None:
+                    stale.cancel()
+
+            future = QueryFuture(key, group)
+            self._futures.add(future)
+
+            # نحتفظ بالـ future حتى تصل إشارته للواجهة ثم نتركه
+            for signal in (future.finished, future.failed, future.cancelled):
+                signal.connect(lambda *_, f=future: self._forget(f))
+
+            if key is not None:
+                self._inflight[key] = future
+            if group is not None:
+                self._groups[group] = future
+
+        # البدء في الدورة التالية للـ event loop حتى يتمكن المستدعي
+        # من ربط إشارات الـ future قبل أن ينتهي الاستعلام
+        task = _QueryTask(self, future, func, args, kwargs)
+        QtCore.QTimer.singleShot(0, lambda: self.pool.start(task))
+        return future
+
+    def cancel_group(self, group):
+        with self._lock:
+            future = self._groups.pop(group, None)
+        if future is not None:
+            future.cancel()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    # ============================================================
+    def _release(self, future):
+        future._done.set()
+
+        with self._lock:
+            if future.key is not None and self._inflight.get(future.key) is future:
+                del self._inflight[future.key]
+            if future.group is not None and self._groups.get(future.group) is future:
+                del self._groups[future.group]
+
+    def _forget(self, future):
+        QtCore.QTimer.singleShot(0, lambda: self._futures.discard(future))
+
+
+# كائن واحد عالمي تستخدمه كل الصفحات
+query_executor = QueryExecutor()
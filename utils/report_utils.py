@@ -1,27 +1,82 @@
 import os
 import json
-import xlsxwriter
 from datetime import datetime
 
 from PyQt5 import QtGui, QtWidgets, QtCore, QtPrintSupport
 
 from utils.settings_manager import SettingsManager
+from utils.db_manager import DatabaseManager
+from utils.excel_export import export_rows_excel
+from utils.export_jobs import export_jobs
+from utils.pdf_report import export_rows_pdf
+
+
+def _export_file(writer, path, columns, rows, progress=None, **options):
+    """تشغيل writer (export_rows_pdf / export_rows_excel) على thread التصدير — يرجع مسار الملف"""
+    writer(path, columns, rows, progress=progress, **options)
+    return path
+
+
+def _count(rows):
+    return len(rows) if hasattr(rows, "__len__") else None
 
 
 class ReportUtils:
     def __init__(self):
         self.settings = SettingsManager()
 
+    # ========================================================================
+    # قراءة العناوين والصفوف من QTableWidget أو QTableView (عن طريق الموديل)
+    # ========================================================================
+    @staticmethod
+    def table_headers(table):
+        model = table.model()
+        return [
+            str(model.headerData(c, QtCore.Qt.Horizontal) or "")
+            for c in range(model.columnCount())
+        ]
+
+    @staticmethod
+    def table_rows(table):
+        model = table.model()
+
+        # الموديل الافتراضي: حمّل باقي الصفوف قبل القراءة
+        while model.canFetchMore(QtCore.QModelIndex()):
+            model.fetchMore(QtCore.QModelIndex())
+
+        for r in range(model.rowCount()):
+            yield [
+                str(model.data(model.index(r, c)) or "")
+                for c in range(model.columnCount())
+            ]
+
+    @staticmethod
+    def rows_source(data_list, query=None, total=None):
+        """(rows, total) — مع query: generator كسول، الاستعلام نفسه يتنفذ في thread التصدير"""
+        if query is not None:
+            return DatabaseManager().export_rows(query), total
+        return data_list, _count(data_list) if total is None else total
+
+    @staticmethod
+    def table_source(table):
+        """
+        (columns, rows, count) للتصدير في الخلفية — نسخة ثابتة من الجدول.
+        RowBufferModel يعطي القيم الأصلية بنوعها (أرقام/تواريخ) بدل نص الخلايا
+        """
+        model = table.model()
+        if hasattr(model, "snapshot") and hasattr(model, "keys"):
+            while model.canFetchMore(QtCore.QModelIndex()):
+                model.fetchMore(QtCore.QModelIndex())
+            rows, count = model.snapshot()
+            return list(zip(model.keys, model.headers)), rows, count
+
+        rows = list(ReportUtils.table_rows(table))
+        return ReportUtils.table_headers(table), rows, len(rows)
+
     # ========================================================================
     # -------------    PDF EXPORT (TABLES) GOLD VERSION      -----------------
     # ========================================================================
     def export_table_pdf(self, table, filename="report", report_title="Report"):
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet
-
         save_path, _ = QtWidgets.QFileDialog.getSaveFileName(
             None, "حفظ PDF", f"{filename}.pdf", "PDF Files (*.pdf)"
         )
@@ -29,90 +84,44 @@ class ReportUtils:
         if not save_path:
             return
 
-        # إعدادات الشركة
-        company_name = self.settings.get("company_name", "Company Name")
-        logo_path = self.settings.get("logo_path", None)
+        columns, rows, count = self.table_source(table)
 
-        doc = SimpleDocTemplate(
-            save_path, pagesize=A4,
-            leftMargin=30, rightMargin=30, topMargin=40, bottomMargin=40
+        # الجدول يُرسم صفحة بصفحة (بدل Table واحد ضخم في platypus) في الخلفية
+        return export_jobs.submit(
+            f"PDF — {report_title}", _export_file, export_rows_pdf, save_path, columns, rows,
+            total=count,
+            title=report_title,
+            company=self.settings.get("company_name", "Company Name"),
+            logo=self.settings.get("logo_path", None),
+            rights="All Rights Reserved © Mahmoud Ali | 01000551634",
         )
 
-        story = []
-        styles = getSampleStyleSheet()
-
-        # -------------------- اللوجو + اسم الشركة --------------------
-        if logo_path and os.path.exists(logo_path):
-            story.append(Paragraph(
-                f"""
-                <para alignment='right'>
-                    <img src='{logo_path}' width='90' height='90' valign='middle'/>
-                </para>
-                """,
-                styles["Normal"]
-            ))
-
-        story.append(Paragraph(
-            f"<para alignment='right'><b>{company_name}</b></para>",
-            styles["Title"]
-        ))
-
-        story.append(Paragraph(
-            f"<para alignment='right'><font size=10 color='grey'>Created: {datetime.now().strftime('%Y-%m-%d %H:%M')}</font></para>",
-            styles["Normal"]
-        ))
-
-        story.append(Paragraph("<br/><br/>", styles["Normal"]))
-
-        # -------------------- عنوان التقرير --------------------
-        story.append(Paragraph(
-            f"<para alignment='center'><b>{report_title}</b></para>",
-            styles["Heading2"]
-        ))
-        story.append(Paragraph("<br/>", styles["Normal"]))
-
-        # -------------------- جمع البيانات من الجدول --------------------
-        headers = []
-        data = []
-
-        for c in range(table.columnCount()):
-            headers.append(table.horizontalHeaderItem(c).text())
-
-        data.append(headers)
-
-        for r in range(table.rowCount()):
-            row = []
-            for c in range(table.columnCount()):
-                item = table.item(r, c)
-                row.append(item.text() if item else "")
-            data.append(row)
-
-        # -------------------- إضافة الجدول --------------------
-        tbl = Table(data, repeatRows=1)
-        tbl.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0A3D91")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("LINEBEFORE", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("LINEAFTER", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("BOX", (0, 0), (-1, -1), 1, colors.black),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F2F4F8")]),
-        ]))
-
-        story.append(tbl)
-        story.append(Paragraph("<br/><br/>", styles["Normal"]))
-
-        # -------------------- علامة حقوق الملكية --------------------
-        story.append(Paragraph(
-            "<para alignment='center'><font size=8 color='grey'>"
-            "All Rights Reserved © Mahmoud Ali | 01000551634"
-            "</font></para>",
-            styles["Normal"]
-        ))
-
-        doc.build(story)
+    # ========================================================================
+    # --------------  PDF EXPORT من صفوف (قائمة / cursor)  ---------------------
+    # ========================================================================
+    def export_pdf(self, data_list, columns, filename="report", report_title="Report",
+                   date_from=None, date_to=None, query=None, total=None):
+        """
+        query: مواصفة الاستعلام (name, filters) التي عرضتها الصفحة — يُعاد تنفيذها
+               كـ cursor في thread التصدير بالقيم الأصلية (بدل data_list)
+        data_list: أي iterable من dict / sqlite3.Row (يُرسم بالتدفق بدون تحميل كامل)
+        columns: [key, ...] أو [(key, header), ...]
+        يعمل في الخلفية — يرجع ExportJob (finished يحمل مسار الملف)
+        """
+        save_path = f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+        columns = [c if isinstance(c, (tuple, list)) else (c, c) for c in columns]
+        period = f"{date_from} → {date_to}" if date_from or date_to else ""
+        rows, total = self.rows_source(data_list, query, total)
+
+        return export_jobs.submit(
+            f"PDF — {report_title}", _export_file, export_rows_pdf, save_path, columns, rows,
+            total=total,
+            title=report_title,
+            subtitle=f"{datetime.now().strftime('%Y-%m-%d %H:%M')}  {period}".strip(),
+            company=self.settings.get("company_name", "Company Name"),
+            logo=self.settings.get("logo_path", None),
+        )
 
     # ========================================================================
     # -----------------  EXCEL EXPORT GOLD VERSION  --------------------------
@@ -126,58 +135,42 @@ class ReportUtils:
         if not save_path:
             return
 
-        workbook = xlsxwriter.Workbook(save_path)
-        worksheet = workbook.add_worksheet("Report")
-
-        header_format = workbook.add_format({
-            "bold": True,
-            "bg_color": "#0A3D91",
-            "color": "white",
-            "border": 1,
-            "align": "center"
-        })
-
-        cell_format = workbook.add_format({
-            "border": 1,
-            "align": "center"
-        })
-
-        # -------------------- رأس الصفحة --------------------
         company_name = self.settings.get("company_name", "Company Name")
-        worksheet.merge_range("A1:E1", company_name, workbook.add_format({
-            "bold": True,
-            "font_size": 16,
-            "align": "center"
-        }))
-
-        worksheet.merge_range("A2:E2", f"Report: {report_title}", workbook.add_format({
-            "bold": True,
-            "font_size": 12,
-            "align": "center"
-        }))
-
-        worksheet.merge_range("A3:E3", datetime.now().strftime("%Y-%m-%d %H:%M"), workbook.add_format({
-            "color": "gray",
-            "align": "center"
-        }))
-
-        start_row = 5
-
-        # -------------------- العناوين --------------------
-        for col in range(table.columnCount()):
-            header = table.horizontalHeaderItem(col).text()
-            worksheet.write(start_row, col, header, header_format)
-
-        # -------------------- البيانات --------------------
-        for row in range(table.rowCount()):
-            for col in range(table.columnCount()):
-                item = table.item(row, col)
-                val = item.text() if item else ""
-                worksheet.write(row + start_row + 1, col, val, cell_format)
-
-        workbook.close()
+        columns, rows, count = self.table_source(table)
+
+        return export_jobs.submit(
+            f"Excel — {report_title}", _export_file, export_rows_excel, save_path, columns, rows,
+            total=count,
+            title=f"{company_name} — Report: {report_title}",
+            subtitle=datetime.now().strftime("%Y-%m-%d %H:%M"),
+        ).then(
+            lambda path: QtWidgets.QMessageBox.information(None, "✔", f"تم حفظ الملف:\n{path}")
+        )
 
-        QtWidgets.QMessageBox.information(None, "✔", f"تم حفظ الملف:\n{save_path}")
+    # ========================================================================
+    # ------------  EXCEL EXPORT من صفوف (قائمة / cursor)  ---------------------
+    # ========================================================================
+    def export_excel(self, data_list, columns, filename="report", report_title="Report",
+                     date_from=None, date_to=None, query=None, total=None):
+        """
+        query: مواصفة الاستعلام (name, filters) التي عرضتها الصفحة — يُعاد تنفيذها
+               كـ cursor في thread التصدير بالقيم الأصلية (بدل data_list)
+        data_list: أي iterable من dict / sqlite3.Row (يُكتب بالتدفق بدون تحميل كامل)
+        columns: [key, ...] أو [(key, header), ...]
+        يعمل في الخلفية — يرجع ExportJob (finished يحمل مسار الملف)
+        """
+        save_path = f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+        columns = [c if isinstance(c, (tuple, list)) else (c, c) for c in columns]
+        period = f"{date_from} → {date_to}" if date_from or date_to else ""
+        rows, total = self.rows_source(data_list, query, total)
+
+        return export_jobs.submit(
+            f"Excel — {report_title}", _export_file, export_rows_excel, save_path, columns, rows,
+            total=total,
+            title=f"{self.settings.get('company_name', 'Company Name')} — {report_title}",
+            subtitle=f"{datetime.now().strftime('%Y-%m-%d %H:%M')}  {period}".strip(),
+        )
 
     # ========================================================================
     # -------------------------  PRINTING  -----------------------------------
@@ -208,15 +201,14 @@ class ReportUtils:
         y += 60
 
         # رأس الجدول
-        for col in range(table.columnCount()):
-            painter.drawText(x + col * 120, y, table.horizontalHeaderItem(col).text())
+        for col, header in enumerate(self.table_headers(table)):
+            painter.drawText(x + col * 120, y, header)
         y += 30
 
         # البيانات
-        for row in range(table.rowCount()):
-            for col in range(table.columnCount()):
-                item = table.item(row, col)
-                painter.drawText(x + col * 120, y, item.text() if item else "")
+        for values in self.table_rows(table):
+            for col, val in enumerate(values):
+                painter.drawText(x + col * 120, y, val)
             y += 25
 
         painter.end()
@@ -0,0 +1,368 @@
+# utils/restore_engine.py
+
+import os
+import shutil
+import sqlite3
+import time
+import zipfile
+
+from utils import db_migrations
+from utils.backup_engine import BackupCancelled, snapshot_database
+from utils.backup_archiver import archive_info, extract_database
+from utils.chunk_store import ChunkStore
+
+
+class RestoreError(Exception):
+    """النسخة غير صالحة للاستعادة (تالفة / ناقصة / أحدث من البرنامج)"""
+
+
+# جداول لازم تكون موجودة في أي نسخة من قاعدة بيانات البرنامج
+REQUIRED_TABLES = ("roles", "users", "items", "warehouses", "transactions")
+
+# الجداول المسموح باستعادتها منفردة.
+# باقي الجداول مرتبطة ببعضها بـ triggers (دفتر المخزون append-only / التكلفة /
+# الأرباح) — استعادة جزء منها فقط تكسر الأرصدة، لذلك تتم باستعادة كاملة.
+# triggers العدادات (kpi) والبحث على هذه الجداول تعمل مع الحذف/الإضافة وتبقى صحيحة.
+# foreign keys (items → warehouses / users → roles ...) يتم فحصها قبل الـ COMMIT.
+PARTIAL_TABLES = {
+    "activity_log": "سجل النشاط",
+    "users": "المستخدمون",
+    "roles": "الصلاحيات",
+    "warehouses": "المخازن",
+    "suppliers": "الموردون",
+    "customers": "العملاء",
+}
+
+STAGE_SUFFIX = ".restore"
+PREVIOUS_SUFFIX = ".pre_restore"
+SIDECARS = ("-wal", "-shm", "-journal")
+
+
+def remove_sidecars(path):
+    # ملفات SQLite الجانبية — قديمة بجانب ملف جديد بنفس الاسم = تُطبق عليه وتفسده
+    for suffix in SIDECARS:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+# ================================================================
+# قراءة النسخة (db / zip / ChunkStore manifest)
+# ================================================================
+def backup_size(path):
+    """حجم قاعدة البيانات داخل النسخة (لحساب التقدم قبل فكها)"""
+    if path.endswith(".zip"):
+        info = archive_info(path)
+        if "database_bytes" in info:
+            return info["database_bytes"]
+        with zipfile.ZipFile(path) as zf:
+            return zf.getinfo(info["database"]).file_size
+
+    if path.endswith(".json"):
+        store, name = _store_snapshot(path)
+        return store.manifest(name)["size"]
+
+    return os.path.getsize(path)
+
+
+def _store_snapshot(path):
+    # <store>/manifests/<name>.json
+    manifests_dir = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    return ChunkStore(os.path.dirname(manifests_dir)), name
+
+
+def stage_backup(path, dst, progress=None):
+    """
+    ملف قاعدة بيانات كامل من النسخة في dst:
+    - .zip: فك ملف قاعدة البيانات (أي codec)
+    - .json (manifest في ChunkStore): إعادة البناء من الأجزاء مع التحقق من الـ hash
+    - .db: نسخة عبر Backup API (متسقة حتى لو الملف مفتوح)
+    progress(bytes)
+    """
+    if path.endswith(".zip"):
+        return extract_database(path, dst, progress=progress)
+
+    if path.endswith(".json"):
+        store, name = _store_snapshot(path)
+        page_size = store.manifest(name)["page_size"]
+        report = None if progress is None else (lambda pages: progress(pages * page_size))
+        return store.restore(name, dst, progress=report)["path"]
+
+    page_size = _page_size(path)
+    report = None if progress is None else (lambda pages: progress(pages * page_size))
+    return snapshot_database(dst, path, progress=report)["path"]
+
+
+def _page_size(path):
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA page_size").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"الملف ليس قاعدة بيانات صالحة: {e}")
+    finally:
+        conn.close()
+
+
+# ================================================================
+# التحقق
+# ================================================================
+def verify_database(path, tables=REQUIRED_TABLES, progress=None):
+    """
+    PRAGMA quick_check + الجداول الأساسية + إصدار الـ schema.
+    quick_check يفحص بنية الصفحات والفهارس بدون مطابقة محتوى الفهارس بالجداول
+    (integrity_check أبطأ بكثير على الملفات الكبيرة).
+    progress() بدون قيمة أثناء الفحص — لو رجع False يتم الإلغاء.
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+
+    if progress is not None:
+        # قيمة غير صفرية من الـ handler تقطع الاستعلام
+        conn.set_progress_handler(lambda: progress() is False, 100000)
+
+    try:
+        rows = [r[0] for r in conn.execute("PRAGMA quick_check(10)")]
+        if rows != ["ok"]:
+            raise RestoreError("النسخة تالفة:\n" + "\n".join(rows))
+
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [t for t in tables if t not in existing]
+        if missing:
+            raise RestoreError(f"جداول ناقصة في النسخة: {', '.join(missing)}")
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > db_migrations.latest_version():
+            raise RestoreError(f"النسخة من إصدار أحدث من البرنامج (schema {version})")
+
+    except sqlite3.OperationalError as e:
+        if progress is not None and str(e) == "interrupted":
+            raise BackupCancelled()
+        raise RestoreError(str(e))
+
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"الملف ليس قاعدة بيانات صالحة: {e}")
+
+    finally:
+        conn.close()
+
+    return {"version": version, "seconds": time.perf_counter() - started}
+
+
+# ================================================================
+# الاستعادة الكاملة: تجهيز + تحقق (في الخلفية) ثم تبديل الملف (سريع)
+# ================================================================
+def prepare_restore(path, target="database.db", progress=None):
+    """
+    تجهيز النسخة بجانب قاعدة البيانات (target.restore) ثم فحصها.
+    قاعدة البيانات الحالية لا تتغير — البرنامج يعمل عادي أثناء التجهيز.
+    بعدها swap_database() تستبدل الملف في خطوة واحدة.
+
+    progress: نسبة مئوية (0..100)
+    يرجع dict: path / staged / bytes / stage_seconds / verify_seconds / seconds
+    """
+    if not os.path.exists(path):
+        raise RestoreError(f"الملف غير موجود: {path}")
+
+    size = max(1, backup_size(path))
+    staged = target + STAGE_SUFFIX
+
+    def report(done):
+        # التجهيز 0..90 — الفحص 90..100
+        if progress is not None and progress(min(90, done * 90 // size)) is False:
+            raise BackupCancelled()
+
+    started = time.perf_counter()
+    remove_sidecars(staged)
+    try:
+        stage_backup(path, staged, progress=report)
+        stage_seconds = time.perf_counter() - started
+
+        # الفحص على الملف الذي سيتم تبديله فعلاً (وليس المصدر)
+        check = verify_database(staged, progress=None if progress is None else (lambda: progress(90)))
+
+    except BaseException:
+        if os.path.exists(staged):
+            os.remove(staged)
+        raise
+
+    finally:
+        # الفحص read-only على ملف WAL يترك -wal / -shm فارغة
+        remove_sidecars(staged)
+
+    if progress is not None:
+        progress(100)
+
+    seconds = time.perf_counter() - started
+    size = os.path.getsize(staged)
+    return {
+        "path": path,
+        "staged": staged,
+        "target": target,
+        "bytes": size,
+        "version": check["version"],
+        "stage_seconds": stage_seconds,
+        "verify_seconds": check["seconds"],
+        "seconds": seconds,
+        "mb_s": size / (1024 * 1024) / seconds if seconds else 0.0,
+    }
+
+
+def swap_database(staged, target="database.db", keep_previous=True):
+    """
+    استبدال قاعدة البيانات بالنسخة المجهزة.
+    لازم تكون كل الاتصالات بـ target مغلقة قبل الاستدعاء.
+
+    - checkpoint للـ WAL الحالي حتى تكون النسخة السابقة (target.pre_restore) كاملة
+    - حذف -wal / -shm: WAL قديم بجانب الملف الجديد كان سيُطبق عليه ويفسده
+    - os.replace: الملف يتبدل مرة واحدة (لا توجد لحظة بدون قاعدة بيانات)
+    يرجع الزمن بالثواني
+    """
+    started = time.perf_counter()
+
+    if os.path.exists(target):
+        conn = sqlite3.connect(target)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        finally:
+            conn.close()
+
+        if keep_previous:
+            previous = target + PREVIOUS_SUFFIX
+            if os.path.exists(previous):
+                os.remove(previous)
+            try:
+                os.link(target, previous)       # بدون نسخ البيانات
+            except OSError:
+                shutil.copy2(target, previous)
+
+    remove_sidecars(target)
+    remove_sidecars(staged)
+    os.replace(staged, target)
+    return time.perf_counter() - started
+
+
+# ================================================================
+# الاستعادة الجزئية: جداول محددة داخل transaction واحدة
+# ================================================================
+def restore_tables(path, tables, target="database.db", progress=None):
+    """
+    استبدال محتوى الجداول المحددة بمحتواها في النسخة — باقي البيانات لا تتغير.
+    النسخة تُجهز في ملف مؤقت (حتى .db — لا نفتح ملف النسخة نفسه) وتُفحص، ثم
+    ATTACH + DELETE / INSERT ... SELECT لكل جدول في transaction واحدة،
+    ثم PRAGMA foreign_key_check على الجداول المرتبطة: صف يشير لصف لم يعد
+    موجوداً (مثلاً صنف في مخزن غير موجود في النسخة) = تراجع عن كل شيء.
+    أي خطأ = لا شيء يتغير.
+
+    progress: رقم الجدول المكتمل (0..len(tables))
+    يرجع dict: path / tables {اسم: عدد الصفوف} / rows / verify_seconds / seconds
+    """
+    unknown = [t for t in tables if t not in PARTIAL_TABLES]
+    if unknown:
+        raise RestoreError(f"لا يمكن استعادة هذه الجداول منفردة: {', '.join(unknown)}")
+    if not os.path.exists(path):
+        raise RestoreError(f"الملف غير موجود: {path}")
+
+    def check_cancel(*_):
+        if progress is not None and progress(0) is False:
+            raise BackupCancelled()
+
+    started = time.perf_counter()
+    source = target + STAGE_SUFFIX
+    remove_sidecars(source)
+
+    try:
+        stage_backup(path, source, progress=check_cancel)
+        check = verify_database(source, tables=tables, progress=None if progress is None else (lambda: progress(0)))
+        counts = _copy_tables(source, tables, target, progress)
+    finally:
+        if os.path.exists(source):
+            os.remove(source)
+        remove_sidecars(source)
+
+    return {
+        "path": path,
+        "tables": counts,
+        "rows": sum(counts.values()),
+        "verify_seconds": check["seconds"],
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _columns(conn, schema, table):
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _related_tables(conn, tables):
+    """الجداول المستعادة + كل جدول له foreign key على أحدها"""
+    restored = set(tables)
+    related = set(tables)
+    for (name,) in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'"):
+        if any(fk[2] in restored for fk in conn.execute(f'PRAGMA main.foreign_key_list("{name}")')):
+            related.add(name)
+    return sorted(related)
+
+
+def _orphans(conn, tables):
+    # (الجدول, rowid, الجدول الأب) لكل صف يشير لصف غير موجود
+    return {
+        tuple(row[:3])
+        for table in tables
+        for row in conn.execute(f'PRAGMA main.foreign_key_check("{table}")')
+    }
+
+
+def _copy_tables(source, tables, target, progress=None):
+    # اتصال مستقل: ATTACH غير مسموح داخل transaction اتصال الكتابة المشترك
+    conn = sqlite3.connect(target, timeout=30, isolation_level=None, uri=True)
+    counts = {}
+    try:
+        conn.execute("ATTACH DATABASE ? AS backup", (f"file:{os.path.abspath(source)}?mode=ro",))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # foreign_keys غير مفعل في البرنامج: الفحص يدوي، والمخالفات الموجودة
+            # قبل الاستعادة لا تمنعها (المطلوب ألا تضيف الاستعادة مخالفات جديدة)
+            related = _related_tables(conn, tables)
+            before = _orphans(conn, related)
+
+            for i, table in enumerate(tables, 1):
+                # الأعمدة المشتركة فقط (نسخة من schema أقدم ينقصها أعمدة أضيفت لاحقاً)
+                backup_columns = set(_columns(conn, "backup", table))
+                columns = ", ".join(c for c in _columns(conn, "main", table) if c in backup_columns)
+
+                conn.execute(f"DELETE FROM main.{table}")
+                conn.execute(f"INSERT INTO main.{table}({columns}) SELECT {columns} FROM backup.{table}")
+                counts[table] = conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+
+                if progress is not None and progress(i) is False:
+                    raise BackupCancelled()
+
+            orphans = sorted(_orphans(conn, related) - before)
+            if orphans:
+                sample = "\n".join(f"{t} #{rowid} → {parent}" for t, rowid, parent in orphans[:10])
+                raise RestoreError(
+                    f"الاستعادة تترك {len(orphans):,} صف يشير لبيانات غير موجودة في النسخة "
+                    f"— استعد الجداول المرتبطة معاً أو استعادة كاملة:\n{sample}"
+                )
+
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE backup")
+    finally:
+        conn.close()
+
+    return counts
+
+
+def describe_restore(result):
+    """نص مختصر للسجل / الرسائل"""
+    if "tables" in result:
+        tables = "، ".join(f"{PARTIAL_TABLES.get(t, t)} ({n:,})" for t, n in result["tables"].items())
+        return f"{result['path']} — {tables} في {result['seconds']:.1f}s"
+
+    return (
+        f"{result['path']} — {result['bytes'] / (1024 * 1024):,.1f} MB في {result['seconds']:.1f}s "
+        f"(تجهيز {result['stage_seconds']:.1f}s + فحص {result['verify_seconds']:.1f}s"
+        f" + تبديل {result.get('swap_seconds', 0):.1f}s)"
+    )
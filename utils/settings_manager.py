@@ -14,6 +14,14 @@ class SettingsManager:
             "backup_path": "",
             "auto_backup": False,
             "auto_backup_interval": 24,   # بالساعات
+            "backup_mode": "full",        # full | incremental
+            "backup_keep_last": 24,       # النسخ التزايدية: آخر N نسخة
+            "backup_keep_days": 30,       # + آخر نسخة من كل يوم خلال N يوم
+            "backup_codec": "gzip",       # gzip | bz2 | xz | none (أرشيف zip)
+            "backup_level": 1,
+            "db_profile": "balanced",     # safe | balanced | performance
+            "db_pragmas": {},
+            "cogs_method": "fifo",        # fifo | average
         }
 
     # ============================================================
@@ -0,0 +1,57 @@
+# utils/sku_cache.py
+
+from utils.db_manager import DatabaseManager
+from utils.global_signals import global_signals, ChangeEvent
+
+
+class SkuCache:
+    """
+    كاش SKU → صنف لنقاط البيع (قراءة الباركود).
+
+    - أول قراءة للكود من قاعدة البيانات (فهرس idx_items_sku) ثم من الذاكرة
+    - يتم إسقاط الأصناف التي تغيرت عند وصول أحداث جدول items
+    - الكود غير الموجود لا يتم تخزينه (قد يُضاف الصنف لاحقاً)
+    """
+
+    def __init__(self, db=None):
+        self.db = db or DatabaseManager()
+        self._by_sku = {}
+        self._sku_by_id = {}
+
+        global_signals.subscribe(("items",), self.on_items_changed)
+
+    # ============================================================
+    def lookup(self, sku):
+        sku = (sku or "").strip()
+        item = self._by_sku.get(sku)
+        if item is not None:
+            return item
+
+        item = self.db.get_item_by_sku(sku)
+        if item is not None:
+            self._by_sku[sku] = item
+            self._sku_by_id[item["id"]] = sku
+        return item
+
+    def invalidate(self, ids=None):
+        """ids = None → مسح الكاش كله"""
+        if ids is None:
+            self._by_sku.clear()
+            self._sku_by_id.clear()
+            return
+
+        for item_id in ids:
+            sku = self._sku_by_id.pop(item_id, None)
+            if sku is not None:
+                self._by_sku.pop(sku, None)
+
+    def on_items_changed(self, events):
+        for e in events:
+            # صنف جديد لا يؤثر على الموجود في الكاش
+            if e.op == ChangeEvent.INSERT:
+                continue
+            self.invalidate(e.ids)
+
+
+# كائن واحد عالمي تستخدمه صفحات البيع
+sku_cache = SkuCache()